@@ -0,0 +1,265 @@
+#!/usr/bin/python
+"""
+Times each stage of the jobs/status pipeline against synthetic job lists:
+
+    parse     - trayjenkins.stream.StreamingJenkins.list_jobs, from JSON
+    jobs      - trayjenkins.jobs.Model.update_jobs
+    status    - trayjenkins.status.Model, from each poll's changes
+    filter    - trayjenkins.jobs.IgnoreJobsFilter.filter_jobs
+    listview  - gui.jobs.ListViewAdapter.set_jobs, on an offscreen display
+
+    $ python benchmarks/pipeline.py --sizes 1000,10000 --flip-rate 0.02
+    $ python benchmarks/pipeline.py --save-baseline
+    $ python benchmarks/pipeline.py --trace polls.trace
+
+--trace runs the stages on polls recorded with trayjenkins --record
+rather than synthetic ones.
+
+QT_QPA_PLATFORM=offscreen is set for Qt builds that have it; with Qt 4
+run the listview stage under Xvfb instead.
+
+Results are compared with the saved baseline, if there is one, and the
+exit status is 1 if any stage got slower by more than the tolerance.
+"""
+import json
+import os
+import random
+import sys
+from StringIO import StringIO
+from optparse import OptionParser
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'submodules', 'pyjenkins'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmarks.stats import Baselines, measure_allocations, summarise, time_runs
+from gui.fake import COLOURS, STATUSES
+from pyjenkins.job import Job
+from trayjenkins.event import Event
+from trayjenkins.jobs import IErrorLogger, IgnoreJobsFilter, JobModel, Model as JobsModel, diff_job_models
+from trayjenkins.replay import read_trace
+from trayjenkins.status import Model as StatusModel
+from trayjenkins.stream import StreamingJenkins
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'pipeline.json')
+
+# Qt objects that must outlive the stage that created them.
+_keep_alive = []
+
+
+def synthetic_polls(size, polls, flip_rate, seed=0):
+    """
+    Job lists as successive polls would return them: each poll is made of
+    new Job objects, with flip_rate of the jobs changing status.
+    @type size: int
+    @type polls: int
+    @type flip_rate: float
+    @rtype: [[pyjenkins.job.Job]]
+    """
+    rng = random.Random(seed)
+    names = ['job-%06d' % index for index in range(size)]
+    statuses = [rng.choice(STATUSES) for name in names]  # @UnusedVariable
+    result = []
+    for poll in range(polls):  # @UnusedVariable
+        for index in rng.sample(xrange(size), int(size * flip_rate)):
+            statuses[index] = rng.choice(STATUSES)
+        result.append([Job(name, status) for name, status in zip(names, statuses)])
+
+    return result
+
+
+def traced_polls(path):
+    """
+    Job lists from a recorded trace, leaving out polls that failed.
+    @type path: str
+    @rtype: [[pyjenkins.job.Job]]
+    """
+    return [poll.jobs for poll in read_trace(path) if poll.jobs is not None]
+
+
+def job_models(polls, ignored_rate=0.01, seed=0):
+    """
+    @type polls: [[pyjenkins.job.Job]]
+    @rtype: [[trayjenkins.jobs.JobModel]]
+    """
+    rng = random.Random(seed)
+    ignored = set(job.name for job in polls[0] if rng.random() < ignored_rate)
+    return [[JobModel(job, job.name in ignored) for job in jobs] for jobs in polls]
+
+
+def json_bodies(polls):
+    """
+    @type polls: [[pyjenkins.job.Job]]
+    @return Each poll as Jenkins would send it
+    @rtype: [str]
+    """
+    return [json.dumps({'_class': 'hudson.model.Hudson',
+                        'jobs': [{'name': job.name, 'color': COLOURS[job.status]} for job in jobs]})
+            for jobs in polls]
+
+
+class BodyApi(object):
+
+    def open(self, path, tree=None):
+        return StringIO(self.body)
+
+
+class PollingJenkins(object):
+
+    def __init__(self, polls):
+        self._polls = polls
+        self._next = 0
+
+    def list_jobs(self):
+        result = self._polls[self._next % len(self._polls)]
+        self._next += 1
+        return result
+
+
+class JobsModelStub(object):
+
+    def __init__(self):
+        self.delta_event = Event()
+
+    def jobs_updated_event(self):
+        return Event()
+
+    def jobs_delta_event(self):
+        return self.delta_event
+
+    def server_unreachable_event(self):
+        return Event()
+
+
+def parse_stage(polls, models):  # @UnusedVariable
+    api = BodyApi()
+    jenkins = StreamingJenkins(api)
+
+    def parse(body):
+        api.body = body
+        jenkins.list_jobs()
+    return parse
+
+
+def jobs_stage(polls, models):  # @UnusedVariable
+    model = JobsModel(PollingJenkins(polls), IErrorLogger(), Event())
+    return lambda poll: model.update_jobs()
+
+
+def status_stage(polls, models):  # @UnusedVariable
+    jobs_model = JobsModelStub()
+    model = StatusModel(jobs_model, IgnoreJobsFilter(), status_changed_event=Event())  # @UnusedVariable
+    deltas = dict((id(new), diff_job_models(old, new)) for old, new in zip([[]] + models, models))
+    return lambda job_models: jobs_model.delta_event.fire(deltas[id(job_models)])
+
+
+def filter_stage(polls, models):  # @UnusedVariable
+    return IgnoreJobsFilter().filter_jobs
+
+
+def listview_stage(polls, models):  # @UnusedVariable
+    from PySide import QtGui
+    import gui.jobs
+    import gui.media
+
+    if QtGui.QApplication.instance() is None:
+        _keep_alive.append(QtGui.QApplication([]))
+    view = gui.jobs.ListView()
+    adapter = gui.jobs.ListViewAdapter(view,
+                                       gui.media.MediaFiles(ROOT),
+                                       gui.jobs.ContextMenuFactory(view))
+    _keep_alive.append(view)
+    return adapter.set_jobs
+
+
+STAGES = [('parse', parse_stage),
+          ('jobs', jobs_stage),
+          ('status', status_stage),
+          ('filter', filter_stage),
+          ('listview', listview_stage)]
+
+
+def run(sizes, polls, flip_rate, stages, out=sys.stdout, trace=None):
+    """
+    @param trace: Recorded polls to run instead of synthetic ones
+    @type trace: str
+    @rtype: dict
+    """
+    results = {}
+    if trace is None:
+        datasets = [('%d/%g' % (size, flip_rate), synthetic_polls(size, polls, flip_rate)) for size in sizes]
+    else:
+        datasets = [('trace/%s' % os.path.basename(trace), traced_polls(trace))]
+    for label, job_polls in datasets:
+        models = job_models(job_polls)
+        stage_inputs = {'parse': json_bodies(job_polls) if 'parse' in stages else None,
+                        'jobs': job_polls}
+        for name, stage in STAGES:
+            if name in stages:
+                inputs = stage_inputs.get(name, models)
+                timings = time_runs(stage(job_polls, models), inputs)
+                summary = summarise(timings)
+                summary.update(measure_allocations(stage(job_polls, models), inputs))
+                key = '%s/%s' % (name, label)
+                results[key] = summary
+                out.write('%-24s p50 %9.3fms  p90 %9.3fms  p99 %9.3fms  max %9.3fms  %s\n' % (
+                          key,
+                          summary['p50_ms'],
+                          summary['p90_ms'],
+                          summary['p99_ms'],
+                          summary['max_ms'],
+                          _allocations(summary)))
+
+    return results
+
+
+def _allocations(summary):
+
+    result = 'retained %d objects' % summary['retained_objects']
+    if 'peak_kb' in summary:
+        result = 'peak %.0fKB, %s' % (summary['peak_kb'], result)
+    return result
+
+
+def main(args):
+
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('--sizes', default='1000,10000,100000',
+                      help='comma separated job counts [default: %default]')
+    parser.add_option('--polls', type='int', default=20,
+                      help='polls to time at each size [default: %default]')
+    parser.add_option('--flip-rate', type='float', default=0.01,
+                      help='fraction of jobs changing status each poll [default: %default]')
+    parser.add_option('--stages', default=','.join(name for name, stage in STAGES),  # @UnusedVariable
+                      help='comma separated stages to run [default: %default]')
+    parser.add_option('--trace',
+                      help='run the stages on polls recorded in TRACE, instead of --sizes')
+    parser.add_option('--baseline', default=DEFAULT_BASELINE,
+                      help='baseline results file [default: %default]')
+    parser.add_option('--save-baseline', action='store_true', default=False,
+                      help='save these results as the new baseline')
+    parser.add_option('--tolerance', type='float', default=0.25,
+                      help='fraction slower than baseline before failing [default: %default]')
+    (options, args) = parser.parse_args(args)  # @UnusedVariable
+
+    results = run([int(size) for size in options.sizes.split(',')],
+                  options.polls,
+                  options.flip_rate,
+                  options.stages.split(','),
+                  trace=options.trace)
+
+    baselines = Baselines(options.baseline)
+    regressions = []
+    if options.save_baseline:
+        baselines.save(results)
+    elif baselines.exists():
+        regressions = baselines.regressions(results, options.tolerance)
+        for regression in regressions:
+            sys.stdout.write('REGRESSION %s\n' % regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,251 @@
+#!/usr/bin/python
+"""
+Runs the jobs and status models, and the job list on an offscreen
+display, through many poll cycles against a fake Jenkins, watching for
+growth in memory, in live objects of each type, in Event handlers, in
+Qt objects and in job list items:
+
+    $ python benchmarks/soak.py --cycles 200000 --jobs 200
+    $ python benchmarks/soak.py --http --cycles 20000 --no-gui
+
+Growth is measured from the first sample after --warmup cycles, so that
+caches filling up once are not counted. The exit status is 1 if any
+growth is over its budget.
+
+QT_QPA_PLATFORM=offscreen is set for Qt builds that have it; with Qt 4
+run under Xvfb instead, or pass --no-gui.
+"""
+import gc
+import os
+import resource
+import sys
+import threading
+from collections import defaultdict
+from optparse import OptionParser
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'submodules', 'pyjenkins'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from gui.fake import FakeJenkinsServer, FakeJobs, ScalableJenkins
+from trayjenkins.event import Event
+from trayjenkins.flaky import FlakyDetector
+from trayjenkins.jobs import IErrorLogger, IgnoreJobsFilter, Model as JobsModel, Presenter as JobsPresenter
+from trayjenkins.resilience import CircuitBreaker, ResilientJenkins, TokenBucket
+from trayjenkins.search import JobSearch
+from trayjenkins.status import IView as IStatusView, Model as StatusModel, Presenter as StatusPresenter
+
+
+def rss_kb():
+    """
+    @return Resident memory now, where /proc says, otherwise the peak
+    @rtype: int
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            result = int(statm.read().split()[1]) * resource.getpagesize() // 1024
+    except IOError:
+        result = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            result //= 1024
+
+    return result
+
+
+def type_counts():
+    """
+    @return Number of gc tracked objects of each type
+    @rtype: dict
+    """
+    result = defaultdict(int)
+    for value in gc.get_objects():
+        result[type(value).__name__] += 1
+
+    return result
+
+
+def event_handler_count():
+    """
+    @rtype: int
+    """
+    return sum(len(value.handlers) for value in gc.get_objects() if isinstance(value, Event))
+
+
+class StatusRecorder(IStatusView):
+
+    def __init__(self):
+        self.changes = 0
+
+    def set_status(self, status, message):
+        self.changes += 1
+
+
+class Soak(object):
+
+    def __init__(self, jenkins, gui):
+        """
+        Builds the models, presenters and, if gui, the job list, wired as
+        gui.application.MainWindow wires them.
+        @type jenkins: pyjenkins.jenkins.Jenkins
+        @type gui: bool
+        """
+        unlimited = TokenBucket(1e9, 1e9)
+        self.jobs_model = JobsModel(ResilientJenkins(jenkins, unlimited, CircuitBreaker()), IErrorLogger(), Event())
+        self.status_model = StatusModel(self.jobs_model, IgnoreJobsFilter(), status_changed_event=Event())
+        self.status_presenter = StatusPresenter(self.status_model, StatusRecorder())
+        self.flaky_detector = FlakyDetector(self.jobs_model)
+        self.search = JobSearch(self.jobs_model)
+        self.view = None
+        if gui:
+            self._create_view()
+
+    def _create_view(self):
+
+        from PySide import QtGui
+        import gui.jobs
+        import gui.media
+        from trayjenkins.search import SearchPresenter
+
+        self.application = QtGui.QApplication.instance() or QtGui.QApplication([])
+        self.view = gui.jobs.ListView()
+        adapter = gui.jobs.ListViewAdapter(self.view,
+                                           gui.media.MediaFiles(ROOT),
+                                           gui.jobs.ContextMenuFactory(self.view))
+        self.jobs_presenter = JobsPresenter(self.jobs_model, adapter)
+        self.search_presenter = SearchPresenter(self.search, self.view)
+        self.view.query_changed_event().fire('job-00')
+
+    def cycle(self):
+
+        self.jobs_model.update_jobs()
+
+    def sample(self):
+        """
+        @rtype: dict
+        """
+        if self.view is not None:
+            from PySide import QtCore
+            self.application.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+            self.application.processEvents()
+        gc.collect()
+        result = {'rss_kb': rss_kb(),
+                  'types': type_counts(),
+                  'handlers': event_handler_count()}
+        if self.view is not None:
+            from PySide import QtCore
+            result['qt_objects'] = len(self.view.findChildren(QtCore.QObject))
+            # QListWidgetItems are not QObjects, so findChildren misses them.
+            result['list_items'] = self.view.item_count()
+
+        return result
+
+
+def growth(first, last):
+    """
+    @return Growth in each measure, and the types that grew most
+    @rtype: dict
+    """
+    types = dict((name, last['types'].get(name, 0) - first['types'].get(name, 0))
+                 for name in set(first['types']) | set(last['types']))
+    result = {'rss_kb': last['rss_kb'] - first['rss_kb'],
+              'objects': sum(types.values()),
+              'handlers': last['handlers'] - first['handlers'],
+              'top_types': sorted(((count, name) for name, count in types.items() if count > 0), reverse=True)[:10]}
+    if 'qt_objects' in last:
+        result['qt_objects'] = last['qt_objects'] - first['qt_objects']
+        result['list_items'] = last['list_items'] - first['list_items']
+
+    return result
+
+
+def over_budget(grown, budgets):
+    """
+    @return What grew by more than its budget
+    @rtype: [str]
+    """
+    return ['%s grew by %d, budget %d' % (name, grown[name], budget)
+            for name, budget in sorted(budgets.items())
+            if name in grown and grown[name] > budget]
+
+
+def main(args):
+
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('--cycles', type='int', default=200000,
+                      help='poll cycles to run [default: %default]')
+    parser.add_option('--jobs', type='int', default=200,
+                      help='jobs on the fake Jenkins [default: %default]')
+    parser.add_option('--flip-rate', type='float', default=0.02,
+                      help='fraction of jobs changing status each poll [default: %default]')
+    parser.add_option('--warmup', type='int', default=1000,
+                      help='cycles before growth is measured [default: %default]')
+    parser.add_option('--sample-every', type='int', default=10000,
+                      help='cycles between samples [default: %default]')
+    parser.add_option('--http', action='store_true', default=False,
+                      help='poll a fake Jenkins over HTTP rather than in process')
+    parser.add_option('--no-gui', dest='gui', action='store_false', default=True,
+                      help='leave out the job list')
+    parser.add_option('--rss-budget', type='int', default=8 * 1024,
+                      help='KB of resident memory growth allowed [default: %default]')
+    parser.add_option('--object-budget', type='int', default=1000,
+                      help='growth in gc tracked objects allowed [default: %default]')
+    parser.add_option('--handler-budget', type='int', default=0,
+                      help='growth in Event handlers allowed [default: %default]')
+    parser.add_option('--qt-budget', type='int', default=0,
+                      help='growth in Qt objects under the job list allowed [default: %default]')
+    parser.add_option('--item-budget', type='int', default=0,
+                      help='growth in job list items allowed [default: %default]')
+    (options, args) = parser.parse_args(args)  # @UnusedVariable
+
+    jobs = FakeJobs(options.jobs, options.flip_rate)
+    server = None
+    if options.http:
+        from trayjenkins.api import JenkinsApi
+        from trayjenkins.stream import StreamingJenkins
+        server = FakeJenkinsServer(jobs)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        jenkins = StreamingJenkins(JenkinsApi(server.url()))
+    else:
+        jenkins = ScalableJenkins(jobs)
+
+    soak = Soak(jenkins, options.gui)
+    for unused in range(options.warmup):  # @UnusedVariable
+        soak.cycle()
+    first = soak.sample()
+    cycles = options.warmup
+    while cycles < options.cycles:
+        for unused in range(min(options.sample_every, options.cycles - cycles)):  # @UnusedVariable
+            soak.cycle()
+        cycles += min(options.sample_every, options.cycles - cycles)
+        grown = growth(first, soak.sample())
+        sys.stdout.write('%8d cycles  rss %+7dKB  objects %+7d  handlers %+4d%s\n' % (
+                         cycles,
+                         grown['rss_kb'],
+                         grown['objects'],
+                         grown['handlers'],
+                         '  qt objects %+d  list items %+d' % (grown['qt_objects'], grown['list_items'])
+                         if 'qt_objects' in grown else ''))
+        sys.stdout.flush()
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    grown = growth(first, soak.sample())
+    for count, name in grown['top_types']:
+        sys.stdout.write('  %+8d %s\n' % (count, name))
+    failures = over_budget(grown, {'rss_kb': options.rss_budget,
+                                   'objects': options.object_budget,
+                                   'handlers': options.handler_budget,
+                                   'qt_objects': options.qt_budget,
+                                   'list_items': options.item_budget})
+    for failure in failures:
+        sys.stdout.write('OVER BUDGET %s\n' % failure)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
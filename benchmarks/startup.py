@@ -0,0 +1,76 @@
+#!/usr/bin/python
+"""
+Measures the time from process start until the tray icon is up and the
+event loop is running, using the FAKE Jenkins so that no server is needed.
+
+    $ python benchmarks/startup.py [--profile] [--target SECONDS]
+
+Exits with status 1 if the time to tray icon is over the target.
+"""
+import time
+START = time.time()
+
+import cProfile
+import os
+import pstats
+import sys
+from optparse import OptionParser
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'submodules', 'pyjenkins'))
+
+TARGET_SECONDS = 1.0
+
+
+def start_tray(timings):
+    """
+    Imports and builds the application as trayjenkins.py does, then records
+    the elapsed time once the event loop has started.
+    @type timings: [float]
+    """
+    from gui.application import Application, MainWindow
+    from gui.media import MediaFiles
+    from trayjenkins.settings import Settings
+    from PySide import QtCore, QtGui
+
+    application = Application()  # @UnusedVariable
+    window = MainWindow(Settings('FAKE'), MediaFiles(ROOT))  # @UnusedVariable
+
+    def on_event_loop_started():
+        timings.append(time.time() - START)
+        QtGui.QApplication.instance().quit()
+
+    QtCore.QTimer.singleShot(0, on_event_loop_started)
+    QtGui.QApplication.instance().exec_()
+
+
+def main(args):
+
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('-p', '--profile',
+                      action='store_true',
+                      default=False,
+                      help='print the 25 most expensive calls during startup')
+    parser.add_option('-t', '--target',
+                      type='float',
+                      default=TARGET_SECONDS,
+                      help='time to tray icon target in seconds [default: %default]')
+    (options, args) = parser.parse_args(args)  # @UnusedVariable
+
+    timings = []
+    if options.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(start_tray, timings)
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(25)
+    else:
+        start_tray(timings)
+
+    elapsed = timings[0]
+    sys.stdout.write('time to tray icon: %.3fs (target %.3fs)\n' % (elapsed, options.target))
+
+    return 0 if elapsed <= options.target else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+import gc
+import json
+import os
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+clock = timeit.default_timer
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile.
+    @type sorted_values: [float]
+    @type fraction: float
+    @rtype: float
+    """
+    index = int(round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarise(seconds):
+    """
+    @param seconds: Time taken by each run
+    @type seconds: [float]
+    @return Latencies in milliseconds
+    @rtype: dict
+    """
+    values = sorted(seconds)
+    return {'runs': len(values),
+            'p50_ms': percentile(values, 0.5) * 1000,
+            'p90_ms': percentile(values, 0.9) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000,
+            'mean_ms': sum(values) / len(values) * 1000}
+
+
+def time_runs(run, inputs):
+    """
+    Calls run(input) for each input, returning the time each took.
+    @type run: callable
+    @type inputs: list
+    @rtype: [float]
+    """
+    result = []
+    for value in inputs:
+        start = clock()
+        run(value)
+        result.append(clock() - start)
+
+    return result
+
+
+def measure_allocations(run, inputs):
+    """
+    Runs the stage again, outside the timed runs, to see how much it
+    allocates: peak traced memory where tracemalloc is available
+    (Python 3.4+), otherwise only the growth in gc tracked objects.
+    @type run: callable
+    @type inputs: list
+    @rtype: dict
+    """
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    if tracemalloc is not None:
+        tracemalloc.start()
+    for value in inputs:
+        run(value)
+    result = {}
+    if tracemalloc is not None:
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+    gc.collect()
+    result['retained_objects'] = len(gc.get_objects()) - objects_before
+
+    return result
+
+
+class Baselines(object):
+
+    def __init__(self, path):
+        """
+        @param path: JSON file of results from an earlier run
+        @type path: str
+        """
+        self._path = path
+
+    def exists(self):
+        """
+        @rtype: bool
+        """
+        return os.path.exists(self._path)
+
+    def load(self):
+        """
+        @rtype: dict
+        """
+        with open(self._path) as baseline_file:
+            return json.load(baseline_file)
+
+    def save(self, results):
+        """
+        @type results: dict
+        """
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self._path, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    def regressions(self, results, tolerance, measure='p50_ms'):
+        """
+        @param tolerance: Fraction slower than the baseline that is allowed
+        @type tolerance: float
+        @return Description of each result slower than its baseline
+        @rtype: [str]
+        """
+        result = []
+        baseline = self.load()
+        for key in sorted(results):
+            if key in baseline and baseline[key][measure] > 0:
+                before = baseline[key][measure]
+                after = results[key][measure]
+                if after > before * (1 + tolerance):
+                    result.append('%s: %s %.3f -> %.3f (+%.0f%%)' % (
+                                  key, measure, before, after, (after / before - 1) * 100))
+
+        return result
@@ -1,21 +1,32 @@
 import os
+import socket
 import sys
 from PySide import QtCore, QtGui
 
-import gui.fake
 import gui.jobs
 import gui.media
 import gui.status
 
-from trayjenkins.jobs import Model as JobsModel, Presenter as JobsPresenter, IgnoreJobsFilter
-from trayjenkins.status import Model as StatusModel, Presenter as StatusPresenter
+from trayjenkins.jobs import Model as JobsModel, Presenter as JobsPresenter, IgnoreJobsFilter, NameJobsFilter
+from trayjenkins.status import BadgePresenter, Model as StatusModel, Presenter as StatusPresenter
 from pyjenkins.job import JobStatus
-from pyjenkins.server import Server
 from trayjenkins import __version__
-from pyjenkins.jenkins import JenkinsFactory
+from trayjenkins.metrics import Metrics, MetricsLogger, NULL_METRICS
+from trayjenkins.config import ConfigError, SettingsReloader
 from trayjenkins.settings import CommandLineSettingsParser
 
 
+# Seconds between checks of the config file for changes.
+CONFIG_CHECK_SECONDS = 2
+
+# Seconds between redrawing the progress of running builds.
+PROGRESS_REFRESH_SECONDS = 5
+
+# Settings that only take effect when trayjenkins starts.
+RESTART_SETTINGS = ['host', 'username', 'password', 'notify_port', 'metrics_interval', 'history_dir',
+                    'tree', 'stream', 'request_timeout', 'poll_burst', 'record_path', 'views']
+
+
 class TrayIcon(object):
 
     def __init__(self,
@@ -23,15 +34,26 @@ class TrayIcon(object):
                  media_files,
                  show_controls_action,
                  show_jenkins_action,
+                 refresh_action,
                  quit_action,
-                 jobs_model):
-
+                 jobs_model,
+                 metrics=NULL_METRICS,
+                 progress_model=None,
+                 view_name=None,
+                 jobs_filter=None,
+                 graph_model=None):
+        """
+        Shows the status of all jobs not ignored, with sounds, or of those
+        jobs_filter keeps, named view_name. Given the job graph, messages
+        name only the root causes of failures.
+        """
         self._show_controls_action = show_controls_action
         self._show_jenkins_action = show_jenkins_action
 
         self._tray_menu = QtGui.QMenu(parent)
         self._tray_menu.addAction(show_controls_action)
         self._tray_menu.addAction(show_jenkins_action)
+        self._tray_menu.addAction(refresh_action)
         self._tray_menu.addAction(quit_action)
 
         self._tray_icon = QtGui.QSystemTrayIcon(parent)
@@ -40,11 +62,22 @@ class TrayIcon(object):
         self._tray_icon.activated.connect(self._on_activated)
 
         tray_icon_view = gui.status.TrayIconView(self._tray_icon)
-        tray_icon_view_adapter = gui.status.TrayIconViewAdapter(tray_icon_view, media_files)
-        status_view = gui.status.MultiView([tray_icon_view_adapter,
-                                            gui.status.SoundView(parent, media_files)])
-        self.status_model = StatusModel(jobs_model, IgnoreJobsFilter())
+        tray_icon_view_adapter = gui.status.TrayIconViewAdapter(tray_icon_view,
+                                                                media_files,
+                                                                metrics,
+                                                                spinner_timer=QtCore.QTimer(parent),
+                                                                view_name=view_name)
+        if view_name is None:
+            status_view = gui.status.MultiView([tray_icon_view_adapter,
+                                                gui.status.SoundView(parent, media_files)])
+        else:
+            status_view = tray_icon_view_adapter
+        self.status_model = StatusModel(jobs_model,
+                                        IgnoreJobsFilter() if jobs_filter is None else jobs_filter,
+                                        metrics=metrics,
+                                        graph_model=graph_model)
         self.status_presenter = StatusPresenter(self.status_model, status_view)
+        self.badge_presenter = BadgePresenter(self.status_model, tray_icon_view_adapter, progress_model)
         status_view.set_status(JobStatus.UNKNOWN, None)
 
         self._tray_icon.show()
@@ -59,55 +92,241 @@ class TrayIcon(object):
 
 class MainWindow(QtGui.QDialog):
 
-    def __init__(self, settings, media_files):
+    def __init__(self, settings, media_files, settings_layers=None):
+        """
+        @type settings: trayjenkins.settings.Settings
+        @type media_files: gui.media.MediaFiles
+        @param settings_layers: Where settings came from, to reload them
+        when the config file changes
+        @type settings_layers: trayjenkins.settings.LayeredSettings
+        """
         super(MainWindow, self).__init__()
 
+        self._media_files = media_files
+        self._jobs_view = None
+        self._settings = settings
+
+        if settings.metrics_interval is None:
+            self._metrics = NULL_METRICS
+        else:
+            self._metrics = Metrics()
+            self._metrics_logger = MetricsLogger(self._metrics)
+            self._metrics_logger.start(settings.metrics_interval)
+
         self._create_actions()
-        self._create_jobs_mvp(settings, media_files)
+        self._create_jobs_mvp(settings)
 
         self._trayIcon = TrayIcon(self,
                                   media_files,
                                   self._show_controls_action,
                                   self._show_jenkins_action,
+                                  self._refresh_action,
                                   self._quitAction,
-                                  self._jobs_model)
-
-        main_layout = QtGui.QVBoxLayout()
-        main_layout.addWidget(self._jobs_view)
-        self.setLayout(main_layout)
-
-        self._jobs_update_timer = gui.jobs.UpdateTimer(self._jobs_model, 15, self)
+                                  self._jobs_model,
+                                  self._metrics,
+                                  self._progress_model,
+                                  graph_model=self._graph_model)
+        # Each view keeps its own counts from the same polls.
+        self._view_tray_icons = [TrayIcon(self,
+                                          media_files,
+                                          self._show_controls_action,
+                                          self._show_jenkins_action,
+                                          self._refresh_action,
+                                          self._quitAction,
+                                          self._jobs_model,
+                                          self._metrics,
+                                          view_name=name,
+                                          jobs_filter=NameJobsFilter(patterns),
+                                          graph_model=self._graph_model)
+                                 for name, patterns in settings.views]
+
+        if settings.notify_port is None:
+            poll_seconds = settings.poll_interval
+        else:
+            from trayjenkins.notify import NotificationListener, RECONCILE_SECONDS
+            poll_seconds = RECONCILE_SECONDS
+            self._notification_pump = gui.jobs.NotificationPump(
+                lambda callback: NotificationListener(('', settings.notify_port), callback),
+                self._jobs_model,
+                self)
+
+        self._jobs_update_timer = gui.jobs.UpdateTimer(self._jobs_model,
+                                                       poll_seconds,
+                                                       self,
+                                                       progress_model=self._progress_model,
+                                                       graph_model=self._graph_model,
+                                                       tree=self._job_tree)
+
+        if settings_layers is not None:
+            self._settings_reloader = SettingsReloader(settings_layers, settings)
+            self._settings_reloader.settings_changed_event().register(self._on_settings_changed)
+            self._settings_timer = QtCore.QTimer(self)
+            self._settings_timer.timeout.connect(self._check_settings)
+            self._settings_timer.start(CONFIG_CHECK_SECONDS * 1000)
 
         self.setWindowTitle("TrayJenkins (%s)" % __version__)
         self.resize(640, 480)
 
-    def _create_jobs_mvp(self, settings, media_files):
+    def _create_jobs_mvp(self, settings):
 
+        self._job_tree = None
         if settings.host == 'FAKE':
+            import gui.fake
             jenkins = gui.fake.Jenkins()
             self._jenkins_url = QtCore.QUrl('https://github.com/coolhandmook/trayjenkins')
+        elif settings.host.startswith('FAKE:'):
+            import gui.fake
+            jenkins = gui.fake.ScalableJenkins(gui.fake.FakeJobs(int(settings.host[len('FAKE:'):])))
+            self._jenkins_url = QtCore.QUrl('https://github.com/coolhandmook/trayjenkins')
+        elif settings.host.startswith('replay:'):
+            from trayjenkins.replay import ReplayJenkins, read_trace
+            jenkins = ReplayJenkins(read_trace(settings.host[len('replay:'):]), real_time=True)
+            self._jenkins_url = QtCore.QUrl('https://github.com/coolhandmook/trayjenkins')
+        elif settings.tree:
+            from trayjenkins.api import JenkinsApi
+            from trayjenkins.tree import JobTree, JenkinsFolderSource
+            api = JenkinsApi(settings.host, settings.username, settings.password, settings.request_timeout)
+            self._job_tree = JobTree(JenkinsFolderSource(api))
+            jenkins = self._job_tree
+            self._jenkins_url = QtCore.QUrl(settings.host)
+        elif settings.host.startswith('proxy:'):
+            from trayjenkins.proxy import ProxyJenkins, LONG_POLL_MARGIN_SECONDS
+            proxy_url = settings.host[len('proxy:'):]
+            jenkins = ProxyJenkins(proxy_url,
+                                   timeout=settings.request_timeout,
+                                   metrics=self._metrics,
+                                   wait=max(0, settings.poll_interval - LONG_POLL_MARGIN_SECONDS))
+            self._jenkins_url = QtCore.QUrl(proxy_url)
+        elif settings.stream:
+            from trayjenkins.api import JenkinsApi
+            from trayjenkins.stream import StreamingJenkins
+            api = JenkinsApi(settings.host, settings.username, settings.password, settings.request_timeout)
+            jenkins = StreamingJenkins(api, metrics=self._metrics)
+            self._jenkins_url = QtCore.QUrl(settings.host)
         else:
+            from pyjenkins.jenkins import JenkinsFactory
+            from pyjenkins.server import Server
+            socket.setdefaulttimeout(settings.request_timeout)
             server = Server(settings.host, settings.username, settings.password)
             jenkins = JenkinsFactory().create(server)
             self._jenkins_url = QtCore.QUrl(settings.host)
+        # A trace records polls as they came through ResilientJenkins, so
+        # it is replayed without one.
+        if settings.host != 'FAKE' and not settings.host.startswith('replay:'):
+            from trayjenkins.resilience import ResilientJenkins, TokenBucket
+            jenkins = ResilientJenkins(jenkins, bucket=TokenBucket(0.2, settings.poll_burst), metrics=self._metrics)
+        # Only backends that can tell which jobs are building, such as
+        # StreamingJenkins, report any progress.
+        if self._job_tree is None and hasattr(jenkins, 'building_jobs'):
+            from trayjenkins.progress import BuildProgressModel
+            self._progress_model = BuildProgressModel(jenkins, metrics=self._metrics)
+        else:
+            self._progress_model = None
+        graph_source = jenkins if self._job_tree is None and hasattr(jenkins, 'job_upstreams') else None
+        if settings.record_path is not None:
+            from trayjenkins.replay import RecordingJenkins, TraceWriter
+            jenkins = RecordingJenkins(jenkins, TraceWriter(settings.record_path))
 
         error_logger = gui.jobs.ErrorLogger(self)
-        self._jobs_model = JobsModel(jenkins, error_logger)
-        self._jobs_view = gui.jobs.ListView()
-        menu_factory = gui.jobs.ContextMenuFactory(self._jobs_view)
-        view_adapter = gui.jobs.ListViewAdapter(self._jobs_view, media_files, menu_factory)
-        self._jobs_presenter = JobsPresenter(self._jobs_model, view_adapter)
+        self._jobs_model = JobsModel(jenkins, error_logger, metrics=self._metrics)
+        if settings.ignore_patterns:
+            self._jobs_model.set_ignore_patterns(settings.ignore_patterns)
+        if graph_source is None:
+            self._graph_model = None
+        else:
+            from trayjenkins.graph import GraphModel
+            self._graph_model = GraphModel(graph_source, self._jobs_model, metrics=self._metrics)
+        if settings.history_dir is None:
+            self._history = None
+        else:
+            from trayjenkins.history import HistoryStore, HistoryRecorder
+            self._history = HistoryRecorder(HistoryStore(settings.history_dir), self._jobs_model)
+        # Flaky jobs are offered for ignoring whether or not the job window
+        # is open, so the detector watches from the first poll.
+        from trayjenkins.flaky import FlakyDetector, FlakyPresenter
+        self._flaky_detector = FlakyDetector(self._jobs_model)
+        self._flaky_presenter = FlakyPresenter(self._flaky_detector,
+                                               self._jobs_model,
+                                               gui.jobs.FlakyJobPrompt(self))
+        # The search index is built from the deltas of each poll as it is
+        # applied, so opening the job window does not stall building it.
+        if self._job_tree is None:
+            from trayjenkins.search import JobSearch
+            self._job_search = JobSearch(self._jobs_model, metrics=self._metrics)
+        else:
+            self._job_search = None
+        self._deferred_jobs_view = gui.jobs.DeferredView()
+        self._jobs_presenter = JobsPresenter(self._jobs_model, self._deferred_jobs_view)
+
+    def _create_jobs_view(self):
+
+        if self._job_tree is None:
+            self._jobs_view = gui.jobs.ListView()
+            menu_factory = gui.jobs.ContextMenuFactory(self._jobs_view)
+            view_adapter = gui.jobs.ListViewAdapter(self._jobs_view,
+                                                    self._media_files,
+                                                    menu_factory,
+                                                    metrics=self._metrics,
+                                                    job_describer=None if self._history is None else self._history.describe)
+            from trayjenkins.search import SearchPresenter
+            self._search_presenter = SearchPresenter(self._job_search, self._jobs_view)
+            if self._progress_model is not None:
+                from trayjenkins.progress import ProgressPresenter
+                self._progress_presenter = ProgressPresenter(self._progress_model, view_adapter)
+                self._progress_timer = QtCore.QTimer(self)
+                self._progress_timer.timeout.connect(self._progress_presenter.refresh)
+                self._progress_timer.start(PROGRESS_REFRESH_SECONDS * 1000)
+        else:
+            from trayjenkins.tree import TreePresenter
+            self._jobs_view = gui.jobs.TreeView()
+            menu_factory = gui.jobs.ContextMenuFactory(self._jobs_view)
+            view_adapter = gui.jobs.TreeViewAdapter(self._jobs_view, self._media_files, menu_factory)
+            self._folder_expander = gui.jobs.FolderExpander(self._job_tree, gui.jobs.ErrorLogger(self), self)
+            self._tree_presenter = TreePresenter(self._job_tree, view_adapter, self._folder_expander.expand)
+        self._deferred_jobs_view.attach(view_adapter)
+
+        main_layout = QtGui.QVBoxLayout()
+        main_layout.addWidget(self._jobs_view)
+        self.setLayout(main_layout)
 
     def _create_actions(self):
 
         self._quitAction = QtGui.QAction("&Quit", self, triggered=QtGui.qApp.quit)
-        self._show_controls_action = QtGui.QAction("Show &Controls", self, triggered=self.showNormal)
+        self._show_controls_action = QtGui.QAction("Show &Controls", self, triggered=self._show_controls)
         self._show_jenkins_action = QtGui.QAction("Show &Jenkins", self, triggered=self._open_jenkins_url)
+        self._refresh_action = QtGui.QAction("&Refresh Now", self, triggered=self._refresh_now)
 
     def closeEvent(self, event):
         self.hide()
         event.ignore()
 
+    def _show_controls(self):
+        if self._jobs_view is None:
+            self._create_jobs_view()
+        self.showNormal()
+
+    def _check_settings(self):
+        error = self._settings_reloader.check()
+        if error is not None:
+            sys.stderr.write('Config not reloaded: %s\n' % error)
+
+    def _on_settings_changed(self, old, new):
+        """
+        Applies what can be changed while running, without polling Jenkins
+        again, and says what needs a restart.
+        """
+        if new.poll_interval != old.poll_interval and new.notify_port is None:
+            self._jobs_update_timer.set_interval(new.poll_interval)
+        if new.ignore_patterns != old.ignore_patterns:
+            self._jobs_model.set_ignore_patterns(new.ignore_patterns)
+        restart = [name for name in RESTART_SETTINGS if getattr(new, name) != getattr(old, name)]
+        if restart:
+            sys.stderr.write('Restart trayjenkins to apply the changes to %s\n' % ', '.join(restart))
+        self._settings = new
+
+    def _refresh_now(self):
+        self._jobs_update_timer.refresh_now()
+
     def _open_jenkins_url(self):
         QtGui.QDesktopServices.openUrl(self._jenkins_url)
 
@@ -124,18 +343,23 @@ class Application(QtGui.QDialog):
         settings = self._parse_options()
         media_files = gui.media.MediaFiles(self._executable_path())
 
-        window = MainWindow(settings, media_files)  # @UnusedVariable
+        window = MainWindow(settings, media_files, self._settings_layers)  # @UnusedVariable
 
         return self._application.exec_()
 
     def _parse_options(self):
 
         parser = CommandLineSettingsParser()
-        settings = parser.parse_args(sys.argv[1:])
+        try:
+            settings = parser.parse_args(sys.argv[1:])
+        except ConfigError as error:
+            sys.stderr.write('%s\n' % error)
+            sys.exit(1)
 
         if settings is None:
             parser.print_help()
             sys.exit(1)
+        self._settings_layers = parser.layers
 
         return settings
 
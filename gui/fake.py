@@ -1,3 +1,14 @@
+import json
+import random
+import sys
+import threading
+import time
+import urllib
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from optparse import OptionParser
+from urlparse import urlparse
+
 from pyjenkins.job import Job, JobStatus
 
 
@@ -23,6 +34,11 @@ class Jenkins(object):
 
         return result
 
+    def get_job(self, job_name):
+
+        job = self._find_job(job_name)
+        return Job(job.name, job.status) if job else None
+
     def enable_job(self, job_name):
 
         job = self._find_job(job_name)
@@ -44,3 +60,268 @@ class Jenkins(object):
         if jobs != []:
             result = jobs[0]
         return result
+
+
+STATUSES = [JobStatus.OK, JobStatus.FAILING, JobStatus.DISABLED, JobStatus.UNKNOWN]
+COLOURS = {JobStatus.OK: 'blue',
+           JobStatus.FAILING: 'red',
+           JobStatus.DISABLED: 'disabled',
+           JobStatus.UNKNOWN: 'notbuilt'}
+
+
+class FakeJobs(object):
+
+    def __init__(self, count, flip_rate=0.01, script=None, seed=0):
+        """
+        A job list that changes a little each poll: either flip_rate of the
+        enabled jobs get a random status, or the next step of the script is
+        applied. Seeded, so every run sees the same changes.
+        @param count: Number of jobs, named job-000000 upwards
+        @type count: int
+        @type flip_rate: float
+        @param script: Status changes for successive polls, as
+        [{job_name: status}]; once they run out the jobs stay as they are
+        @type script: [dict]
+        @type seed: int
+        """
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._flip_rate = flip_rate
+        self._script = None if script is None else list(script)
+        self._names = ['job-%06d' % index for index in range(count)]
+        self._statuses = dict((name, self._rng.choice(STATUSES)) for name in self._names)
+
+    def advance(self):
+        """
+        Makes the changes for the next poll.
+        """
+        with self._lock:
+            if self._script is not None:
+                if self._script:
+                    self._statuses.update(self._script.pop(0))
+            else:
+                for index in self._rng.sample(xrange(len(self._names)), int(len(self._names) * self._flip_rate)):
+                    name = self._names[index]
+                    if self._statuses[name] != JobStatus.DISABLED:
+                        self._statuses[name] = self._rng.choice([JobStatus.OK, JobStatus.FAILING])
+
+    def jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        with self._lock:
+            return [Job(name, self._statuses[name]) for name in self._names]
+
+    def job(self, job_name):
+        """
+        @return None if there is no such job
+        @rtype: pyjenkins.job.Job
+        """
+        with self._lock:
+            status = self._statuses.get(job_name, None)
+            return None if status is None else Job(job_name, status)
+
+    def set_enabled(self, job_name, enabled):
+        """
+        @return Whether there is such a job
+        @rtype: bool
+        """
+        with self._lock:
+            result = job_name in self._statuses
+            if result:
+                self._statuses[job_name] = JobStatus.UNKNOWN if enabled else JobStatus.DISABLED
+
+            return result
+
+
+class Faults(object):
+
+    def __init__(self, latency=0, error_rate=0, slow_rate=0, slow_seconds=30, seed=0, sleep=time.sleep):
+        """
+        How badly a fake Jenkins behaves.
+        @param latency: Seconds every request takes
+        @type latency: float
+        @param error_rate: Fraction of requests that fail
+        @type error_rate: float
+        @param slow_rate: Fraction of requests that take slow_seconds more,
+        e.g. to trip client timeouts
+        @type slow_rate: float
+        @type slow_seconds: float
+        @type seed: int
+        @type sleep: callable
+        """
+        self._latency = latency
+        self._error_rate = error_rate
+        self._slow_rate = slow_rate
+        self._slow_seconds = slow_seconds
+        self._rng = random.Random(seed)
+        self._sleep = sleep
+
+    def apply(self):
+        """
+        Waits as long as this request should take.
+        @return Whether the request should fail
+        @rtype: bool
+        """
+        delay = self._latency
+        if self._rng.random() < self._slow_rate:
+            delay += self._slow_seconds
+        if delay > 0:
+            self._sleep(delay)
+
+        return self._rng.random() < self._error_rate
+
+
+class ScalableJenkins(object):
+
+    def __init__(self, jobs, faults=None):
+        """
+        Stands in for pyjenkins.jenkins.Jenkins in process. A failed request
+        raises IOError, as a refused connection would.
+        @type jobs: gui.fake.FakeJobs
+        @type faults: gui.fake.Faults
+        """
+        self._jobs = jobs
+        self._faults = Faults() if faults is None else faults
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        self._request()
+        self._jobs.advance()
+        return self._jobs.jobs()
+
+    def get_job(self, job_name):
+
+        self._request()
+        return self._jobs.job(job_name)
+
+    def enable_job(self, job_name):
+
+        self._request()
+        return self._jobs.set_enabled(job_name, True)
+
+    def disable_job(self, job_name):
+
+        self._request()
+        return self._jobs.set_enabled(job_name, False)
+
+    def _request(self):
+
+        if self._faults.apply():
+            raise IOError('Fake Jenkins failed the request')
+
+
+class FakeJenkinsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if self.server.faults.apply():
+            self.send_error(503)
+        elif parts == ['api', 'json']:
+            self.server.jobs.advance()
+            self._send_json({'_class': 'hudson.model.Hudson',
+                             'jobs': [{'name': job.name, 'color': COLOURS[job.status]}
+                                      for job in self.server.jobs.jobs()]})
+        elif len(parts) == 4 and parts[0] == 'job' and parts[2:] == ['api', 'json']:
+            job = self.server.jobs.job(urllib.unquote(parts[1]))
+            if job is None:
+                self.send_error(404)
+            else:
+                self._send_json({'name': job.name, 'color': COLOURS[job.status]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if self.server.faults.apply():
+            self.send_error(503)
+        elif len(parts) == 3 and parts[0] == 'job' and parts[2] in ('enable', 'disable'):
+            if self.server.jobs.set_enabled(urllib.unquote(parts[1]), parts[2] == 'enable'):
+                self._send_json({})
+            else:
+                self.send_error(404)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):  # @ReservedAssignment
+        pass
+
+    def _send_json(self, values):
+
+        body = json.dumps(values)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeJenkinsServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, jobs, address=('127.0.0.1', 0), faults=None):
+        """
+        Serves enough of the Jenkins JSON API for trayjenkins: the job
+        list, single jobs, and enabling and disabling them. A failed
+        request gets a 503.
+        @type jobs: gui.fake.FakeJobs
+        @param address: Port 0 picks a free port; see server_address
+        @type address: (str, int)
+        @type faults: gui.fake.Faults
+        """
+        HTTPServer.__init__(self, address, FakeJenkinsRequestHandler)
+        self.jobs = jobs
+        self.faults = Faults() if faults is None else faults
+
+    def url(self):
+        """
+        @rtype: str
+        """
+        return 'http://%s:%d' % self.server_address
+
+
+def main(args):
+
+    parser = OptionParser(usage='usage: %prog [options]')
+    parser.add_option('--jobs', type='int', default=1000,
+                      help='number of jobs [default: %default]')
+    parser.add_option('--flip-rate', type='float', default=0.01,
+                      help='fraction of jobs changing status each poll [default: %default]')
+    parser.add_option('--port', type='int', default=8080,
+                      help='port to listen on [default: %default]')
+    parser.add_option('--latency', type='float', default=0,
+                      help='seconds every request takes [default: %default]')
+    parser.add_option('--error-rate', type='float', default=0,
+                      help='fraction of requests answered with a 503 [default: %default]')
+    parser.add_option('--slow-rate', type='float', default=0,
+                      help='fraction of requests taking --slow-seconds longer [default: %default]')
+    parser.add_option('--slow-seconds', type='float', default=30,
+                      help='[default: %default]')
+    parser.add_option('--seed', type='int', default=0,
+                      help='[default: %default]')
+    (options, args) = parser.parse_args(args)  # @UnusedVariable
+
+    server = FakeJenkinsServer(FakeJobs(options.jobs, options.flip_rate, seed=options.seed),
+                               ('127.0.0.1', options.port),
+                               Faults(options.latency,
+                                      options.error_rate,
+                                      options.slow_rate,
+                                      options.slow_seconds,
+                                      options.seed))
+    sys.stdout.write('Fake Jenkins with %d jobs at %s\n' % (options.jobs, server.url()))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
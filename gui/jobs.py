@@ -1,6 +1,14 @@
+import threading
+import time
+from collections import OrderedDict
+
 from PySide import QtCore, QtGui
 from trayjenkins.event import Event
+from trayjenkins.flaky import IFlakyView
 from trayjenkins.jobs import IView, IErrorLogger
+from trayjenkins.metrics import NULL_METRICS
+from trayjenkins.singleflight import SerialWorker
+from trayjenkins.tree import ITreeView
 from pyjenkins.job import JobStatus
 from gui.qmock import QtGuiFactory
 
@@ -59,34 +67,88 @@ class ListView(QtGui.QGroupBox):
         """
         return self._right_click_event
 
+    def query_changed_event(self):
+        """
+        Listeners receive Event.fire(query:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._query_changed_event
+
     def __init__(self):
         QtGui.QGroupBox.__init__(self, "Jobs")
 
         self._right_click_event = Event()
+        self._query_changed_event = Event()
+        self._items = {}
+        self._matches = None
+
+        self._filter = QtGui.QLineEdit(self)
+        self._filter.setPlaceholderText('Filter')
+        self._filter.textChanged.connect(self._on_filter_text_changed)
 
         self._jobs = QtGui.QListWidget(self)
         self._jobs.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self._jobs.customContextMenuRequested.connect(self._on_custom_context_menu_requested)
 
         layout = QtGui.QVBoxLayout()
+        layout.addWidget(self._filter)
         layout.addWidget(self._jobs)
         self.setLayout(layout)
 
+    def _on_filter_text_changed(self, text):
+
+        self._query_changed_event.fire(text)
+
     def _on_custom_context_menu_requested(self, point):
         """
         @type point: PySide.QtCore.QPoint
         """
         item = self._jobs.itemAt(point)
         if item is not None:
-            self._right_click_event.fire(item.text(), self._jobs.mapToGlobal(point))
+            self._right_click_event.fire(item.data(QtCore.Qt.UserRole), self._jobs.mapToGlobal(point))
 
     def set_list(self, items):
         """
+        Items are known by the job name they are created with, which is
+        kept with each item since its text may change to show progress.
         @type items: [PySide.QtGui.QListWidgetItem]
         """
         self._jobs.clear()
+        self._items = {}
         for item in items:
-            self._jobs.addItem(item)
+            self.add_item(item)
+
+    def add_item(self, item):
+        """
+        Adds an item after those already listed.
+        @type item: PySide.QtGui.QListWidgetItem
+        """
+        item.setData(QtCore.Qt.UserRole, item.text())
+        self._jobs.addItem(item)
+        self._items[item.text()] = item
+        if self._matches is not None:
+            item.setHidden(item.text() not in self._matches)
+
+    def set_matches(self, job_names):
+        """
+        Only shows or hides the items whose match changed.
+        @param job_names: Jobs to show, or None to show them all
+        @type job_names: set
+        """
+        shown = set(self._items) if self._matches is None else self._matches
+        matches = set(self._items) if job_names is None else job_names
+        for name in shown.symmetric_difference(matches):
+            item = self._items.get(name, None)
+            if item is not None:
+                item.setHidden(name not in matches)
+        self._matches = job_names
+
+    def item_count(self):
+        """
+        @return Items in the job list, hidden or not
+        @rtype: int
+        """
+        return self._jobs.count()
 
 
 class ListViewAdapter(IView):
@@ -123,21 +185,34 @@ class ListViewAdapter(IView):
                  view,
                  media_files,
                  menu_factory,
-                 qtgui=QtGuiFactory()):
+                 qtgui=QtGuiFactory(),
+                 metrics=NULL_METRICS,
+                 job_describer=None,
+                 clock=time.time):
         """
         @type view: gui.jobs.ListView
         @type media_files: gui.media.MediaFiles
         @type menu_factory: gui.jobs.ContextMenuFactory
         @type qtgui: QtGuiFactory
+        @type metrics: trayjenkins.metrics.IMetrics
+        @param job_describer: Called as job_describer(job_name) for each
+        item's tooltip, e.g. trayjenkins.history.HistoryRecorder.describe
+        @type job_describer: callable
+        @type clock: callable
         """
         self._view = view
+        self._metrics = metrics
+        self._job_describer = job_describer
+        self._clock = clock
+        self._items = {}
+        self._progress = {}
         self._qtgui = qtgui
         self._menu_factory = menu_factory
         self._ignored_event = Event()
         self._unignored_event = Event()
         self._enabled_event = Event()
         self._disabled_event = Event()
-        self._job_models = []
+        self._job_models = {}
 
         view.right_click_event().register(self._on_view_right_click)
 
@@ -151,16 +226,76 @@ class ListViewAdapter(IView):
         """
         @type jobs: [trayjenkins.jobs.JobModel]
         """
-        items = []
-        for model in job_models:
-            if model.ignored:
-                icon = self._ignored_icon
+        with self._metrics.timer('view.jobs'):
+            items = [self._create_item(model) for model in job_models]
+            self._view.set_list(items)
+            self._items = dict((model.job.name, item) for model, item in zip(job_models, items))
+            self._label_progress(self._progress, self._progress)
+        self._job_models = dict((model.job.name, model) for model in job_models)
+
+    def update_job(self, job_model):
+        """
+        Changes the icon of the job's item alone, or adds an item for a
+        job not listed.
+        @type job_model: trayjenkins.jobs.JobModel
+        """
+        name = job_model.job.name
+        with self._metrics.timer('view.jobs'):
+            item = self._items.get(name, None)
+            if item is None:
+                item = self._create_item(job_model)
+                self._view.add_item(item)
+                self._items[name] = item
+                if name in self._progress:
+                    self._label_progress(self._progress, [name])
             else:
-                icon = self._status_icons[model.job.status]
-            items.append(self._qtgui.QListWidgetItem(icon, model.job.name))
+                item.setIcon(self._icon(job_model))
+        self._job_models[name] = job_model
 
-        self._view.set_list(items)
-        self._job_models = job_models
+    def _create_item(self, job_model):
+
+        item = self._qtgui.QListWidgetItem(self._icon(job_model), job_model.job.name)
+        if self._job_describer is not None:
+            item.setToolTip(self._job_describer(job_model.job.name))
+
+        return item
+
+    def _icon(self, job_model):
+
+        if job_model.ignored:
+            result = self._ignored_icon
+        else:
+            result = self._status_icons[job_model.job.status]
+
+        return result
+
+    def set_progress(self, progress):
+        """
+        Shows each running build's percent complete after the job's name,
+        and its ETA in the tooltip. Only the items of jobs that are, or
+        have just stopped, building are touched.
+        @param progress: trayjenkins.progress.BuildProgress by job name
+        @type progress: dict
+        """
+        previous = self._progress
+        self._progress = progress
+        self._label_progress(progress, set(previous).union(progress))
+
+    def _label_progress(self, progress, job_names):
+
+        now = self._clock()
+        for name in job_names:
+            item = self._items.get(name)
+            if item is not None:
+                tooltip = self._job_describer(name) if self._job_describer is not None else ''
+                build = progress.get(name)
+                if build is None:
+                    item.setText(name)
+                else:
+                    percent = build.percent(now)
+                    item.setText('%s  (%s)' % (name, 'building' if percent is None else '%d%%' % percent))
+                    tooltip = '\n'.join(line for line in [build.describe(now), tooltip] if line)
+                item.setToolTip(tooltip)
 
     def _on_view_ignored(self, job_name):
 
@@ -184,43 +319,593 @@ class ListViewAdapter(IView):
         menu.popup(pos)
 
     def _find_model(self, job_name):
-        result = None
-        for model in self._job_models:
-            if model.job.name == job_name:
-                result = model
-                break
+        return self._job_models.get(job_name, None)
+
+
+class TreeView(QtGui.QGroupBox):
+
+    def expanded_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._expanded_event
+
+    def collapsed_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._collapsed_event
+
+    def right_click_event(self):
+        """
+        Listeners receive Event.fire(path:(str), pos:PySide.QtCore.QPoint)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._right_click_event
+
+    def __init__(self):
+        QtGui.QGroupBox.__init__(self, "Jobs")
+
+        self._expanded_event = Event()
+        self._collapsed_event = Event()
+        self._right_click_event = Event()
+        self._items = {}
+        self._paths = {}
+
+        self._tree = QtGui.QTreeWidget(self)
+        self._tree.setHeaderHidden(True)
+        self._tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self._tree.customContextMenuRequested.connect(self._on_custom_context_menu_requested)
+        self._tree.itemExpanded.connect(self._on_item_expanded)
+        self._tree.itemCollapsed.connect(self._on_item_collapsed)
+
+        layout = QtGui.QVBoxLayout()
+        layout.addWidget(self._tree)
+        self.setLayout(layout)
+
+    def set_children(self, path, rows):
+        """
+        Replaces the items under a folder, or at the top level for ().
+        @type path: (str)
+        @param rows: (path, icon, is_folder) for each child
+        @type rows: [((str), PySide.QtGui.QIcon, bool)]
+        """
+        if path == ():
+            parent = None
+        else:
+            parent = self._items.get(path, None)
+        if parent is not None or path == ():
+            self._remove_children(parent)
+            items = [self._create_item(child_path, icon, is_folder) for child_path, icon, is_folder in rows]
+            if parent is None:
+                self._tree.addTopLevelItems(items)
+            else:
+                parent.addChildren(items)
+
+    def set_icon(self, path, icon):
+        """
+        Does nothing for items not showing, e.g. in collapsed folders.
+        @type path: (str)
+        @type icon: PySide.QtGui.QIcon
+        """
+        item = self._items.get(path, None)
+        if item is not None:
+            item.setIcon(0, icon)
+
+    def _create_item(self, path, icon, is_folder):
+
+        item = QtGui.QTreeWidgetItem([path[-1]])
+        item.setIcon(0, icon)
+        if is_folder:
+            item.setChildIndicatorPolicy(QtGui.QTreeWidgetItem.ShowIndicator)
+        self._items[path] = item
+        self._paths[id(item)] = path
+        return item
+
+    def _remove_children(self, parent):
+        """
+        Collapsed folders keep no items beneath them.
+        @type parent: PySide.QtGui.QTreeWidgetItem
+        """
+        if parent is None:
+            removed = [self._tree.takeTopLevelItem(0) for unused in range(self._tree.topLevelItemCount())]  # @UnusedVariable
+        else:
+            removed = parent.takeChildren()
+        while removed:
+            item = removed.pop()
+            path = self._paths.pop(id(item), None)
+            self._items.pop(path, None)
+            removed.extend(item.child(index) for index in range(item.childCount()))
+
+    def _on_item_expanded(self, item):
+
+        self._expanded_event.fire(self._paths[id(item)])
+
+    def _on_item_collapsed(self, item):
+
+        self._remove_children(item)
+        self._collapsed_event.fire(self._paths[id(item)])
+
+    def _on_custom_context_menu_requested(self, point):
+        """
+        @type point: PySide.QtCore.QPoint
+        """
+        item = self._tree.itemAt(point)
+        if item is not None:
+            self._right_click_event.fire(self._paths[id(item)], self._tree.mapToGlobal(point))
+
+
+class TreeViewAdapter(IView, ITreeView):
+    """
+    Shows the job tree, and the jobs model's ignored jobs, in a TreeView.
+    Job names in the jobs model are paths joined with '/'.
+    """
+
+    def job_ignored_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._ignored_event
+
+    def job_unignored_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._unignored_event
+
+    def job_enabled_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._enabled_event
+
+    def job_disabled_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._disabled_event
+
+    def folder_expanded_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._view.expanded_event()
+
+    def folder_collapsed_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._view.collapsed_event()
+
+    def __init__(self, view, media_files, menu_factory):
+        """
+        @type view: gui.jobs.TreeView
+        @type media_files: gui.media.MediaFiles
+        @type menu_factory: gui.jobs.ContextMenuFactory
+        """
+        self._view = view
+        self._menu_factory = menu_factory
+        self._ignored_event = Event()
+        self._unignored_event = Event()
+        self._enabled_event = Event()
+        self._disabled_event = Event()
+        self._job_models = {}
+        self._ignored = set()
+        self._statuses = {}
+
+        view.right_click_event().register(self._on_view_right_click)
+
+        self._ignored_icon = media_files.ignored_icon()
+        self._status_icons = {JobStatus.DISABLED: media_files.disabled_icon(),
+                              JobStatus.FAILING: media_files.failing_icon(),
+                              JobStatus.OK: media_files.ok_icon(),
+                              JobStatus.UNKNOWN: media_files.unknown_icon()}
+
+    def set_children(self, path, children):
+        """
+        @type path: (str)
+        @type children: [trayjenkins.tree.TreeNode]
+        """
+        for node in children:
+            self._statuses[node.path] = node.status
+        self._view.set_children(path, [(node.path, self._icon(node.path), node.is_folder) for node in children])
+
+    def update_nodes(self, nodes):
+        """
+        @type nodes: [trayjenkins.tree.TreeNode]
+        """
+        for node in nodes:
+            self._statuses[node.path] = node.status
+            self._view.set_icon(node.path, self._icon(node.path))
+
+    def set_jobs(self, job_models):
+        """
+        Only the jobs whose ignored state changed are redrawn; statuses
+        arrive through update_nodes.
+        @type jobs: [trayjenkins.jobs.JobModel]
+        """
+        self._job_models = dict((model.job.name, model) for model in job_models)
+        ignored = set(model.job.name for model in job_models if model.ignored)
+        changed = ignored.symmetric_difference(self._ignored)
+        self._ignored = ignored
+        for job_name in changed:
+            path = tuple(job_name.split('/'))
+            self._view.set_icon(path, self._icon(path))
+
+    def update_job(self, job_model):
+        """
+        Redraws the job only if its ignored state changed; its status
+        arrives through update_nodes.
+        @type job_model: trayjenkins.jobs.JobModel
+        """
+        name = job_model.job.name
+        self._job_models[name] = job_model
+        if job_model.ignored != (name in self._ignored):
+            if job_model.ignored:
+                self._ignored.add(name)
+            else:
+                self._ignored.discard(name)
+            path = tuple(name.split('/'))
+            self._view.set_icon(path, self._icon(path))
+
+    def _icon(self, path):
+
+        if '/'.join(path) in self._ignored:
+            result = self._ignored_icon
+        else:
+            result = self._status_icons[self._statuses.get(path, JobStatus.UNKNOWN)]
+
         return result
 
+    def _on_view_right_click(self, path, pos):
+        """
+        Folders have no menu.
+        @type path: (str)
+        @param pos: Absolute screen coordinates
+        @type pos: PySide.QtCore.QPoint
+        """
+        job_name = '/'.join(path)
+        model = self._job_models.get(job_name, None)
+        if model is not None:
+            menu = self._menu_factory.create(model,
+                                             lambda: self._ignored_event.fire(job_name),
+                                             lambda: self._unignored_event.fire(job_name),
+                                             lambda: self._enabled_event.fire(job_name),
+                                             lambda: self._disabled_event.fire(job_name))
+            menu.popup(pos)
+
+
+class DeferredView(IView):
+    """
+    Stands in for the jobs view until it is built, which is not until the
+    controls are first shown. Remembers the latest jobs and hands them, and
+    the view's events, through once attach() is called.
+    """
+
+    def job_ignored_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._ignored_event
+
+    def job_unignored_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._unignored_event
+
+    def job_enabled_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._enabled_event
+
+    def job_disabled_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._disabled_event
+
+    def __init__(self):
+        self._view = None
+        self._job_models = None
+        self._updates = OrderedDict()
+        self._ignored_event = Event()
+        self._unignored_event = Event()
+        self._enabled_event = Event()
+        self._disabled_event = Event()
+
+    def attach(self, view):
+        """
+        @type view: trayjenkins.jobs.IView
+        """
+        self._view = view
+        view.job_ignored_event().register(self._ignored_event.fire)
+        view.job_unignored_event().register(self._unignored_event.fire)
+        view.job_enabled_event().register(self._enabled_event.fire)
+        view.job_disabled_event().register(self._disabled_event.fire)
+        if self._job_models is not None:
+            view.set_jobs(self._job_models)
+        for model in self._updates.values():
+            view.update_job(model)
+        self._updates.clear()
+
+    def is_attached(self):
+        """
+        @rtype: bool
+        """
+        return self._view is not None
+
+    def set_jobs(self, job_models):
+        """
+        @type jobs: [trayjenkins.jobs.JobModel]
+        """
+        self._job_models = job_models
+        self._updates.clear()
+        if self._view is not None:
+            self._view.set_jobs(job_models)
+
+    def update_job(self, job_model):
+        """
+        Until the view is attached, keeps the latest change to each job,
+        to hand on after the jobs.
+        @type job_model: trayjenkins.jobs.JobModel
+        """
+        if self._view is not None:
+            self._view.update_job(job_model)
+        else:
+            self._updates[job_model.job.name] = job_model
+
 
 class UpdateTimer(QtCore.QObject):
 
-    def __init__(self, jobs_model, seconds, parent=None):
+    _fetched = QtCore.Signal(object)
+    _progress_fetched = QtCore.Signal(object)
+    _graph_fetched = QtCore.Signal(object)
+    _tree_fetched = QtCore.Signal(object)
+
+    def __init__(self, jobs_model, seconds, parent=None, threaded=True, progress_model=None, graph_model=None,
+                 tree=None):
         """
+        The first update is queued rather than made here, so that the event
+        loop is running, and the tray icon showing, before Jenkins is polled.
+        If threaded, Jenkins is polled on a single worker thread, one poll
+        at a time, and the jobs are applied to the model on the GUI thread;
+        a timer tick is skipped while a poll is still in flight.
         @type jobs_model: trayjenkins.jobs.IModel
         @type seconds: int
         @type parent: PySide.QtCore.QObject
+        @type threaded: bool
+        @param progress_model: Asked about new builds after each poll
+        @type progress_model: trayjenkins.progress.BuildProgressModel
+        @param graph_model: Asked for the job graph, when it is due, after
+        each poll
+        @type graph_model: trayjenkins.graph.GraphModel
+        @param tree: Refreshed before each poll of the jobs model, which
+        lists the jobs in it
+        @type tree: trayjenkins.tree.JobTree
         """
         QtCore.QObject.__init__(self, parent)
 
-        self._jobs_timer_id = self.startTimer(seconds * 1000)
         self._jobs_model = jobs_model
-        self._jobs_model.update_jobs()
+        self._progress_model = progress_model
+        self._graph_model = graph_model
+        self._tree = tree
+        self._milliseconds = seconds * 1000
+        self._worker = SerialWorker('jenkins-poll') if threaded else None
+        self._fetched.connect(self._on_fetched, QtCore.Qt.QueuedConnection)
+        self._progress_fetched.connect(self._on_progress_fetched, QtCore.Qt.QueuedConnection)
+        self._graph_fetched.connect(self._on_graph_fetched, QtCore.Qt.QueuedConnection)
+        self._tree_fetched.connect(self._on_tree_fetched, QtCore.Qt.QueuedConnection)
+        self._jobs_timer_id = self.startTimer(self._milliseconds)
+        QtCore.QTimer.singleShot(0, self._poll)
+
+    def set_interval(self, seconds):
+        """
+        Starts the new interval from now, without polling.
+        @type seconds: int
+        """
+        self._milliseconds = seconds * 1000
+        self._restart_timer()
+
+    def refresh_now(self):
+        """
+        Polls straight away, or once the poll in flight has finished, and
+        starts the interval again.
+        """
+        self._restart_timer()
+        self._poll()
 
     def timerEvent(self, event):
 
-        if event.timerId() == self._jobs_timer_id:
+        if event.timerId() == self._jobs_timer_id and (self._worker is None or not self._worker.busy()):
+            self._poll()
+
+    def _restart_timer(self):
+
+        self.killTimer(self._jobs_timer_id)
+        self._jobs_timer_id = self.startTimer(self._milliseconds)
+
+    def _poll(self):
+
+        if self._worker is not None and self._tree is not None:
+            self._worker.submit(self._fetch_tree, self._tree.refresh_paths())
+        elif self._worker is not None:
+            self._worker.submit(self._fetch)
+        else:
+            if self._tree is not None:
+                self._tree.refresh()
             self._jobs_model.update_jobs()
+            if self._progress_model is not None:
+                self._progress_model.update()
+            if self._graph_model is not None:
+                self._graph_model.update()
+
+    def _fetch(self):
+
+        self._fetched.emit(self._jobs_model.fetch_jobs())
+        if self._progress_model is not None:
+            self._progress_fetched.emit(self._progress_model.fetch())
+        if self._graph_model is not None:
+            self._graph_fetched.emit(self._graph_model.fetch())
+
+    def _fetch_tree(self, paths):
+
+        self._tree_fetched.emit(self._tree.fetch_folders(paths))
+
+    def _on_fetched(self, fetch):
+
+        self._jobs_model.apply_jobs(fetch)
+
+    def _on_tree_fetched(self, fetches):
+
+        self._tree.apply_refresh(fetches)
+        self._jobs_model.update_jobs()
+
+    def _on_progress_fetched(self, fetch):
+
+        self._progress_model.apply(fetch)
+
+    def _on_graph_fetched(self, fetch):
+
+        self._graph_model.apply(fetch)
+
+
+class FolderExpander(QtCore.QObject):
+
+    _fetched = QtCore.Signal(object)
+
+    def __init__(self, tree, error_logger, parent=None):
+        """
+        Fetches folders as they are first expanded on a worker thread, and
+        applies them to the tree on the GUI thread, so the window does not
+        freeze while Jenkins answers. A folder already being fetched is
+        not asked for again.
+        @type tree: trayjenkins.tree.JobTree
+        @type error_logger: trayjenkins.jobs.IErrorLogger
+        @type parent: PySide.QtCore.QObject
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        self._tree = tree
+        self._error_logger = error_logger
+        self._in_flight = set()
+        self._fetched.connect(self._on_fetched, QtCore.Qt.QueuedConnection)
+
+    def expand(self, path):
+        """
+        @type path: (str)
+        """
+        if not self._tree.needs_fetch(path):
+            self._tree.expand(path)
+        elif path not in self._in_flight:
+            self._in_flight.add(path)
+            thread = threading.Thread(target=self._fetch, args=(path,), name='jenkins-folder')
+            thread.daemon = True
+            thread.start()
+
+    def _fetch(self, path):
+
+        self._fetched.emit(self._tree.fetch_folder(path))
+
+    def _on_fetched(self, fetch):
+
+        self._in_flight.discard(fetch.path)
+        if fetch.error is not None:
+            self._error_logger.log_error('Could not fetch %s: %s' % ('/'.join(fetch.path), fetch.error))
+        self._tree.apply_folder(fetch)
+
+
+class NotificationPump(QtCore.QObject):
+
+    _notified = QtCore.Signal()
+
+    def __init__(self, listener_factory, jobs_model, parent=None):
+        """
+        Moves job changes from Jenkins notifications, which arrive on the
+        listener's thread, into the jobs model on the GUI thread.
+        @param listener_factory: Called as listener_factory(on_notification)
+        @type listener_factory: callable
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type parent: PySide.QtCore.QObject
+        """
+        QtCore.QObject.__init__(self, parent)
+
+        self._jobs_model = jobs_model
+        self._notified.connect(self._on_notified, QtCore.Qt.QueuedConnection)
+        self._listener = listener_factory(self._notified.emit)
+        self._listener.start()
+
+    def _on_notified(self):
+
+        self._listener.apply_pending(self._jobs_model)
+
+
+class FlakyJobPrompt(IFlakyView):
+
+    def ignore_accepted_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._ignore_accepted_event
+
+    def __init__(self, parent):
+        """
+        @type parent: PySide.QtGui.QWidget
+        """
+        self._parent = parent
+        self._ignore_accepted_event = Event()
+        self._boxes = {}
+
+    def offer_ignore(self, job_name, flips):
+        """
+        Shows a question box without blocking, one per job at most.
+        @type job_name: str
+        @type flips: int
+        """
+        if job_name not in self._boxes:
+            box = QtGui.QMessageBox(QtGui.QMessageBox.Question,
+                                    'Flaky job',
+                                    "Job '%s' has flipped between passing and failing %d times recently. "
+                                    "Ignore it?" % (job_name, flips),
+                                    QtGui.QMessageBox.Yes | QtGui.QMessageBox.No,
+                                    self._parent)
+            box.finished.connect(lambda result: self._on_finished(job_name, result))
+            self._boxes[job_name] = box
+            box.show()
+
+    def _on_finished(self, job_name, result):
+
+        self._boxes.pop(job_name).deleteLater()
+        if result == QtGui.QMessageBox.Yes:
+            self._ignore_accepted_event.fire(job_name)
 
 
 class ErrorLogger(IErrorLogger):
 
     def __init__(self, parent):
-        self._message_box = QtGui.QMessageBox(parent)
+        self._parent = parent
+        self._message_box = None
 
     def log_error(self, error):
         """
         @type error: str
         """
+        if self._message_box is None:
+            self._message_box = QtGui.QMessageBox(self._parent)
         self._message_box.setText(error)
         self._message_box.setIcon(QtGui.QMessageBox.Critical)
         self._message_box.exec_()
@@ -1,7 +1,109 @@
-from PySide import QtGui
-from PySide.phonon import Phonon
+from collections import OrderedDict
+
+from PySide import QtCore, QtGui
 from pyjenkins.job import JobStatus
-from trayjenkins.status import IView
+from trayjenkins.status import IBadgeView, IView, UNREACHABLE
+from trayjenkins.metrics import NULL_METRICS
+
+
+# Size the badge and spinner are drawn at; the status icons are scaled up
+# to it so that the count stays legible.
+ICON_SIZE = 32
+
+# Frames in one turn of the building spinner, and milliseconds per frame.
+SPINNER_FRAMES = 8
+SPINNER_MILLISECONDS = 125
+
+
+def compose_icon(base, failing, frame):
+    """
+    Draws a count of failing jobs in the bottom right of the base icon,
+    and a spinner at the given frame in the top left.
+    @type base: PySide.QtGui.QIcon
+    @type failing: int
+    @param frame: Spinner frame, or None for no spinner
+    @type frame: int
+    @rtype: PySide.QtGui.QIcon
+    """
+    pixmap = base.pixmap(ICON_SIZE, ICON_SIZE).scaled(ICON_SIZE,
+                                                      ICON_SIZE,
+                                                      QtCore.Qt.KeepAspectRatio,
+                                                      QtCore.Qt.SmoothTransformation)
+    painter = QtGui.QPainter(pixmap)
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    if failing:
+        badge = QtCore.QRect(ICON_SIZE // 2 - 2, ICON_SIZE // 2 - 2, ICON_SIZE // 2 + 2, ICON_SIZE // 2 + 2)
+        painter.setPen(QtGui.QPen(QtGui.QColor('white'), 1))
+        painter.setBrush(QtGui.QBrush(QtGui.QColor(200, 0, 0)))
+        painter.drawEllipse(badge)
+        font = QtGui.QFont()
+        font.setBold(True)
+        font.setPixelSize(ICON_SIZE // 3 if failing < 10 else ICON_SIZE // 4)
+        painter.setFont(font)
+        painter.drawText(badge, QtCore.Qt.AlignCenter, str(failing) if failing < 100 else '99+')
+    if frame is not None:
+        spinner = QtCore.QRect(1, 1, ICON_SIZE // 2 - 2, ICON_SIZE // 2 - 2)
+        painter.setPen(QtGui.QPen(QtGui.QColor(40, 110, 220), 3))
+        painter.setBrush(QtCore.Qt.NoBrush)
+        # Angles are in sixteenths of a degree, anticlockwise from 3 o'clock.
+        painter.drawArc(spinner, -frame * 16 * 360 // SPINNER_FRAMES, 16 * 270)
+    painter.end()
+
+    return QtGui.QIcon(pixmap)
+
+
+class IconAtlas(object):
+
+    def __init__(self, media_files, capacity=64, compose=compose_icon):
+        """
+        Tray icons by (status, failing count, spinner frame), each loaded
+        or drawn once. The least recently used are dropped beyond capacity,
+        which by default holds every spinner frame for a handful of counts.
+        @type media_files: gui.media.MediaFiles
+        @type capacity: int
+        @type compose: callable
+        """
+        self._media = media_files
+        self._capacity = capacity
+        self._compose = compose
+        self._bases = {}
+        self._icons = OrderedDict()
+        self.composed = 0
+
+    def icon(self, status, failing=0, frame=None):
+        """
+        @param failing: Count to badge the icon with, or 0 for none
+        @type failing: int
+        @param frame: Spinner frame, or None for no spinner
+        @type frame: int
+        @rtype: PySide.QtGui.QIcon
+        """
+        key = (status, failing, frame)
+        result = self._icons.pop(key, None)
+        if result is None:
+            base = self._base(status)
+            if failing or frame is not None:
+                result = self._compose(base, failing, frame)
+                self.composed += 1
+            else:
+                result = base
+        self._icons[key] = result
+        if len(self._icons) > self._capacity:
+            self._icons.popitem(last=False)
+
+        return result
+
+    def _base(self, status):
+
+        if status not in self._bases:
+            if status == JobStatus.FAILING:
+                self._bases[status] = self._media.failing_icon()
+            elif status == JobStatus.OK:
+                self._bases[status] = self._media.ok_icon()
+            else:
+                self._bases[status] = self._media.unknown_icon()
+
+        return self._bases[status]
 
 
 class TrayIconView(object):
@@ -24,30 +126,86 @@ class TrayIconView(object):
         self._trayIcon.setToolTip(tooltip)
         self._trayIcon.showMessage(messageTitle, messageText, messageIcon)
 
+    def updateIcon(self, trayIcon):
+        """
+        Changes the icon alone, without a message.
+        @type trayIcon: QtGui.QIcon
+        """
+        self._trayIcon.setIcon(trayIcon)
+
 
-class TrayIconViewAdapter(IView):
+class TrayIconViewAdapter(IView, IBadgeView):
 
-    def __init__(self, view, mediaFiles):
+    def __init__(self, view, mediaFiles, metrics=NULL_METRICS, atlas=None, spinner_timer=None, view_name=None):
         """
         @type view: gui.status.TrayIconView
         @type mediaFiles: gui.media.MediaFiles
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type atlas: gui.status.IconAtlas
+        @param spinner_timer: Turns the spinner while anything is building;
+        without one there is no spinner
+        @type spinner_timer: PySide.QtCore.QTimer
+        @param view_name: Names the group of jobs shown, in the tooltip and
+        messages, if not all of them
+        @type view_name: str
         """
         self._view = view
-        self._media = mediaFiles
+        self._view_name = view_name
+        self._atlas = IconAtlas(mediaFiles) if atlas is None else atlas
+        self._metrics = metrics
+        self._spinner_timer = spinner_timer
+        self._status = JobStatus.UNKNOWN
+        self._failing = 0
+        self._frame = None
+        if spinner_timer is not None:
+            spinner_timer.timeout.connect(self.advance_frame)
 
     def set_status(self, status, message):
         """
         @type status: str
         @type message: str
         """
+        with self._metrics.timer('view.status'):
+            self._set_status(status, message)
+
+    def set_badge(self, failing, building):
+        """
+        @type failing: int
+        @type building: bool
+        """
+        self._failing = failing
+        if self._spinner_timer is not None:
+            if building and self._frame is None:
+                self._frame = 0
+                self._spinner_timer.start(SPINNER_MILLISECONDS)
+            elif not building and self._frame is not None:
+                self._frame = None
+                self._spinner_timer.stop()
+        self._view.updateIcon(self._icon())
+
+    def advance_frame(self):
+
+        if self._frame is not None:
+            self._frame = (self._frame + 1) % SPINNER_FRAMES
+            self._view.updateIcon(self._icon())
+
+    def _icon(self):
+        """
+        The count is only shown on the failing icon, as it is out of date
+        once Jenkins is unreachable.
+        """
+        failing = self._failing if self._status == JobStatus.FAILING else 0
+        return self._atlas.icon(self._status, failing, self._frame)
+
+    def _set_status(self, status, message):
+
+        self._status = status
         messageIcon = QtGui.QSystemTrayIcon.Information
-        if status is JobStatus.FAILING:
-            trayIcon = self._media.failing_icon()
+        if status == JobStatus.FAILING:
             messageIcon = QtGui.QSystemTrayIcon.Warning
-        elif status is JobStatus.OK:
-            trayIcon = self._media.ok_icon()
-        else:
-            trayIcon = self._media.unknown_icon()
+        elif status == UNREACHABLE:
+            messageIcon = QtGui.QSystemTrayIcon.Warning
+        trayIcon = self._icon()
 
         if status is None:
             tooltip = 'None'
@@ -57,9 +215,14 @@ class TrayIconViewAdapter(IView):
         if message is None:
             message = ''
 
+        title = 'Jenkins status change'
+        if self._view_name is not None:
+            tooltip = '%s: %s' % (self._view_name, tooltip)
+            title = '%s: %s' % (self._view_name, title)
+
         self._view.setIcon(trayIcon,
                            tooltip,
-                           unicode('Jenkins status change'),
+                           unicode(title),
                            unicode(message),
                            messageIcon)
 
@@ -68,29 +231,53 @@ class SoundView(IView):
 
     def __init__(self, parent, mediaFiles):
         """
+        Phonon is only imported, and the audio path only built, when the
+        first sound is played, as it is slow to load and not needed to get
+        the tray icon up.
         @type parent: QtGui.QWidget
         @type mediaFiles: gui.media.MediaFiles
         """
-        self.mediaObject = Phonon.MediaObject(parent)
-        self.audioOutput = Phonon.AudioOutput(Phonon.NotificationCategory, parent)
-        Phonon.createPath(self.mediaObject, self.audioOutput)
+        self._parent = parent
+        self.mediaObject = None
+        self.audioOutput = None
 
-        self._sounds = {
-            JobStatus.FAILING: Phonon.MediaSource(mediaFiles.failing_sound_path()),
-            JobStatus.OK: Phonon.MediaSource(mediaFiles.ok_sound_path()),
+        self._sound_paths = {
+            JobStatus.FAILING: mediaFiles.failing_sound_path(),
+            JobStatus.OK: mediaFiles.ok_sound_path(),
             }
+        self._sounds = {}
 
     def set_status(self, status, message):
         """
         @type status: str
         """
-        sound = self._sounds.get(status, None)
+        sound = self._sound(status)
         if sound is not None:
             self.mediaObject.stop()
             self.mediaObject.clearQueue()
             self.mediaObject.setCurrentSource(sound)
             self.mediaObject.play()
 
+    def _sound(self, status):
+        """
+        @rtype: PySide.phonon.Phonon.MediaSource
+        """
+        result = None
+        path = self._sound_paths.get(status, None)
+        if path is not None:
+            from PySide.phonon import Phonon
+
+            if self.mediaObject is None:
+                self.mediaObject = Phonon.MediaObject(self._parent)
+                self.audioOutput = Phonon.AudioOutput(Phonon.NotificationCategory, self._parent)
+                Phonon.createPath(self.mediaObject, self.audioOutput)
+
+            if status not in self._sounds:
+                self._sounds[status] = Phonon.MediaSource(path)
+            result = self._sounds[status]
+
+        return result
+
 
 class MultiView(IView):
 
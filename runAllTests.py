@@ -1,18 +1,224 @@
 #!/usr/bin/python
+"""
+Runs every test, or those named, spread across worker processes, and
+lists the slowest:
 
-import unittest
+    $ python runAllTests.py
+    $ python runAllTests.py --workers 1 -v tests.trayjenkins.test_jobs
+    $ python runAllTests.py --slowest 20
+
+QT_QPA_PLATFORM=offscreen is set so that the GUI tests need no display,
+for Qt builds that have it; with Qt 4 run under Xvfb instead.
+"""
+import functools
+import multiprocessing
+import os
 import sys
+import time
+import unittest
+from StringIO import StringIO
+from optparse import OptionParser
 
 sys.path.append('submodules/pyjenkins')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
 
 from tests.trayjenkins.EventTests import EventTests  # @UnusedImport
 
+from tests.trayjenkins.test_api import *  # @UnusedWildImport
+from tests.trayjenkins.test_config import *  # @UnusedWildImport
+from tests.trayjenkins.test_flaky import *  # @UnusedWildImport
+from tests.trayjenkins.test_graph import *  # @UnusedWildImport
+from tests.trayjenkins.test_history import *  # @UnusedWildImport
 from tests.trayjenkins.test_jobs import *  # @UnusedWildImport
+from tests.trayjenkins.test_metrics import *  # @UnusedWildImport
+from tests.trayjenkins.test_notify import *  # @UnusedWildImport
+from tests.trayjenkins.test_progress import *  # @UnusedWildImport
+from tests.trayjenkins.test_proxy import *  # @UnusedWildImport
+from tests.trayjenkins.test_replay import *  # @UnusedWildImport
+from tests.trayjenkins.test_resilience import *  # @UnusedWildImport
+from tests.trayjenkins.test_search import *  # @UnusedWildImport
 from tests.trayjenkins.test_settings import *  # @UnusedWildImport
+from tests.trayjenkins.test_singleflight import *  # @UnusedWildImport
 from tests.trayjenkins.test_status import *  # @UnusedWildImport
+from tests.trayjenkins.test_stream import *  # @UnusedWildImport
+from tests.trayjenkins.test_tree import *  # @UnusedWildImport
 
+from tests.gui.test_fake import *  # @UnusedWildImport
 from tests.gui.test_jobs import *  # @UnusedWildImport
 from tests.gui.test_status import *  # @UnusedWildImport
 
+# Qt objects that must outlive the tests.
+_keep_alive = []
+
+
+class _Stream(StringIO):
+
+    def writeln(self, text=''):
+        self.write(text + '\n')
+
+
+class TimedResult(unittest.TextTestResult):
+
+    def __init__(self, stream, verbosity):
+        """
+        Records how long each test takes, as (seconds, test id).
+        """
+        unittest.TextTestResult.__init__(self, stream, True, verbosity)
+        self.timings = []
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.time()
+        unittest.TextTestResult.startTest(self, test)
+
+    def stopTest(self, test):
+        unittest.TextTestResult.stopTest(self, test)
+        self.timings.append((time.time() - self._started, test.id()))
+
+
+class GroupResult(object):
+
+    def __init__(self, result, output):
+        """
+        What a worker sends back: all of it picklable, so no tests.
+        @type result: TimedResult
+        @param output: Progress written while the tests ran
+        @type output: str
+        """
+        self.tests_run = result.testsRun
+        self.failures = [(result.getDescription(test), trace) for test, trace in result.failures]
+        self.errors = [(result.getDescription(test), trace) for test, trace in result.errors]
+        self.skipped = len(result.skipped)
+        self.timings = result.timings
+        self.output = output
+
+
+def test_groups(suite):
+    """
+    Splits the tests into a group per TestCase class, largest first, so
+    that setUpClass runs once and the long groups start soonest.
+    @type suite: unittest.TestSuite
+    @return Test ids in each group
+    @rtype: [[str]]
+    """
+    groups = {}
+    for test in _flatten(suite):
+        groups.setdefault(type(test), []).append(test.id())
+
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def _flatten(suite):
+
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for inner in _flatten(test):
+                yield inner
+        else:
+            yield test
+
+
+def start_qt():
+    """
+    Each process gets its own QApplication, made before any test, for
+    the tests that draw.
+    """
+    if 'PySide.QtGui' in sys.modules:
+        from PySide import QtGui
+        if QtGui.QApplication.instance() is None:
+            _keep_alive.append(QtGui.QApplication([]))
+
+
+def run_group(test_ids, verbosity=1):
+    """
+    @type test_ids: [str]
+    @type verbosity: int
+    @rtype: GroupResult
+    """
+    stream = _Stream()
+    result = TimedResult(stream, verbosity)
+    unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+
+    return GroupResult(result, stream.getvalue())
+
+
+def run(groups, workers, verbosity, out=sys.stdout):
+    """
+    @type groups: [[str]]
+    @return Each group's result, in the order they finished
+    @rtype: [GroupResult]
+    """
+    function = functools.partial(run_group, verbosity=verbosity)
+    results = []
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, start_qt)
+        try:
+            for result in pool.imap_unordered(function, groups):
+                out.write(result.output)
+                out.flush()
+                results.append(result)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        start_qt()
+        for group in groups:
+            result = function(group)
+            out.write(result.output)
+            out.flush()
+            results.append(result)
+
+    return results
+
+
+def report(results, seconds, slowest, out=sys.stdout):
+    """
+    @return Whether every test passed
+    @rtype: bool
+    """
+    separator = '-' * 70
+    failures = [('FAIL', failure) for result in results for failure in result.failures]
+    errors = [('ERROR', error) for result in results for error in result.errors]
+    for flavour, (description, trace) in errors + failures:
+        out.write('\n%s\n%s: %s\n%s\n%s' % ('=' * 70, flavour, description, separator, trace))
+
+    timings = sorted((timing for result in results for timing in result.timings), reverse=True)
+    if slowest and timings:
+        out.write('\n%s\nSlowest %d tests:\n' % (separator, min(slowest, len(timings))))
+        for test_seconds, test_id in timings[:slowest]:
+            out.write('  %7.3fs  %s\n' % (test_seconds, test_id))
+
+    skipped = sum(result.skipped for result in results)
+    out.write('%s\nRan %d tests in %.3fs\n\n' % (separator, sum(result.tests_run for result in results), seconds))
+    if failures or errors:
+        out.write('FAILED (failures=%d, errors=%d)\n' % (len(failures), len(errors)))
+    else:
+        out.write('OK%s\n' % (' (skipped=%d)' % skipped if skipped else ''))
+
+    return not (failures or errors)
+
+
+def main(args):
+
+    parser = OptionParser(usage='usage: %prog [options] [test names]')
+    parser.add_option('-w', '--workers', type='int', default=multiprocessing.cpu_count(),
+                      help='processes to run tests in [default: %default]')
+    parser.add_option('--slowest', type='int', default=10,
+                      help='list this many of the slowest tests [default: %default]')
+    parser.add_option('-v', '--verbose', dest='verbosity', action='store_const', const=2, default=1,
+                      help='name each test as it runs')
+    (options, args) = parser.parse_args(args)
+
+    if args:
+        suite = unittest.defaultTestLoader.loadTestsFromNames(args)
+    else:
+        suite = unittest.defaultTestLoader.loadTestsFromModule(sys.modules[__name__])
+    started = time.time()
+    results = run(test_groups(suite), options.workers, options.verbosity)
+    passed = report(results, time.time() - started, options.slowest)
+
+    return 0 if passed else 1
+
+
 if __name__ == '__main__':
-    unittest.main(testRunner=unittest.TextTestRunner(stream=sys.stdout, verbosity=2))
+    sys.exit(main(sys.argv[1:]))
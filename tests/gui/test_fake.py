@@ -0,0 +1,110 @@
+import threading
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.api import JenkinsApi
+from trayjenkins.stream import StreamingJenkins
+
+from gui.fake import FakeJenkinsServer, FakeJobs, Faults, ScalableJenkins
+
+
+class RecordingSleep(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, seconds):
+        self.calls.append(seconds)
+
+
+class FakeJobsTests(TestCase):
+
+    def test___advance___Random_churn___Same_names_and_some_statuses_changed(self):
+
+        jobs = FakeJobs(1000, flip_rate=0.1)
+        before = jobs.jobs()
+        jobs.advance()
+        after = jobs.jobs()
+
+        self.assertEqual([job.name for job in before], [job.name for job in after])
+        self.assertTrue(0 < sum(1 for one, two in zip(before, after) if one != two) <= 100)
+
+    def test___advance___Same_seed___Same_churn(self):
+
+        one = FakeJobs(100, flip_rate=0.2, seed=7)
+        two = FakeJobs(100, flip_rate=0.2, seed=7)
+        one.advance()
+        two.advance()
+
+        self.assertEqual(one.jobs(), two.jobs())
+
+    def test___advance___Script___Steps_applied_in_turn_then_held(self):
+
+        jobs = FakeJobs(2, script=[{'job-000000': JobStatus.FAILING}, {'job-000000': JobStatus.OK}])
+        statuses = []
+        for unused in range(3):  # @UnusedVariable
+            jobs.advance()
+            statuses.append(jobs.job('job-000000').status)
+
+        self.assertEqual([JobStatus.FAILING, JobStatus.OK, JobStatus.OK], statuses)
+
+
+class FaultsTests(TestCase):
+
+    def test___apply___Latency_and_every_request_slow___Slept_for_both(self):
+
+        sleep = RecordingSleep()
+        Faults(latency=0.5, slow_rate=1, slow_seconds=10, sleep=sleep).apply()
+
+        self.assertEqual([10.5], sleep.calls)
+
+    def test___apply___Error_rate___Roughly_that_fraction_fail(self):
+
+        faults = Faults(error_rate=0.25)
+        failures = sum(1 for unused in range(1000) if faults.apply())  # @UnusedVariable
+
+        self.assertTrue(200 < failures < 300)
+
+
+class ScalableJenkinsTests(TestCase):
+
+    def test___list_jobs___Every_request_fails___IOError(self):
+
+        jenkins = ScalableJenkins(FakeJobs(10), Faults(error_rate=1))
+
+        self.assertRaises(IOError, jenkins.list_jobs)
+
+    def test___disable_job___Known_job___Disabled(self):
+
+        jenkins = ScalableJenkins(FakeJobs(10))
+
+        self.assertTrue(jenkins.disable_job('job-000003'))
+        self.assertEqual(Job('job-000003', JobStatus.DISABLED), jenkins.get_job('job-000003'))
+        self.assertFalse(jenkins.disable_job('spam'))
+
+
+class FakeJenkinsServerTests(TestCase):
+
+    def setUp(self):
+
+        self.jobs = FakeJobs(500, script=[])
+        self.server = FakeJenkinsServer(self.jobs)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.jenkins = StreamingJenkins(JenkinsApi(self.server.url(), timeout=5))
+
+    def tearDown(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test___list_jobs___Streaming_client___All_jobs_with_statuses(self):
+
+        self.assertEqual(self.jobs.jobs(), self.jenkins.list_jobs())
+
+    def test___enable_and_get_job___Streaming_client___Round_trip(self):
+
+        self.assertTrue(self.jenkins.disable_job('job-000042'))
+        self.assertEqual(Job('job-000042', JobStatus.DISABLED), self.jenkins.get_job('job-000042'))
+        self.assertFalse(self.jenkins.enable_job('spam'))
@@ -7,6 +7,8 @@ import trayjenkins.jobs
 import pyjenkins.job
 from trayjenkins.event import Event
 from trayjenkins.jobs import JobModel
+from trayjenkins.progress import BuildProgress
+from trayjenkins.tree import TreeNode
 from pyjenkins.job import Job, JobStatus
 
 
@@ -19,6 +21,18 @@ class MockQMenu(object):
         pass
 
 
+class MockQListWidgetItem(object):
+
+    def setText(self, text):
+        pass
+
+    def setToolTip(self, text):
+        pass
+
+    def setIcon(self, icon):
+        pass
+
+
 class ContextMenuFactoryTests(TestCase):
 
     def setUp(self):
@@ -217,6 +231,73 @@ class ListViewAdapterTests(TestCase):
 
         mox.Verify(self.view)
 
+    def test___set_jobs___Job_describer_given___Item_tooltip_set_from_describer(self):
+
+        item = self.mocks.CreateMock(MockQListWidgetItem)
+        item.setToolTip('Failing for 2h')
+        self.qtgui.QListWidgetItem('failing icon', 'john').AndReturn(item)
+        self.view.right_click_event().InAnyOrder().AndReturn(Event())
+        self.view.set_list([item])
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.ListViewAdapter(self.view,
+                                           self.media,
+                                           self.menu_factory,
+                                           self.qtgui,
+                                           job_describer={'john': 'Failing for 2h'}.get)
+        adapter.set_jobs([JobModel(Job('john', pyjenkins.job.JobStatus.FAILING), False)])
+
+        mox.Verify(item)
+
+    def test___update_job___Job_listed___Only_its_icon_changed(self):
+
+        item = self.mocks.CreateMock(MockQListWidgetItem)
+        self.qtgui.QListWidgetItem('ok icon', 'john').AndReturn(item)
+        self.view.right_click_event().InAnyOrder().AndReturn(Event())
+        self.view.set_list([item])
+        item.setIcon('failing icon')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.ListViewAdapter(self.view, self.media, self.menu_factory, self.qtgui)
+        adapter.set_jobs([JobModel(Job('john', pyjenkins.job.JobStatus.OK), False)])
+        adapter.update_job(JobModel(Job('john', pyjenkins.job.JobStatus.FAILING), False))
+
+        mox.Verify(item)
+        mox.Verify(self.view)
+
+    def test___update_job___Job_not_listed___Item_added_to_view(self):
+
+        self.view.right_click_event().InAnyOrder().AndReturn(Event())
+        self.view.set_list([])
+        self.qtgui.QListWidgetItem('ignored icon', 'terry').AndReturn('item for terry')
+        self.view.add_item('item for terry')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.ListViewAdapter(self.view, self.media, self.menu_factory, self.qtgui)
+        adapter.set_jobs([])
+        adapter.update_job(JobModel(Job('terry', pyjenkins.job.JobStatus.OK), True))
+
+        mox.Verify(self.view)
+
+    def test___set_progress___Build_starts_then_finishes___Percent_shown_then_name_restored(self):
+
+        item = self.mocks.CreateMock(MockQListWidgetItem)
+        self.qtgui.QListWidgetItem('failing icon', 'john').AndReturn(item)
+        self.view.right_click_event().InAnyOrder().AndReturn(Event())
+        self.view.set_list([item])
+        item.setText('john  (25%)')
+        item.setToolTip('Building #42: 25%, about 7m left')
+        item.setText('john')
+        item.setToolTip('')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.ListViewAdapter(self.view, self.media, self.menu_factory, self.qtgui, clock=lambda: 1150)
+        adapter.set_jobs([JobModel(Job('john', pyjenkins.job.JobStatus.FAILING), False)])
+        adapter.set_progress({'john': BuildProgress('john', 42, 1000, 600)})
+        adapter.set_progress({})
+
+        mox.Verify(item)
+
     def test_constructor___View_fires_right_click_event___Show_menu_at_correct_coordinates(self):
 
         right_click_event = Event()
@@ -328,3 +409,143 @@ class ListViewAdapterTests(TestCase):
         self.qtgui.QListWidgetItem(mox.IgnoreArg(), mox.IgnoreArg()).AndReturn('whatever')
         self.qtgui.QListWidgetItem(mox.IgnoreArg(), mox.IgnoreArg()).AndReturn('whatever')
         self.view.set_list(mox.IgnoreArg()).InAnyOrder()
+
+
+class TreeViewAdapterTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.view = self.mocks.CreateMock(gui.jobs.TreeView)
+        self.media = self.mocks.CreateMock(gui.media.MediaFiles)
+        self.menu_factory = self.mocks.CreateMock(gui.jobs.ContextMenuFactory)
+        self.right_click_event = Event()
+
+        self.media.disabled_icon().InAnyOrder().AndReturn('disabled icon')
+        self.media.failing_icon().InAnyOrder().AndReturn('failing icon')
+        self.media.ignored_icon().InAnyOrder().AndReturn('ignored icon')
+        self.media.ok_icon().InAnyOrder().AndReturn('ok icon')
+        self.media.unknown_icon().InAnyOrder().AndReturn('unknown icon')
+        self.view.right_click_event().InAnyOrder().AndReturn(self.right_click_event)
+
+    def test___set_children___Folder_and_job___Rows_with_status_icons_passed_to_view(self):
+
+        folder = TreeNode(('team',), True, JobStatus.FAILING)
+        job = TreeNode(('nightly',), False, JobStatus.OK)
+        self.view.set_children((), [(('team',), 'failing icon', True), (('nightly',), 'ok icon', False)])
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.TreeViewAdapter(self.view, self.media, self.menu_factory)
+        adapter.set_children((), [folder, job])
+
+        mox.Verify(self.view)
+
+    def test___update_nodes___Job_changed___View_icon_updated(self):
+
+        self.view.set_icon(('team', 'lint'), 'disabled icon')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.TreeViewAdapter(self.view, self.media, self.menu_factory)
+        adapter.update_nodes([TreeNode(('team', 'lint'), False, JobStatus.DISABLED)])
+
+        mox.Verify(self.view)
+
+    def test___set_jobs___Job_newly_ignored___Only_that_job_redrawn_with_ignored_icon(self):
+
+        self.view.set_icon(('team', 'lint'), 'ignored icon')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.TreeViewAdapter(self.view, self.media, self.menu_factory)
+        adapter.set_jobs([JobModel(Job('team/lint', JobStatus.OK), True),
+                          JobModel(Job('nightly', JobStatus.OK), False)])
+
+        mox.Verify(self.view)
+
+    def test___right_click___Job_path___Menu_for_job_model_fires_events_with_job_name(self):
+
+        menu = self.mocks.CreateMock(MockQMenu)
+        menu_factory = MockMenuFactory(menu)
+        mock_event_handler = MockEventHandler()
+        menu.popup('screen coordinates')
+        self.mocks.ReplayAll()
+
+        adapter = gui.jobs.TreeViewAdapter(self.view, self.media, menu_factory)
+        adapter.job_disabled_event().register(mock_event_handler)
+        adapter.set_jobs([JobModel(Job('team/lint', JobStatus.OK), False)])
+        self.right_click_event.fire(('team', 'lint'), 'screen coordinates')
+        menu_factory.disable_callback()
+
+        self.assertEqual('team/lint', mock_event_handler.argument)
+
+
+class DeferredViewTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.view = self.mocks.CreateMock(trayjenkins.jobs.IView)
+        self.ignored_event = Event()
+        self.view.job_ignored_event().InAnyOrder().AndReturn(self.ignored_event)
+        self.view.job_unignored_event().InAnyOrder().AndReturn(Event())
+        self.view.job_enabled_event().InAnyOrder().AndReturn(Event())
+        self.view.job_disabled_event().InAnyOrder().AndReturn(Event())
+
+    def test___attach___Jobs_set_before_attach___Latest_jobs_passed_to_view(self):
+
+        self.view.set_jobs('latest jobs')
+        self.mocks.ReplayAll()
+
+        deferred = gui.jobs.DeferredView()
+        deferred.set_jobs('old jobs')
+        deferred.set_jobs('latest jobs')
+        deferred.attach(self.view)
+
+        mox.Verify(self.view)
+
+    def test___attach___Job_updated_before_attach___Latest_update_passed_to_view_after_jobs(self):
+
+        spam = JobModel(Job('spam', pyjenkins.job.JobStatus.OK), False)
+        failing = JobModel(Job('spam', pyjenkins.job.JobStatus.FAILING), False)
+        self.view.set_jobs([spam])
+        self.view.update_job(failing)
+        self.mocks.ReplayAll()
+
+        deferred = gui.jobs.DeferredView()
+        deferred.set_jobs([spam])
+        deferred.update_job(JobModel(Job('spam', pyjenkins.job.JobStatus.DISABLED), False, True))
+        deferred.update_job(failing)
+        deferred.attach(self.view)
+
+        mox.Verify(self.view)
+
+    def test___attach___No_jobs_set___View_set_jobs_not_called(self):
+
+        self.mocks.ReplayAll()
+
+        deferred = gui.jobs.DeferredView()
+        deferred.attach(self.view)
+
+        mox.Verify(self.view)
+
+    def test___set_jobs___After_attach___Jobs_passed_straight_to_view(self):
+
+        self.view.set_jobs('jobs')
+        self.mocks.ReplayAll()
+
+        deferred = gui.jobs.DeferredView()
+        deferred.attach(self.view)
+        deferred.set_jobs('jobs')
+
+        mox.Verify(self.view)
+
+    def test___attach___View_fires_job_ignored_event___Deferred_view_fires_job_ignored_event(self):
+
+        handler = MockEventHandler()
+        self.mocks.ReplayAll()
+
+        deferred = gui.jobs.DeferredView()
+        deferred.job_ignored_event().register(handler)
+        deferred.attach(self.view)
+        self.ignored_event.fire('spam')
+
+        self.assertEqual('spam', handler.argument)
@@ -50,6 +50,21 @@ class TrayIconViewAdapterTests(TestCase):
 
         mox.Verify(self.view)
 
+    def test__set_status__ViewName_NamedInTooltipAndTitle(self):
+
+        self.view.setIcon('failing.png',
+                          'release: Failing',
+                          u'release: Jenkins status change',
+                          u'fail message',
+                          QtGui.QSystemTrayIcon.Warning)
+
+        self.mocks.ReplayAll()
+
+        adapter = gui.status.TrayIconViewAdapter(self.view, self.media, view_name='release')
+        adapter.set_status(JobStatus.FAILING, 'fail message')
+
+        mox.Verify(self.view)
+
     def test__set_status__UnknownStatus_PassCorrectArgumentsToView(self):
 
         self.view.setIcon('unknown.png',
@@ -109,3 +124,111 @@ class TrayIconViewAdapterTests(TestCase):
         adapter.set_status('shrubbery', None)
 
         mox.Verify(self.view)
+
+    def test__set_badge__FailingWithCount_ViewIconUpdatedWithComposedIcon(self):
+
+        atlas = gui.status.IconAtlas(self.media, compose=lambda base, failing, frame: (base, failing, frame))
+        self.view.setIcon(mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg())
+        self.view.updateIcon(('failing.png', 3, None))
+        self.mocks.ReplayAll()
+
+        adapter = gui.status.TrayIconViewAdapter(self.view, self.media, atlas=atlas)
+        adapter.set_status(JobStatus.FAILING, 'fail message')
+        adapter.set_badge(3, False)
+
+        mox.Verify(self.view)
+
+    def test__set_badge__Building_SpinnerTurnsUntilBuildsFinish(self):
+
+        atlas = gui.status.IconAtlas(self.media, compose=lambda base, failing, frame: (base, failing, frame))
+        timer = StubTimer()
+        self.view.setIcon('ok.png', mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg())
+        self.view.updateIcon(('ok.png', 0, 0))
+        self.view.updateIcon(('ok.png', 0, 1))
+        self.view.updateIcon('ok.png')
+        self.mocks.ReplayAll()
+
+        adapter = gui.status.TrayIconViewAdapter(self.view, self.media, atlas=atlas, spinner_timer=timer)
+        adapter.set_status(JobStatus.OK, 'All active jobs pass')
+        adapter.set_badge(0, True)
+        timer.timeout.fire()
+        adapter.set_badge(0, False)
+        timer.timeout.fire()
+
+        mox.Verify(self.view)
+        self.assertEqual([gui.status.SPINNER_MILLISECONDS, 'stopped'], timer.calls)
+
+
+class StubSignal(object):
+
+    def connect(self, slot):
+        self.slot = slot
+
+    def fire(self):
+        self.slot()
+
+
+class StubTimer(object):
+
+    def __init__(self):
+        self.timeout = StubSignal()
+        self.calls = []
+
+    def start(self, milliseconds):
+        self.calls.append(milliseconds)
+
+    def stop(self):
+        self.calls.append('stopped')
+
+
+class IconAtlasTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.media = self.mocks.CreateMock(gui.media.MediaFiles)
+        self.composed = []
+
+    def compose(self, base, failing, frame):
+
+        self.composed.append((base, failing, frame))
+        return 'icon %s %d %r' % (base, failing, frame)
+
+    def test__icon__SameKeyTwice_ComposedOnceAndBaseLoadedOnce(self):
+
+        self.media.failing_icon().AndReturn('failing.png')
+        self.mocks.ReplayAll()
+
+        atlas = gui.status.IconAtlas(self.media, compose=self.compose)
+        first = atlas.icon(JobStatus.FAILING, 3, 0)
+        second = atlas.icon(JobStatus.FAILING, 3, 0)
+        atlas.icon(JobStatus.FAILING, 4, 0)
+
+        mox.Verify(self.media)
+        self.assertEqual(first, second)
+        self.assertEqual([('failing.png', 3, 0), ('failing.png', 4, 0)], self.composed)
+
+    def test__icon__NoCountOrSpinner_BaseIconNotComposed(self):
+
+        self.media.ok_icon().AndReturn('ok.png')
+        self.mocks.ReplayAll()
+
+        atlas = gui.status.IconAtlas(self.media, compose=self.compose)
+
+        self.assertEqual('ok.png', atlas.icon(JobStatus.OK))
+        self.assertEqual([], self.composed)
+
+    def test__icon__OverCapacity_LeastRecentlyUsedComposedAgain(self):
+
+        self.media.failing_icon().AndReturn('failing.png')
+        self.mocks.ReplayAll()
+
+        atlas = gui.status.IconAtlas(self.media, capacity=2, compose=self.compose)
+        atlas.icon(JobStatus.FAILING, 1)
+        atlas.icon(JobStatus.FAILING, 2)
+        atlas.icon(JobStatus.FAILING, 1)
+        atlas.icon(JobStatus.FAILING, 3)
+        atlas.icon(JobStatus.FAILING, 1)
+        atlas.icon(JobStatus.FAILING, 2)
+
+        self.assertEqual([1, 2, 3, 2], [failing for base, failing, frame in self.composed])
@@ -0,0 +1,95 @@
+"""
+Hand-written stand-ins shared by the model tests, for collaborators that
+are fed or read back over many calls, where a mox script would only
+restate the test.
+"""
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.event import Event
+from trayjenkins.jobs import JobModel, JobsDelta
+
+
+def job_model(name, status=JobStatus.OK, ignored=False):
+    return JobModel(Job(name, status), ignored)
+
+
+class RecordingHandler(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args)
+
+
+class FakeClock(object):
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StubJobsModel(object):
+
+    def __init__(self, updated_event=None, delta_event=None):
+        self.updated_event = Event() if updated_event is None else updated_event
+        self.delta_event = Event() if delta_event is None else delta_event
+        self.unreachable_event = Event()
+        self.models = []
+
+    def job_models(self):
+        return self.models
+
+    def jobs_updated_event(self):
+        return self.updated_event
+
+    def jobs_delta_event(self):
+        return self.delta_event
+
+    def server_unreachable_event(self):
+        return self.unreachable_event
+
+    def fire_delta(self, changed, removed=()):
+        self.delta_event.fire(JobsDelta(list(changed), list(removed)))
+
+
+class StubJenkins(object):
+    """
+    Answers each list_jobs with the next of the given results, raising
+    those that are exceptions; the last answer is kept for later calls.
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.list_count = 0
+        self.disabled = []
+
+    def list_jobs(self):
+        self.list_count += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def disable_job(self, job_name):
+        self.disabled.append(job_name)
+        return True
+
+
+class StubGraphSource(object):
+
+    def __init__(self, upstreams):
+        self.upstreams = upstreams
+        self.fetches = 0
+
+    def job_upstreams(self):
+        self.fetches += 1
+        if isinstance(self.upstreams, Exception):
+            raise self.upstreams
+        return self.upstreams
@@ -0,0 +1,72 @@
+from StringIO import StringIO
+from unittest import TestCase
+import urllib2
+
+from pyjenkins.job import JobStatus
+from trayjenkins.api import JenkinsApi, job_path, status_from_colour
+
+
+class StubUrlOpen(object):
+
+    def __init__(self, body='{}', error=None):
+        self.body = body
+        self.error = error
+        self.requests = []
+
+    def __call__(self, request, timeout):
+        self.requests.append((request, timeout))
+        if self.error is not None:
+            raise self.error
+        return StringIO(self.body)
+
+
+class StatusFromColourTests(TestCase):
+
+    def test___status_from_colour___Each_colour___Mapped_to_status(self):
+
+        self.assertEqual(JobStatus.OK, status_from_colour('blue'))
+        self.assertEqual(JobStatus.FAILING, status_from_colour('red'))
+        self.assertEqual(JobStatus.FAILING, status_from_colour('yellow'))
+        self.assertEqual(JobStatus.DISABLED, status_from_colour('disabled'))
+        self.assertEqual(JobStatus.UNKNOWN, status_from_colour('notbuilt'))
+        self.assertEqual(JobStatus.UNKNOWN, status_from_colour(None))
+
+    def test___status_from_colour___Building___Status_of_last_build(self):
+
+        self.assertEqual(JobStatus.FAILING, status_from_colour('red_anime'))
+
+
+class JobPathTests(TestCase):
+
+    def test___job_path___Root___Empty(self):
+
+        self.assertEqual('', job_path(()))
+
+    def test___job_path___Branch_with_slash___Quoted(self):
+
+        self.assertEqual('/job/app/job/feature%2Fx', job_path(('app', 'feature/x')))
+
+
+class JenkinsApiTests(TestCase):
+
+    def test___get_json___Tree_given___Url_has_tree_query_and_body_parsed(self):
+
+        urlopen = StubUrlOpen('{"jobs": []}')
+        result = JenkinsApi('http://jenkins/', urlopen=urlopen).get_json('/api/json', 'jobs[name]')
+
+        self.assertEqual({'jobs': []}, result)
+        self.assertEqual('http://jenkins/api/json?tree=jobs%5Bname%5D', urlopen.requests[0][0].get_full_url())
+
+    def test___open___Username_given___Basic_authorization_sent(self):
+
+        urlopen = StubUrlOpen()
+        JenkinsApi('http://jenkins', 'arthur', 'grail', urlopen=urlopen).open('/api/json')
+
+        self.assertEqual('Basic YXJ0aHVyOmdyYWls', urlopen.requests[0][0].get_header('Authorization'))
+
+    def test___post___Jenkins_refuses___False(self):
+
+        urlopen = StubUrlOpen(error=urllib2.HTTPError('http://jenkins', 403, 'Forbidden', {}, None))
+        result = JenkinsApi('http://jenkins', urlopen=urlopen).post('/job/spam/enable')
+
+        self.assertFalse(result)
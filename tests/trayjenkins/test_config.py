@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from trayjenkins.config import ConfigError, ConfigFile, SettingsReloader, environment_values, to_bool, \
+    to_patterns, to_views
+from trayjenkins.settings import LayeredSettings, Settings
+from tests.trayjenkins.fakes import RecordingHandler
+
+
+class ConversionTests(TestCase):
+
+    def test___to_bool___Usual_spellings___Converted(self):
+
+        self.assertEqual([True, True, False, False], [to_bool(value) for value in ['yes', 'On', '0', 'false']])
+        self.assertRaises(ValueError, to_bool, 'maybe')
+
+    def test___to_patterns___Spaces_and_empty_patterns___Dropped(self):
+
+        self.assertEqual(('spam-*', 'eggs'), to_patterns(' spam-* ,, eggs '))
+
+    def test___to_views___Names_and_patterns___Pairs_in_order(self):
+
+        self.assertEqual((('team', ('team-*', 'lib-*')), ('release', ('release-*',))),
+                         to_views('team = team-*, lib-* ; release=release-*;'))
+
+    def test___to_views___View_without_patterns___ValueError(self):
+
+        self.assertRaises(ValueError, to_views, 'team=')
+
+    def test___environment_values___Only_prefixed_variables___Lower_case_names(self):
+
+        self.assertEqual({'poll_interval': '30'},
+                         environment_values({'TRAYJENKINS_POLL_INTERVAL': '30', 'HOME': '/home/arthur'}))
+
+
+class ConfigFileTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trayjenkins.ini')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+
+        with open(self.path, 'w') as config:
+            config.write(text)
+
+    def test___values___No_file___Empty(self):
+
+        self.assertEqual({}, ConfigFile(self.path).values())
+
+    def test___values___Not_an_ini_file___ConfigError(self):
+
+        self.write('host: http://jenkins\n')
+
+        self.assertRaises(ConfigError, ConfigFile(self.path).values)
+
+    def test___changed___File_created_then_written___Changed_until_read(self):
+
+        config = ConfigFile(self.path)
+        config.values()
+        self.write('[trayjenkins]\nhost = http://jenkins\n')
+
+        self.assertTrue(config.changed())
+        config.values()
+        self.assertFalse(config.changed())
+        self.write('[trayjenkins]\nhost = http://jenkins\npoll_interval = 30\n')
+        self.assertTrue(config.changed())
+
+
+class SettingsReloaderTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trayjenkins.ini')
+        self.write('[trayjenkins]\nhost = http://jenkins\n')
+        self.layers = LayeredSettings({'username': 'arthur'}, {}, ConfigFile(self.path))
+        self.reloader = SettingsReloader(self.layers, self.layers.settings())
+        self.handler = RecordingHandler()
+        self.reloader.settings_changed_event().register(self.handler)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def write(self, text):
+
+        with open(self.path, 'w') as config:
+            config.write(text)
+
+    def test___check___File_unchanged___Nothing_fired(self):
+
+        self.assertEqual(None, self.reloader.check())
+        self.assertEqual([], self.handler.calls)
+
+    def test___check___File_changed___Fired_with_old_and_new_settings_keeping_command_line(self):
+
+        self.write('[trayjenkins]\nhost = http://jenkins\npoll_interval = 60\n')
+        self.reloader.check()
+
+        self.assertEqual([(Settings('http://jenkins', username='arthur'),
+                           Settings('http://jenkins', username='arthur', poll_interval=60))], self.handler.calls)
+
+    def test___check___File_broken___Error_returned_and_settings_kept(self):
+
+        self.write('[trayjenkins]\nhost = http://jenkins\npoll_interval = often\n')
+
+        self.assertTrue('poll_interval' in self.reloader.check())
+        self.assertEqual([], self.handler.calls)
@@ -0,0 +1,123 @@
+import mox
+from unittest import TestCase
+
+from pyjenkins.job import JobStatus
+from trayjenkins.event import Event
+from trayjenkins.flaky import FlakyDetector, FlakyPresenter, IFlakyView
+from trayjenkins.jobs import IModel
+from tests.trayjenkins.fakes import FakeClock, RecordingHandler, StubJobsModel, job_model
+
+HOUR = 60 * 60
+
+
+class FlakyDetectorTests(TestCase):
+
+    def setUp(self):
+
+        self.jobs_model = StubJobsModel()
+        self.clock = FakeClock(1000 * HOUR)
+        self.detector = FlakyDetector(self.jobs_model, window_seconds=24 * HOUR, threshold=4, clock=self.clock)
+        self.handler = RecordingHandler()
+        self.detector.flaky_job_event().register(self.handler)
+
+    def flip(self, name, times, hours_apart=1, ignored=False):
+
+        statuses = [JobStatus.OK, JobStatus.FAILING]
+        for flip in range(times + 1):
+            self.jobs_model.fire_delta([job_model(name, statuses[flip % 2], ignored)])
+            self.clock.now += hours_apart * HOUR
+
+    def test___Job_flips_threshold_times___Flaky_job_event_fired_once(self):
+
+        self.flip('spam', 5)
+
+        self.assertEqual([('spam', 4)], self.handler.calls)
+
+    def test___Job_flips_below_threshold___No_event(self):
+
+        self.flip('spam', 3)
+
+        self.assertEqual([], self.handler.calls)
+        self.assertEqual(3, self.detector.flips('spam'))
+
+    def test___Flips_spread_wider_than_window___No_event(self):
+
+        self.flip('spam', 6, hours_apart=10)
+
+        self.assertEqual([], self.handler.calls)
+
+    def test___flips___Window_passed_since_last_flip___Zero(self):
+
+        self.flip('spam', 3)
+        self.clock.now += 25 * HOUR
+
+        self.assertEqual(0, self.detector.flips('spam'))
+
+    def test___Disabled_and_unknown_between_results___Not_counted_as_flips(self):
+
+        for status in [JobStatus.OK, JobStatus.DISABLED, JobStatus.OK, JobStatus.UNKNOWN, JobStatus.OK]:
+            self.jobs_model.fire_delta([job_model('spam', status)])
+
+        self.assertEqual(0, self.detector.flips('spam'))
+
+    def test___Ignored_job_flips___No_event(self):
+
+        self.flip('spam', 5, ignored=True)
+
+        self.assertEqual([], self.handler.calls)
+
+    def test___Job_settles_then_flaky_again___Event_fired_again(self):
+
+        self.flip('spam', 4)
+        self.clock.now += 48 * HOUR
+        self.flip('spam', 4)
+
+        self.assertEqual(2, len(self.handler.calls))
+
+    def test___Job_removed___Window_forgotten(self):
+
+        self.flip('spam', 3)
+        self.jobs_model.fire_delta([], ['spam'])
+
+        self.assertEqual(0, self.detector.flips('spam'))
+
+
+class FlakyPresenterTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.jobs_model = self.mocks.CreateMock(IModel)
+        self.view = self.mocks.CreateMock(IFlakyView)
+        self.flaky_event = Event()
+        self.accepted_event = Event()
+        self.view.ignore_accepted_event().AndReturn(self.accepted_event)
+
+    def presenter(self):
+
+        class Detector(object):
+            def flaky_job_event(inner):  # @NoSelf
+                return self.flaky_event
+
+        return FlakyPresenter(Detector(), self.jobs_model, self.view)
+
+    def test___Detector_flags_job_twice___Offered_once(self):
+
+        self.view.offer_ignore('spam', 4)
+        self.mocks.ReplayAll()
+
+        presenter = self.presenter()  # @UnusedVariable
+        self.flaky_event.fire('spam', 4)
+        self.flaky_event.fire('spam', 5)
+
+        mox.Verify(self.view)
+
+    def test___View_accepts_ignore___Job_ignored_in_model(self):
+
+        self.jobs_model.ignore_job('spam')
+        self.mocks.ReplayAll()
+
+        presenter = self.presenter()  # @UnusedVariable
+        self.accepted_event.fire('spam')
+
+        mox.Verify(self.jobs_model)
@@ -0,0 +1,112 @@
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.errors import ServerUnreachableError
+from trayjenkins.graph import GraphModel, JobGraph
+from trayjenkins.jobs import JobModel, JobsDelta
+from trayjenkins.metrics import Metrics
+from tests.trayjenkins.fakes import FakeClock, RecordingHandler, StubGraphSource, StubJobsModel
+
+
+class JobGraphTests(TestCase):
+
+    def setUp(self):
+
+        self.graph = JobGraph()
+        self.graph.update({'compile': (),
+                           'test': ('compile',),
+                           'package': ('test',),
+                           'docs': ('compile',),
+                           'lint': ()})
+
+    def test___update___Upstream_changed___Downstream_follows(self):
+
+        self.graph.update({'compile': (), 'test': ('lint',), 'package': ('test',), 'lint': ()})
+
+        self.assertEqual((frozenset(), frozenset(['test']), False),
+                         (self.graph.downstream('compile'), self.graph.downstream('lint'), 'docs' in self.graph))
+
+    def test___update___Same_graph___Nothing_changed(self):
+
+        self.assertFalse(self.graph.update({'compile': (),
+                                            'test': ('compile',),
+                                            'package': ('test',),
+                                            'docs': ('compile',),
+                                            'lint': ()}))
+
+    def test___root_causes___Downstream_failing___Attributed_to_root(self):
+
+        result = self.graph.root_causes(['package', 'test', 'lint', 'compile'])
+
+        self.assertEqual([('lint', []), ('compile', ['test', 'package'])], result)
+
+    def test___root_causes___Passing_job_between___Not_attributed_through_it(self):
+
+        result = self.graph.root_causes(['package', 'compile'])
+
+        self.assertEqual([('package', []), ('compile', [])], result)
+
+    def test___root_causes___Failing_cycle___First_given_is_root(self):
+
+        self.graph.update({'spam': ('eggs',), 'eggs': ('spam',)})
+
+        self.assertEqual([('eggs', ['spam'])], self.graph.root_causes(['eggs', 'spam']))
+
+
+class GraphModelTests(TestCase):
+
+    def setUp(self):
+
+        self.source = StubGraphSource({'compile': (), 'test': ('compile',)})
+        self.clock = FakeClock()
+        self.jobs_model = StubJobsModel()
+        self.handler = RecordingHandler()
+        self.model = GraphModel(self.source, self.jobs_model, refresh_seconds=600, clock=self.clock)
+        self.model.graph_changed_event().register(self.handler)
+
+    def test___update___Not_due___Not_fetched_again(self):
+
+        self.model.update()
+        self.clock.now += 599
+        self.model.update()
+
+        self.assertEqual((1, 1), (self.source.fetches, len(self.handler.calls)))
+        self.assertEqual(frozenset(['test']), self.model.graph().downstream('compile'))
+
+    def test___update___New_job_listed___Fetched_before_due(self):
+
+        self.model.update()
+        self.jobs_model.delta_event.fire(JobsDelta([JobModel(Job('package', JobStatus.OK), False)], []))
+        self.model.update()
+
+        self.assertEqual(2, self.source.fetches)
+
+    def test___update___Job_removed___Dropped_without_fetching(self):
+
+        self.model.update()
+        self.jobs_model.delta_event.fire(JobsDelta([], ['test']))
+
+        self.assertEqual((False, 2), ('test' in self.model.graph(), len(self.handler.calls)))
+
+    def test___update___Jenkins_unreachable___Counted_and_asked_again_after_retry_delay(self):
+
+        metrics = Metrics()
+        self.source.upstreams = ServerUnreachableError('down')
+        model = GraphModel(self.source, clock=self.clock, metrics=metrics, retry_seconds=60)
+        model.update()
+        self.clock.now += 59
+        model.update()
+        self.clock.now += 1
+        model.update()
+
+        self.assertEqual(2, self.source.fetches)
+        self.assertEqual(2, metrics.snapshot()['counters']['errors.job_upstreams'])
+
+    def test___fetch___Bad_reply___Error_returned(self):
+
+        error = TypeError("'NoneType' object is not iterable")
+        self.source.upstreams = error
+
+        fetch = self.model.fetch()
+
+        self.assertEqual((None, error), (fetch.upstreams, fetch.error))
@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.history import HistoryStore, HistoryRecorder, SECONDS_PER_DAY, format_duration
+from trayjenkins.jobs import JobModel, JobsDelta
+from tests.trayjenkins.fakes import StubJobsModel
+
+
+class HistoryStoreTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.store = HistoryStore(self.directory)
+
+    def tearDown(self):
+
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+
+        self.store.close()
+        self.store = HistoryStore(self.directory)
+
+    def test___record___Same_status_twice___Only_first_recorded(self):
+
+        self.assertTrue(self.store.record('spam', JobStatus.OK, 100))
+        self.assertFalse(self.store.record('spam', JobStatus.OK, 200))
+
+        self.assertEqual([(100, JobStatus.OK)], self.store.transitions('spam'))
+
+    def test___transitions___After_reopening___Same_transitions(self):
+
+        self.store.record('spam', JobStatus.OK, 100)
+        self.store.record('eggs', JobStatus.FAILING, 150)
+        self.store.record('spam', JobStatus.FAILING, 200)
+        self.reopen()
+
+        self.assertEqual([(100, JobStatus.OK), (200, JobStatus.FAILING)], self.store.transitions('spam'))
+        self.assertEqual([(150, JobStatus.FAILING)], self.store.transitions('eggs'))
+        self.assertEqual(JobStatus.FAILING, self.store.status('spam'))
+
+    def test___record___After_reopening___Unchanged_status_not_recorded(self):
+
+        self.store.record('spam', JobStatus.OK, 100)
+        self.reopen()
+
+        self.assertFalse(self.store.record('spam', JobStatus.OK, 200))
+
+    def test___time_since_last_green___Currently_ok___Return_zero(self):
+
+        self.store.record('spam', JobStatus.FAILING, 100)
+        self.store.record('spam', JobStatus.OK, 200)
+
+        self.assertEqual(0, self.store.time_since_last_green('spam', now=1000))
+
+    def test___time_since_last_green___Failing_then_disabled_since_ok___Time_since_left_ok(self):
+
+        self.store.record('spam', JobStatus.OK, 100)
+        self.store.record('spam', JobStatus.FAILING, 200)
+        self.store.record('spam', JobStatus.DISABLED, 300)
+
+        self.assertEqual(800, self.store.time_since_last_green('spam', now=1000))
+
+    def test___time_since_last_green___Never_ok___Return_None(self):
+
+        self.store.record('spam', JobStatus.FAILING, 100)
+
+        self.assertEqual(None, self.store.time_since_last_green('spam', now=1000))
+        self.assertEqual(None, self.store.time_since_last_green('unheard of', now=1000))
+
+    def test___flip_rate___Flips_inside_and_outside_window___Only_window_counted(self):
+
+        now = 30 * SECONDS_PER_DAY
+        statuses = [JobStatus.OK, JobStatus.FAILING] * 10
+        for day, status in enumerate(statuses):
+            self.store.record('spam', status, now - (len(statuses) - day) * SECONDS_PER_DAY + 1)
+
+        result = self.store.flip_rate('spam', window_seconds=7 * SECONDS_PER_DAY, now=now)
+
+        self.assertEqual(1.0, result)
+
+    def test___flip_rate___Disabled_in_between___Not_counted_as_flips(self):
+
+        self.store.record('spam', JobStatus.OK, 100)
+        self.store.record('spam', JobStatus.DISABLED, 200)
+        self.store.record('spam', JobStatus.OK, 300)
+
+        self.assertEqual(0.0, self.store.flip_rate('spam', now=1000))
+
+    def test___Reopen___Partial_record_at_end___Dropped_and_appends_still_readable(self):
+
+        self.store.record('spam', JobStatus.OK, 100)
+        self.store.close()
+        with open(self.directory + '/history.dat', 'ab') as data_file:
+            data_file.write('\x01\x02')
+        self.store = HistoryStore(self.directory)
+        self.store.record('spam', JobStatus.FAILING, 200)
+
+        self.assertEqual([(100, JobStatus.OK), (200, JobStatus.FAILING)], self.store.transitions('spam'))
+
+
+class HistoryRecorderTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.store = HistoryStore(self.directory)
+        self.jobs_model = StubJobsModel()
+        self.recorder = HistoryRecorder(self.store, self.jobs_model, clock=lambda: 500)
+
+    def tearDown(self):
+
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test___Jobs_model_fires_delta___Changed_jobs_recorded(self):
+
+        self.jobs_model.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.FAILING), False)], []))
+
+        self.assertEqual([(500, JobStatus.FAILING)], self.store.transitions('spam'))
+
+    def test___Jobs_model_fires_delta___Pending_status_not_recorded(self):
+
+        self.jobs_model.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.FAILING), False)], []))
+        self.jobs_model.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False, True)], []))
+        self.jobs_model.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.FAILING), False)], []))
+
+        self.assertEqual([(500, JobStatus.FAILING)], self.store.transitions('spam'))
+
+    def test___describe___Failing_flaky_job___Duration_and_flip_rate(self):
+
+        self.store.record('spam', JobStatus.OK, 0)
+        self.store.record('spam', JobStatus.FAILING, 3600)
+
+        result = self.recorder.describe('spam', now=3 * 3600 + 60)
+
+        self.assertEqual('Not passing for 2h 1m, 0.1 flips/day', result)
+
+
+class FormatDurationTests(TestCase):
+
+    def test___format_duration___Under_an_hour___Minutes(self):
+
+        self.assertEqual('5m', format_duration(330))
+
+    def test___format_duration___Days___Days_and_hours(self):
+
+        self.assertEqual('2d 3h', format_duration(2 * SECONDS_PER_DAY + 3 * 3600 + 59))
@@ -3,9 +3,12 @@ from unittest import TestCase
 
 from pyjenkins.jenkins import Jenkins
 from pyjenkins.job import Job, JobStatus
+from trayjenkins.errors import ServerUnreachableError, ThrottledError
 from trayjenkins.event import Event, IEvent
-from trayjenkins.jobs import IModel, IView, Presenter, Model, IgnoreJobsFilter, \
-    JobModel, IErrorLogger
+from trayjenkins.stream import StreamingJenkins
+from trayjenkins.jobs import IModel, IView, Presenter, Model, IgnoreJobsFilter, NameJobsFilter, \
+    JobModel, IErrorLogger, JobsDelta, JobsFetch, IgnoredJobs, diff_job_models, JobRegistry, \
+    canonical_status
 
 
 class JobModelTests(TestCase):
@@ -63,6 +66,7 @@ class JobsPresenterTests(TestCase):
         jobs_updated_event = Event()
 
         model.jobs_updated_event().AndReturn(jobs_updated_event)
+        model.jobs_delta_event().AndReturn(Event())
         view.job_ignored_event().InAnyOrder().AndReturn(Event())
         view.job_unignored_event().InAnyOrder().AndReturn(Event())
         view.job_enabled_event().InAnyOrder().AndReturn(Event())
@@ -76,6 +80,56 @@ class JobsPresenterTests(TestCase):
 
         mox.Verify(view)
 
+    def test_Constructor___Model_fires_delta_after_jobs___View_given_jobs_only(self):
+
+        mocks = mox.Mox()
+
+        jobs = [JobModel(Job('spam', JobStatus.OK), False)]
+        model = mocks.CreateMock(IModel)
+        view = mocks.CreateMock(IView)
+        jobs_updated_event = Event()
+        jobs_delta_event = Event()
+
+        model.jobs_updated_event().AndReturn(jobs_updated_event)
+        model.jobs_delta_event().AndReturn(jobs_delta_event)
+        view.job_ignored_event().InAnyOrder().AndReturn(Event())
+        view.job_unignored_event().InAnyOrder().AndReturn(Event())
+        view.job_enabled_event().InAnyOrder().AndReturn(Event())
+        view.job_disabled_event().InAnyOrder().AndReturn(Event())
+        view.set_jobs(jobs)
+
+        mocks.ReplayAll()
+
+        presenter = Presenter(model, view)  # @UnusedVariable
+        jobs_updated_event.fire(jobs)
+        jobs_delta_event.fire(JobsDelta(jobs, []))
+
+        mox.Verify(view)
+
+    def test_Constructor___Model_fires_delta_alone___View_update_job_called(self):
+
+        mocks = mox.Mox()
+
+        spam = JobModel(Job('spam', JobStatus.FAILING), False)
+        model = mocks.CreateMock(IModel)
+        view = mocks.CreateMock(IView)
+        jobs_delta_event = Event()
+
+        model.jobs_updated_event().AndReturn(Event())
+        model.jobs_delta_event().AndReturn(jobs_delta_event)
+        view.job_ignored_event().InAnyOrder().AndReturn(Event())
+        view.job_unignored_event().InAnyOrder().AndReturn(Event())
+        view.job_enabled_event().InAnyOrder().AndReturn(Event())
+        view.job_disabled_event().InAnyOrder().AndReturn(Event())
+        view.update_job(spam)
+
+        mocks.ReplayAll()
+
+        presenter = Presenter(model, view)  # @UnusedVariable
+        jobs_delta_event.fire(JobsDelta([spam], []))
+
+        mox.Verify(view)
+
     def test_Constructor___View_fires_job_ignored_event___Model_ignore_job_called(self):
 
         mocks = mox.Mox()
@@ -85,6 +139,7 @@ class JobsPresenterTests(TestCase):
         job_ignored_event = Event()
 
         model.jobs_updated_event().AndReturn(Event())
+        model.jobs_delta_event().AndReturn(Event())
         view.job_ignored_event().InAnyOrder().AndReturn(job_ignored_event)
         view.job_unignored_event().InAnyOrder().AndReturn(Event())
         view.job_enabled_event().InAnyOrder().AndReturn(Event())
@@ -107,6 +162,7 @@ class JobsPresenterTests(TestCase):
         job_unignored_event = Event()
 
         model.jobs_updated_event().AndReturn(Event())
+        model.jobs_delta_event().AndReturn(Event())
         view.job_ignored_event().InAnyOrder().AndReturn(Event())
         view.job_unignored_event().InAnyOrder().AndReturn(job_unignored_event)
         view.job_enabled_event().InAnyOrder().AndReturn(Event())
@@ -129,6 +185,7 @@ class JobsPresenterTests(TestCase):
         job_enabled_event = Event()
 
         model.jobs_updated_event().AndReturn(Event())
+        model.jobs_delta_event().AndReturn(Event())
         view.job_ignored_event().InAnyOrder().AndReturn(Event())
         view.job_unignored_event().InAnyOrder().AndReturn(Event())
         view.job_enabled_event().InAnyOrder().AndReturn(job_enabled_event)
@@ -151,6 +208,7 @@ class JobsPresenterTests(TestCase):
         job_disabled_event = Event()
 
         model.jobs_updated_event().AndReturn(Event())
+        model.jobs_delta_event().AndReturn(Event())
         view.job_ignored_event().InAnyOrder().AndReturn(Event())
         view.job_unignored_event().InAnyOrder().AndReturn(Event())
         view.job_enabled_event().InAnyOrder().AndReturn(Event())
@@ -165,6 +223,37 @@ class JobsPresenterTests(TestCase):
         mox.Verify(model)
 
 
+class IgnoredJobsTests(TestCase):
+
+    def test___contains___Name_or_pattern___Ignored(self):
+
+        ignored = IgnoredJobs()
+        ignored.add('spam')
+        ignored.set_patterns(('*-nightly', 'sandbox-?'))
+
+        self.assertEqual([True, True, True, False, False],
+                         [name in ignored for name in ['spam', 'eggs-nightly', 'sandbox-1', 'sandbox-10', 'eggs']])
+
+    def test___set_patterns___No_patterns___Only_names_ignored(self):
+
+        ignored = IgnoredJobs()
+        ignored.set_patterns(('*',))
+        self.assertTrue('spam' in ignored)
+        ignored.set_patterns(())
+
+        self.assertFalse('spam' in ignored)
+
+    def test___forget___Removed_jobs___Still_ignored_by_name_and_pattern(self):
+
+        ignored = IgnoredJobs()
+        ignored.add('spam')
+        ignored.set_patterns(('sandbox-*',))
+        self.assertTrue('sandbox-1' in ignored)
+        ignored.forget(['spam', 'sandbox-1'])
+
+        self.assertEqual([True, True], ['spam' in ignored, 'sandbox-1' in ignored])
+
+
 class JobsModelTests(TestCase):
 
     def setUp(self):
@@ -172,6 +261,7 @@ class JobsModelTests(TestCase):
         self.mocks = mox.Mox()
         self.jenkins = self.mocks.CreateMock(Jenkins)
         self.event = self.mocks.CreateMock(IEvent)
+        self.delta_event = self.mocks.CreateMock(IEvent)
         self.logger = self.mocks.CreateMock(IErrorLogger)
 
     def test__update_jobs__First_call__Fire_jobs_updated_event_with_no_ignores(self):
@@ -264,6 +354,69 @@ class JobsModelTests(TestCase):
 
         mox.Verify(self.event)
 
+    def test__update_jobs__Job_status_changes__Delta_event_fired_with_changed_job(self):
+
+        delta_event = self.mocks.CreateMock(IEvent)
+        self.jenkins.list_jobs().AndReturn([Job('job1', JobStatus.OK), Job('job2', JobStatus.OK)])
+        self.jenkins.list_jobs().AndReturn([Job('job1', JobStatus.OK), Job('job2', JobStatus.FAILING)])
+        self.event.fire(mox.IgnoreArg())
+        self.event.fire(mox.IgnoreArg())
+        delta_event.fire(mox.IgnoreArg())
+        delta_event.fire(JobsDelta([JobModel(Job('job2', JobStatus.FAILING), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, delta_event)
+        model.update_jobs()
+        model.update_jobs()
+
+        mox.Verify(delta_event)
+
+    def test__update_job__Known_job_changes__Only_delta_fired_and_job_replaced_in_place(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('job1', JobStatus.OK), Job('job2', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('job2', JobStatus.FAILING), True)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.ignore_job('job2')
+        model.update_jobs()
+        model.update_job(Job('job2', JobStatus.FAILING))
+
+        mox.Verify(self.event)
+        mox.Verify(self.delta_event)
+        self.assertEqual([JobModel(Job('job1', JobStatus.OK), False), JobModel(Job('job2', JobStatus.FAILING), True)],
+                         model.job_models())
+
+    def test__update_job__New_job__Appended(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('job1', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('job2', JobStatus.OK), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.update_job(Job('job2', JobStatus.OK))
+
+        mox.Verify(self.delta_event)
+        self.assertEqual([JobModel(Job('job1', JobStatus.OK), False), JobModel(Job('job2', JobStatus.OK), False)],
+                         model.job_models())
+
+    def test__update_job__Job_unchanged__No_event_fired(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('job1', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.update_jobs()
+        model.update_job(Job('job1', JobStatus.OK))
+
+        mox.Verify(self.event)
+
     def test_enable_job___Jenkins_returns_false___Log_error(self):
 
         self.jenkins.enable_job('spam').AndReturn(False)
@@ -296,6 +449,318 @@ class JobsModelTests(TestCase):
 
         mox.Verify(self.logger)
 
+    def test_enable_job___Jenkins_unreachable___Log_error(self):
+
+        self.jenkins.enable_job('spam').AndRaise(ServerUnreachableError('Jenkins unreachable: timed out'))
+        self.logger.log_error("Failed to enable job 'spam': Jenkins unreachable: timed out")
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger)
+        model.enable_job('spam')
+
+        mox.Verify(self.logger)
+
+    def test_disable_job___Jenkins_returns_true___Job_shown_disabled_before_Jenkins_answers(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.jenkins.disable_job('spam').AndReturn(True)
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False, True)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.disable_job('spam')
+
+        mox.Verify(self.delta_event)
+
+    def test_disable_job___Next_poll_reports_disabled___No_longer_pending(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.jenkins.disable_job('spam').AndReturn(True)
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire([JobModel(Job('spam', JobStatus.DISABLED), False)])
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.update_jobs()
+        model.disable_job('spam')
+        model.update_jobs()
+
+        mox.Verify(self.event)
+
+    def test_enable_job___Jenkins_can_get_one_job___Only_that_job_fetched(self):
+
+        jenkins = self.mocks.CreateMock(StreamingJenkins)
+        jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED), Job('eggs', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        jenkins.enable_job('spam').AndReturn(True)
+        jenkins.get_job('spam').AndReturn(Job('spam', JobStatus.FAILING))
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.FAILING), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(jenkins)
+        mox.Verify(self.delta_event)
+
+    def test_enable_job___Fetching_the_job_fails___Shown_unknown_until_next_poll(self):
+
+        jenkins = self.mocks.CreateMock(StreamingJenkins)
+        jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        jenkins.enable_job('spam').AndReturn(True)
+        jenkins.get_job('spam').AndRaise(ServerUnreachableError('refused'))
+        self.mocks.ReplayAll()
+
+        model = Model(jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(self.delta_event)
+        mox.Verify(self.logger)
+
+    def test_enable_job___Fetching_the_job_refused___Error_logged(self):
+
+        jenkins = self.mocks.CreateMock(StreamingJenkins)
+        jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        jenkins.enable_job('spam').AndReturn(True)
+        jenkins.get_job('spam').AndRaise(IOError('HTTP Error 403: Forbidden'))
+        self.logger.log_error("Failed to fetch job 'spam': HTTP Error 403: Forbidden")
+        self.mocks.ReplayAll()
+
+        model = Model(jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(self.delta_event)
+        mox.Verify(self.logger)
+
+    def test_enable_job___Jenkins_answers_with_error___Logged_and_rolled_back(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        self.jenkins.enable_job('spam').AndRaise(IOError('HTTP Error 404: Not Found'))
+        self.logger.log_error("Failed to enable job 'spam': HTTP Error 404: Not Found")
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(self.delta_event)
+        mox.Verify(self.logger)
+
+    def test_disable_job___Jenkins_refuses___Shown_disabled_then_rolled_back(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.FAILING)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False, True)], []))
+        self.jenkins.disable_job('spam').AndReturn(False)
+        self.logger.log_error(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.FAILING), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.disable_job('spam')
+
+        mox.Verify(self.event)
+        mox.Verify(self.delta_event)
+
+    def test_enable_job___Jenkins_disagrees___Status_from_Jenkins_shown(self):
+
+        jenkins = self.mocks.CreateMock(StreamingJenkins)
+        jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        jenkins.enable_job('spam').AndReturn(True)
+        jenkins.get_job('spam').AndReturn(Job('spam', JobStatus.DISABLED))
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(self.delta_event)
+
+    def test_enable_job___Jenkins_unreachable___Rolled_back(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.DISABLED)])
+        self.event.fire(mox.IgnoreArg())
+        self.delta_event.fire(mox.IgnoreArg())
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.UNKNOWN), False, True)], []))
+        self.jenkins.enable_job('spam').AndRaise(ServerUnreachableError('refused'))
+        self.logger.log_error("Failed to enable job 'spam': refused")
+        self.delta_event.fire(JobsDelta([JobModel(Job('spam', JobStatus.DISABLED), False)], []))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, self.delta_event)
+        model.update_jobs()
+        model.enable_job('spam')
+
+        mox.Verify(self.delta_event)
+
+    def test_apply_jobs___Older_poll_finishes_last___Dropped(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK)])
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.FAILING)])
+        self.event.fire([JobModel(Job('spam', JobStatus.FAILING), False)])
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        older = model.fetch_jobs()
+        newer = model.fetch_jobs()
+        model.apply_jobs(newer)
+        model.apply_jobs(older)
+
+        mox.Verify(self.event)
+
+    def test_apply_jobs___Job_updated_after_poll_started___Newer_status_kept(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK)])
+        self.event.fire(mox.IgnoreArg())
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK), Job('eggs', JobStatus.OK)])
+        self.event.fire([JobModel(Job('spam', JobStatus.FAILING), False), JobModel(Job('eggs', JobStatus.OK), False)])
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.update_jobs()
+        fetch = model.fetch_jobs()
+        model.update_job(Job('spam', JobStatus.FAILING))
+        model.apply_jobs(fetch)
+
+        mox.Verify(self.event)
+
+    def test_apply_jobs___Later_poll_throttled___Earlier_poll_still_applied(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK)])
+        self.jenkins.list_jobs().AndRaise(ThrottledError('Too many requests to Jenkins'))
+        self.event.fire([JobModel(Job('spam', JobStatus.OK), False)])
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        earlier = model.fetch_jobs()
+        model.apply_jobs(model.fetch_jobs())
+        model.apply_jobs(earlier)
+
+        mox.Verify(self.event)
+
+    def test_apply_jobs___Poll_failed___Error_logged_on_applying(self):
+
+        self.logger.log_error('Failed to list jobs: bad JSON')
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.apply_jobs(JobsFetch(1, None, error=ValueError('bad JSON')))
+
+        mox.Verify(self.logger)
+        mox.Verify(self.event)
+
+    def test_apply_jobs___Same_error_every_poll___Logged_once_until_a_poll_succeeds(self):
+
+        self.logger.log_error('Failed to list jobs: HTTP Error 401: Unauthorized')
+        self.logger.log_error('Failed to list jobs: bad JSON')
+        self.logger.log_error('Failed to list jobs: bad JSON')
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.apply_jobs(JobsFetch(1, None, error=IOError('HTTP Error 401: Unauthorized')))
+        model.apply_jobs(JobsFetch(2, None, error=IOError('HTTP Error 401: Unauthorized')))
+        model.apply_jobs(JobsFetch(3, None, error=ValueError('bad JSON')))
+        model.apply_jobs(JobsFetch(4, []))
+        model.apply_jobs(JobsFetch(5, None, error=ValueError('bad JSON')))
+
+        mox.Verify(self.logger)
+
+    def test_set_ignore_patterns___Jobs_listed___Matching_jobs_ignored_without_polling(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('spam', JobStatus.OK), Job('sandbox-eggs', JobStatus.FAILING)])
+        self.event.fire(mox.IgnoreArg())
+        self.event.fire([JobModel(Job('spam', JobStatus.OK), False), JobModel(Job('sandbox-eggs', JobStatus.FAILING), True)])
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.update_jobs()
+        model.set_ignore_patterns(('sandbox-*',))
+
+        mox.Verify(self.jenkins)
+        mox.Verify(self.event)
+
+    def test_unignore_job___Ignored_only_by_pattern___Still_ignored_and_user_told(self):
+
+        self.jenkins.list_jobs().AndReturn([Job('sandbox-eggs', JobStatus.FAILING)])
+        self.event.fire(mox.IgnoreArg())
+        self.event.fire([JobModel(Job('sandbox-eggs', JobStatus.FAILING), True)])
+        self.logger.log_error("Job 'sandbox-eggs' is still ignored, as it matches ignore_patterns")
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event)
+        model.update_jobs()
+        model.set_ignore_patterns(('sandbox-*',))
+        model.unignore_job('sandbox-eggs')
+
+        mox.Verify(self.event)
+        mox.Verify(self.logger)
+
+    def test_update_jobs___Jenkins_unreachable___Unreachable_event_fired_once_with_reason(self):
+
+        unreachable_event = self.mocks.CreateMock(IEvent)
+        self.jenkins.list_jobs().AndRaise(ServerUnreachableError('refused'))
+        self.jenkins.list_jobs().AndRaise(ServerUnreachableError('refused'))
+        unreachable_event.fire('refused')
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, server_unreachable_event=unreachable_event)
+        model.update_jobs()
+        model.update_jobs()
+
+        mox.Verify(unreachable_event)
+
+    def test_update_jobs___Jenkins_answers_again___Unreachable_event_fired_with_None(self):
+
+        unreachable_event = self.mocks.CreateMock(IEvent)
+        self.jenkins.list_jobs().AndRaise(ServerUnreachableError('refused'))
+        self.jenkins.list_jobs().AndReturn([])
+        unreachable_event.fire('refused')
+        unreachable_event.fire(None)
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, server_unreachable_event=unreachable_event)
+        model.update_jobs()
+        model.update_jobs()
+
+        mox.Verify(unreachable_event)
+
+    def test_update_jobs___Throttled___Poll_skipped_quietly(self):
+
+        unreachable_event = self.mocks.CreateMock(IEvent)
+        self.jenkins.list_jobs().AndRaise(ThrottledError('Too many requests to Jenkins'))
+        self.mocks.ReplayAll()
+
+        model = Model(self.jenkins, self.logger, self.event, server_unreachable_event=unreachable_event)
+        model.update_jobs()
+
+        mox.Verify(self.event)
+        mox.Verify(unreachable_event)
+
     def test_disable_job___Jenkins_returns_true___Dont_log_error(self):
 
         self.jenkins.disable_job('baked beans').AndReturn(True)
@@ -315,6 +780,107 @@ class JobsModelTests(TestCase):
         self.assertTrue(self.event is model.jobs_updated_event())
 
 
+class DiffJobModelsTests(TestCase):
+
+    def test___diff_job_models___Same_models___Empty_delta(self):
+
+        models = [JobModel(Job('eric', JobStatus.OK), False)]
+
+        result = diff_job_models(models, [JobModel(Job('eric', JobStatus.OK), False)])
+
+        self.assertTrue(result.is_empty())
+
+    def test___diff_job_models___Status_changed_and_job_added___Both_in_changed(self):
+
+        old = [JobModel(Job('eric', JobStatus.OK), False)]
+        new = [JobModel(Job('eric', JobStatus.FAILING), False),
+               JobModel(Job('john', JobStatus.OK), False)]
+
+        result = diff_job_models(old, new)
+
+        self.assertEqual(JobsDelta(new, []), result)
+
+    def test___diff_job_models___Ignore_status_changed___Model_in_changed(self):
+
+        old = [JobModel(Job('eric', JobStatus.OK), False)]
+        new = [JobModel(Job('eric', JobStatus.OK), True)]
+
+        result = diff_job_models(old, new)
+
+        self.assertEqual(JobsDelta(new, []), result)
+
+    def test___diff_job_models___Job_removed___Name_in_removed(self):
+
+        old = [JobModel(Job('eric', JobStatus.OK), False),
+               JobModel(Job('john', JobStatus.OK), False)]
+        new = [JobModel(Job('eric', JobStatus.OK), False)]
+
+        result = diff_job_models(old, new)
+
+        self.assertEqual(JobsDelta([], ['john']), result)
+
+
+class JobRegistryTests(TestCase):
+
+    def test___models___Job_unchanged_since_last_poll___Same_model_returned(self):
+
+        registry = JobRegistry()
+        first = registry.models([Job('eric', JobStatus.OK)], set())
+        second = registry.models([Job('eric', JobStatus.OK)], set())
+
+        self.assertTrue(first[0] is second[0])
+
+    def test___models___Status_changed___New_model_with_same_name_string(self):
+
+        registry = JobRegistry()
+        first = registry.models([Job('eric', JobStatus.OK)], set())
+        second = registry.models([Job(''.join(['er', 'ic']), JobStatus.FAILING)], set())
+
+        self.assertEqual(JobModel(Job('eric', JobStatus.FAILING), False), second[0])
+        self.assertTrue(first[0].job.name is second[0].job.name)
+
+    def test___models___Ignored_changed___New_model(self):
+
+        registry = JobRegistry()
+        first = registry.models([Job('eric', JobStatus.OK)], set())
+        second = registry.models([Job('eric', JobStatus.OK)], set(['eric']))
+
+        self.assertFalse(first[0] is second[0])
+        self.assertTrue(second[0].ignored)
+
+    def test___models___Equal_status_string___Status_is_the_JobStatus_constant(self):
+
+        result = JobRegistry().models([Job('eric', ''.join(['fail', 'ing']))], set())
+
+        self.assertTrue(result[0].job.status is JobStatus.FAILING)
+
+    def test___models___Job_gone_for_a_poll___Not_kept(self):
+
+        registry = JobRegistry()
+        first = registry.models([Job('eric', JobStatus.OK)], set())
+        registry.models([], set())
+        third = registry.models([Job('eric', JobStatus.OK)], set())
+
+        self.assertFalse(first[0] is third[0])
+
+    def test___model___One_job_changed___Others_kept(self):
+
+        registry = JobRegistry()
+        first = registry.models([Job('eric', JobStatus.OK), Job('john', JobStatus.OK)], set())
+        registry.model(Job('eric', JobStatus.FAILING), False)
+        second = registry.models([Job('eric', JobStatus.FAILING), Job('john', JobStatus.OK)], set())
+
+        self.assertTrue(first[1] is second[1])
+        self.assertEqual(JobStatus.FAILING, second[0].job.status)
+
+
+class CanonicalStatusTests(TestCase):
+
+    def test___canonical_status___Unrecognised_status___Returned_unchanged(self):
+
+        self.assertEqual('who cares?', canonical_status('who cares?'))
+
+
 class IgnoreJobsFilterTests(TestCase):
 
     def test___filter_jobs___Nothing_ignored___Return_unmodified_list(self):
@@ -336,3 +902,18 @@ class IgnoreJobsFilterTests(TestCase):
         result = jobs_filter.filter_jobs([non_ignored, ignored])
 
         self.assertEqual([non_ignored], result)
+
+
+class NameJobsFilterTests(TestCase):
+
+    def test___filter_jobs___Patterns___Return_matching_jobs_not_ignored(self):
+
+        team = JobModel(Job('team-spam', JobStatus.FAILING), False)
+        other = JobModel(Job('eggs', JobStatus.FAILING), False)
+        ignored = JobModel(Job('team-beans', JobStatus.FAILING), True)
+        release = JobModel(Job('release-1.2', JobStatus.OK), False)
+
+        jobs_filter = NameJobsFilter(['team-*', 'release-*'])
+        result = jobs_filter.filter_jobs([team, other, ignored, release])
+
+        self.assertEqual([team, release], result)
@@ -0,0 +1,107 @@
+from StringIO import StringIO
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.jobs import Model, IErrorLogger
+from trayjenkins.metrics import Metrics, MetricsLogger, NullMetrics, format_snapshot
+
+
+class MetricsTests(TestCase):
+
+    def test___count___Counted_twice___Snapshot_has_total(self):
+
+        metrics = Metrics()
+        metrics.count('bytes_fetched', 100)
+        metrics.count('bytes_fetched', 20)
+
+        self.assertEqual({'bytes_fetched': 120}, metrics.snapshot()['counters'])
+
+    def test___timer___Timed_twice___Snapshot_has_count_and_total(self):
+
+        metrics = Metrics()
+        with metrics.timer('list_jobs'):
+            pass
+        with metrics.timer('list_jobs'):
+            pass
+
+        stats = metrics.snapshot()['timers']['list_jobs']
+        self.assertEqual(2, stats['count'])
+        self.assertTrue(stats['max_ms'] <= stats['total_ms'])
+
+    def test___timer___Body_raises___Time_recorded_and_exception_propagates(self):
+
+        metrics = Metrics()
+
+        def fail():
+            with metrics.timer('list_jobs'):
+                raise IOError('down')
+
+        self.assertRaises(IOError, fail)
+        self.assertEqual(1, metrics.snapshot()['timers']['list_jobs']['count'])
+
+
+class NullMetricsTests(TestCase):
+
+    def test___snapshot___After_timing_and_counting___Nothing_recorded(self):
+
+        metrics = NullMetrics()
+        with metrics.timer('list_jobs'):
+            metrics.count('errors')
+
+        self.assertEqual({'timers': {}, 'counters': {}}, metrics.snapshot())
+
+
+class FormatSnapshotTests(TestCase):
+
+    def test___format_snapshot___Timer_and_counter___One_line(self):
+
+        snapshot = {'timers': {'diff': {'count': 2, 'mean_ms': 1.5, 'max_ms': 2.0, 'last_ms': 1.0, 'total_ms': 3.0}},
+                    'counters': {'errors.list_jobs': 1}}
+
+        result = format_snapshot(snapshot)
+
+        self.assertEqual('diff n=2 mean=1.5ms max=2.0ms last=1.0ms; errors.list_jobs=1', result)
+
+
+class MetricsLoggerTests(TestCase):
+
+    def test___log___Writes_one_line(self):
+
+        stream = StringIO()
+        metrics = Metrics()
+        metrics.count('errors.list_jobs')
+
+        MetricsLogger(metrics, stream).log()
+
+        self.assertTrue(stream.getvalue().endswith(' metrics: errors.list_jobs=1\n'))
+
+
+class FailingJenkins(object):
+
+    def list_jobs(self):
+        raise IOError('Jenkins is down')
+
+
+class OneJobJenkins(object):
+
+    def list_jobs(self):
+        return [Job('spam', JobStatus.OK)]
+
+
+class JobsModelMetricsTests(TestCase):
+
+    def test___update_jobs___Jenkins_raises___Error_counted(self):
+
+        metrics = Metrics()
+        model = Model(FailingJenkins(), IErrorLogger(), metrics=metrics)
+        model.update_jobs()
+
+        self.assertEqual({'errors.list_jobs': 1}, metrics.snapshot()['counters'])
+
+    def test___update_jobs___Jobs_changed___List_diff_and_dispatch_timed(self):
+
+        metrics = Metrics()
+        model = Model(OneJobJenkins(), IErrorLogger(), metrics=metrics)
+        model.update_jobs()
+
+        self.assertEqual(['diff', 'dispatch', 'list_jobs'], sorted(metrics.snapshot()['timers']))
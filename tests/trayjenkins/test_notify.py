@@ -0,0 +1,129 @@
+import json
+import threading
+import urllib2
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.jobs import Model, IErrorLogger
+from trayjenkins.notify import job_from_notification, NotificationListener
+from tests.trayjenkins.fakes import RecordingHandler, StubJenkins
+
+
+def notification(name, phase, status=None):
+    build = {'phase': phase, 'number': 1, 'url': 'job/%s/1/' % name}
+    if status is not None:
+        build['status'] = status
+    return {'name': name, 'url': 'job/%s/' % name, 'build': build}
+
+
+class JobFromNotificationTests(TestCase):
+
+    def test___job_from_notification___Completed_success___Job_ok(self):
+
+        result = job_from_notification(notification('spam', 'COMPLETED', 'SUCCESS'))
+
+        self.assertEqual(Job('spam', JobStatus.OK), result)
+
+    def test___job_from_notification___Completed_failure___Job_failing(self):
+
+        result = job_from_notification(notification('spam', 'COMPLETED', 'FAILURE'))
+
+        self.assertEqual(Job('spam', JobStatus.FAILING), result)
+
+    def test___job_from_notification___Finalized_unstable___Job_failing(self):
+
+        result = job_from_notification(notification('spam', 'FINALIZED', 'UNSTABLE'))
+
+        self.assertEqual(Job('spam', JobStatus.FAILING), result)
+
+    def test___job_from_notification___Completed_aborted___Job_unknown(self):
+
+        result = job_from_notification(notification('spam', 'COMPLETED', 'ABORTED'))
+
+        self.assertEqual(Job('spam', JobStatus.UNKNOWN), result)
+
+    def test___job_from_notification___Build_started___Return_None(self):
+
+        result = job_from_notification(notification('spam', 'STARTED'))
+
+        self.assertEqual(None, result)
+
+
+class NotificationListenerTests(TestCase):
+
+    def setUp(self):
+
+        self.listener = NotificationListener(('127.0.0.1', 0))
+        self.listener.start()
+        self.url = 'http://127.0.0.1:%d/' % self.listener.address()[1]
+
+        self.model = Model(StubJenkins([Job('job%d' % i, JobStatus.OK) for i in range(20)]), IErrorLogger())
+        self.model.update_jobs()
+        self.updates = RecordingHandler()
+        self.model.jobs_delta_event().register(self.updates)
+
+    def tearDown(self):
+
+        self.listener.stop()
+
+    def post(self, body):
+
+        request = urllib2.Request(self.url, body, {'Content-Type': 'application/json'})
+        return urllib2.urlopen(request, timeout=5).getcode()
+
+    def post_burst(self, notifications, threads=4):
+
+        def post_every_nth(start):
+            for values in notifications[start::threads]:
+                self.post(json.dumps(values))
+
+        workers = [threading.Thread(target=post_every_nth, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def test___Burst_of_notifications___Model_has_final_statuses(self):
+
+        burst = [notification('job%d' % i, 'STARTED') for i in range(20)]
+        burst += [notification('job%d' % i, 'COMPLETED', 'FAILURE') for i in range(0, 20, 2)]
+        burst += [notification('new job', 'COMPLETED', 'SUCCESS')]
+
+        self.post_burst(burst)
+        self.listener.apply_pending(self.model)
+
+        jobs = dict((model.job.name, model.job.status) for model in self.model.job_models())
+        self.assertEqual(10, jobs.values().count(JobStatus.FAILING))
+        self.assertEqual(JobStatus.FAILING, jobs['job4'])
+        self.assertEqual(JobStatus.OK, jobs['job5'])
+        self.assertEqual(JobStatus.OK, jobs['new job'])
+
+    def test___Burst_of_notifications_for_one_job___Single_model_update(self):
+
+        burst = [notification('job3', 'COMPLETED', status) for status in ['FAILURE', 'SUCCESS'] * 25]
+        burst.append(notification('job3', 'COMPLETED', 'FAILURE'))
+
+        for values in burst:
+            self.post(json.dumps(values))
+        count = self.listener.apply_pending(self.model)
+
+        self.assertEqual(1, count)
+        self.assertEqual(1, len(self.updates.calls))
+
+    def test___Notification_received___Callback_called(self):
+
+        called = threading.Event()
+        listener = NotificationListener(('127.0.0.1', 0), called.set)
+        listener.start()
+        try:
+            request = urllib2.Request('http://127.0.0.1:%d/' % listener.address()[1],
+                                      json.dumps(notification('spam', 'COMPLETED', 'SUCCESS')))
+            urllib2.urlopen(request, timeout=5)
+        finally:
+            listener.stop()
+
+        self.assertTrue(called.is_set())
+
+    def test___Malformed_notification___Bad_request(self):
+
+        self.assertRaises(urllib2.HTTPError, self.post, 'not json')
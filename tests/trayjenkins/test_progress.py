@@ -0,0 +1,185 @@
+from unittest import TestCase
+
+from trayjenkins.errors import ServerUnreachableError
+from trayjenkins.metrics import Metrics
+from trayjenkins.progress import BuildProgress, BuildProgressModel, ProgressPresenter
+from tests.trayjenkins.fakes import FakeClock, RecordingHandler
+
+
+class StubBuildSource(object):
+
+    def __init__(self, progress):
+        self.building = set()
+        self.progress = progress
+        self.asked = []
+
+    def building_jobs(self):
+        return frozenset(self.building)
+
+    def build_progress(self, job_name):
+        self.asked.append(job_name)
+        result = self.progress.get(job_name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class StubProgressView(object):
+
+    def __init__(self):
+        self.shown = []
+
+    def set_progress(self, progress):
+        self.shown.append(dict(progress))
+
+
+class BuildProgressTests(TestCase):
+
+    def test___percent_and_remaining___Part_way___From_last_duration(self):
+
+        progress = BuildProgress('spam', 42, 1000, 600)
+
+        self.assertEqual((25, 450), (progress.percent(1150), progress.remaining(1150)))
+
+    def test___percent_and_remaining___Overrunning___Held_at_99_and_none_left(self):
+
+        progress = BuildProgress('spam', 42, 1000, 600)
+
+        self.assertEqual((99, 0), (progress.percent(2000), progress.remaining(2000)))
+
+    def test___percent_and_remaining___No_previous_build___None(self):
+
+        progress = BuildProgress('spam', 1, 1000)
+
+        self.assertEqual((None, None), (progress.percent(1150), progress.remaining(1150)))
+
+    def test___describe___Part_way___Percent_and_time_left(self):
+
+        self.assertEqual('Building #42: 25%, about 7m left', BuildProgress('spam', 42, 1000, 600).describe(1150))
+        self.assertEqual('Building #42: 95%, under a minute left', BuildProgress('spam', 42, 1000, 600).describe(1570))
+        self.assertEqual('Building #1 for 2m', BuildProgress('spam', 1, 1000).describe(1150))
+
+
+class BuildProgressModelTests(TestCase):
+
+    def setUp(self):
+
+        self.source = StubBuildSource({'spam': BuildProgress('spam', 42, 1000, 600),
+                                       'eggs': BuildProgress('eggs', 7, 1100, 60)})
+        self.handler = RecordingHandler()
+        self.clock = FakeClock(1150)
+        self.model = BuildProgressModel(self.source, clock=self.clock)
+        self.model.progress_changed_event().register(self.handler)
+
+    def test___update___Builds_started___Progress_fetched_and_fired(self):
+
+        self.source.building = set(['spam', 'eggs'])
+        self.model.update()
+
+        self.assertEqual([({'spam': BuildProgress('spam', 42, 1000, 600),
+                            'eggs': BuildProgress('eggs', 7, 1100, 60)},)], self.handler.calls)
+
+    def test___update___Still_building___Not_fetched_again_or_fired(self):
+
+        self.source.building = set(['spam'])
+        self.model.update()
+        self.model.update()
+
+        self.assertEqual((['spam'], 1), (self.source.asked, len(self.handler.calls)))
+
+    def test___update___Build_finished___Progress_dropped(self):
+
+        self.source.building = set(['spam', 'eggs'])
+        self.model.update()
+        self.source.building = set(['eggs'])
+        self.model.update()
+
+        self.assertEqual(['eggs'], list(self.model.progress()))
+
+    def test___update___Jenkins_unreachable___Counted_and_asked_again_next_poll(self):
+
+        metrics = Metrics()
+        self.source.progress['spam'] = ServerUnreachableError('down')
+        self.source.building = set(['spam'])
+        model = BuildProgressModel(self.source, metrics=metrics, clock=self.clock)
+        model.update()
+        model.update()
+
+        self.assertEqual(({}, ['spam', 'spam']), (model.progress(), self.source.asked))
+        self.assertEqual(2, metrics.snapshot()['counters']['errors.build_progress'])
+
+    def test___fetch___Bad_reply___Error_returned_and_other_builds_fetched(self):
+
+        error = ValueError('No JSON object could be decoded')
+        self.source.progress['spam'] = error
+        self.source.building = set(['spam', 'eggs'])
+
+        fetch = self.model.fetch()
+
+        self.assertEqual((error, {'eggs': BuildProgress('eggs', 7, 1100, 60)}), (fetch.error, fetch.started))
+
+    def test___update___Next_build_started_after_expected_finish___Fetched_again(self):
+
+        self.source.building = set(['spam'])
+        self.model.update()
+        self.clock.now = 1700
+        self.source.progress['spam'] = BuildProgress('spam', 43, 1650, 600)
+        self.model.update()
+
+        self.assertEqual({'spam': BuildProgress('spam', 43, 1650, 600)}, self.model.progress())
+
+    def test___update___No_expected_duration_still_building___Not_fetched_again(self):
+
+        self.source.progress['spam'] = BuildProgress('spam', 1, 1000, None)
+        self.source.building = set(['spam'])
+        self.model.update()
+        self.clock.now = 5000
+        self.model.update()
+
+        self.assertEqual(['spam'], self.source.asked)
+
+    def test___update___No_expected_duration_build_finished___Next_build_fetched(self):
+
+        self.source.progress['spam'] = BuildProgress('spam', 1, 1000, None)
+        self.source.building = set(['spam'])
+        self.model.update()
+        self.source.building = set()
+        self.model.update()
+        self.source.building = set(['spam'])
+        self.model.update()
+
+        self.assertEqual(['spam', 'spam'], self.source.asked)
+
+    def test___update___Overrunning_build_found_finished___Progress_dropped(self):
+
+        self.source.building = set(['spam'])
+        self.model.update()
+        self.clock.now = 1700
+        self.source.progress['spam'] = None
+        self.model.update()
+
+        self.assertEqual({}, self.model.progress())
+
+    def test___fetch___Nothing_building___Nothing_asked(self):
+
+        fetch = self.model.fetch()
+
+        self.assertEqual((set(), {}, []), (fetch.building, fetch.started, self.source.asked))
+
+
+class ProgressPresenterTests(TestCase):
+
+    def test___constructor___Builds_running___Shown_at_once_and_on_change(self):
+
+        source = StubBuildSource({'spam': BuildProgress('spam', 42, 1000, 600)})
+        source.building = set(['spam'])
+        model = BuildProgressModel(source)
+        model.update()
+        view = StubProgressView()
+
+        presenter = ProgressPresenter(model, view)
+        source.building = set()
+        model.update()
+        presenter.refresh()
+
+        self.assertEqual([{'spam': BuildProgress('spam', 42, 1000, 600)}, {}], view.shown)
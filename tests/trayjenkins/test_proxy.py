@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+import urllib2
+from StringIO import StringIO
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.jobs import JobModel, JobsDelta
+from trayjenkins.metrics import Metrics
+from trayjenkins.proxy import JobsChangeLog, ProxyUpdate, ProxyJenkins, ProxyService
+from tests.trayjenkins.fakes import StubJenkins
+
+
+def delta(changed=[], removed=[]):
+    return JobsDelta([JobModel(job, False) for job in changed], removed)
+
+
+class JobsChangeLogTests(TestCase):
+
+    def test___changes_since___New_client___Full_job_list(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK), Job('eggs', JobStatus.OK)]))
+        log.record(delta([Job('spam', JobStatus.FAILING)]))
+
+        result = log.changes_since('', 0)
+
+        self.assertEqual(ProxyUpdate('e', 2, True, [Job('spam', JobStatus.FAILING), Job('eggs', JobStatus.OK)], []),
+                         result)
+
+    def test___changes_since___Client_one_version_behind___Only_changes_sent(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK), Job('eggs', JobStatus.OK)]))
+        log.record(delta([Job('spam', JobStatus.FAILING)]))
+
+        result = log.changes_since('e', 1)
+
+        self.assertEqual(ProxyUpdate('e', 2, False, [Job('spam', JobStatus.FAILING)], []), result)
+
+    def test___changes_since___Job_changed_then_removed___Only_removal_sent(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK), Job('eggs', JobStatus.OK)]))
+        log.record(delta([Job('spam', JobStatus.FAILING)]))
+        log.record(delta(removed=['spam']))
+
+        result = log.changes_since('e', 1)
+
+        self.assertEqual(ProxyUpdate('e', 3, False, [], ['spam']), result)
+
+    def test___changes_since___Client_up_to_date___Empty_update(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK)]))
+
+        result = log.changes_since('e', 1)
+
+        self.assertEqual(ProxyUpdate('e', 1, False, [], []), result)
+
+    def test___changes_since___Client_from_other_epoch___Full_job_list(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK)]))
+        log.record(delta([Job('eggs', JobStatus.OK)]))
+
+        result = log.changes_since('restarted', 1)
+
+        self.assertTrue(result.full)
+
+    def test___changes_since___Deltas_client_needs_discarded___Full_job_list(self):
+
+        log = JobsChangeLog(max_deltas=1, epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK)]))
+        log.record(delta([Job('eggs', JobStatus.OK)]))
+        log.record(delta([Job('spam', JobStatus.FAILING)]))
+
+        result = log.changes_since('e', 1)
+
+        self.assertTrue(result.full)
+
+    def test___changes_since___Change_recorded_while_waiting___Return_change(self):
+
+        log = JobsChangeLog(epoch='e')
+        log.record(delta([Job('spam', JobStatus.OK)]))
+        timer = threading.Timer(0.05, log.record, [delta([Job('spam', JobStatus.FAILING)])])
+        timer.start()
+
+        result = log.changes_since('e', 1, wait=5)
+
+        self.assertEqual(ProxyUpdate('e', 2, False, [Job('spam', JobStatus.FAILING)], []), result)
+
+
+class FakeUrlOpen(object):
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.urls = []
+        self.timeouts = []
+
+    def __call__(self, url, data, timeout):
+        self.urls.append(url)
+        self.timeouts.append(timeout)
+        return StringIO(json.dumps(self.responses.pop(0)))
+
+
+class ProxyJenkinsTests(TestCase):
+
+    def test___list_jobs___Full_then_delta___Delta_applied_to_previous_jobs(self):
+
+        urlopen = FakeUrlOpen([ProxyUpdate('e', 1, True, [Job('spam', JobStatus.OK), Job('eggs', JobStatus.OK)], []).to_dict(),
+                               ProxyUpdate('e', 2, False, [Job('spam', JobStatus.FAILING)], ['eggs']).to_dict()])
+
+        jenkins = ProxyJenkins('http://proxy:8099/', urlopen=urlopen)
+        jenkins.list_jobs()
+        result = jenkins.list_jobs()
+
+        self.assertEqual([Job('spam', JobStatus.FAILING)], result)
+
+    def test___list_jobs___Second_call___Asks_for_changes_since_last_version(self):
+
+        urlopen = FakeUrlOpen([ProxyUpdate('e', 7, True, [], []).to_dict(),
+                               ProxyUpdate('e', 7, False, [], []).to_dict()])
+
+        jenkins = ProxyJenkins('http://proxy:8099/', urlopen=urlopen)
+        jenkins.list_jobs()
+        jenkins.list_jobs()
+
+        self.assertTrue('since=7' in urlopen.urls[1])
+        self.assertTrue('epoch=e' in urlopen.urls[1])
+
+    def test___list_jobs___Wait_given___Long_poll_asked_for_and_timeout_allows_for_it(self):
+
+        urlopen = FakeUrlOpen([ProxyUpdate('e', 7, True, [], []).to_dict()])
+
+        jenkins = ProxyJenkins('http://proxy:8099/', timeout=10, urlopen=urlopen, wait=28)
+        jenkins.list_jobs()
+
+        self.assertTrue('wait=28' in urlopen.urls[0])
+        self.assertEqual([38], urlopen.timeouts)
+
+    def test___enable_job___Proxy_refuses___Return_false(self):
+
+        def urlopen(url, data, timeout):
+            raise urllib2.HTTPError(url, 403, 'Forbidden', {}, None)
+
+        jenkins = ProxyJenkins('http://proxy:8099', urlopen=urlopen)
+
+        self.assertFalse(jenkins.enable_job('spam'))
+
+
+class ProxyServiceTests(TestCase):
+
+    def setUp(self):
+
+        self.jenkins = StubJenkins([Job('spam', JobStatus.OK), Job('eggs', JobStatus.FAILING)])
+        self.service = ProxyService(self.jenkins,
+                                    'http://jenkins',
+                                    address=('127.0.0.1', 0),
+                                    interval=3600,
+                                    allow_control=True,
+                                    metrics=Metrics())
+        self.service.poll()
+        self.thread = threading.Thread(target=self.service._server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.service.address()[1]
+
+    def tearDown(self):
+
+        self.service.shutdown()
+        self.thread.join()
+
+    def test___Several_clients_list_jobs___Jenkins_polled_once(self):
+
+        clients = [ProxyJenkins(self.url) for i in range(5)]  # @UnusedVariable
+        results = [client.list_jobs() for client in clients]
+
+        self.assertEqual([[Job('spam', JobStatus.OK), Job('eggs', JobStatus.FAILING)]] * 5, results)
+        self.assertEqual(1, self.jenkins.list_count)
+
+    def test___Client_long_polls___Change_polled_meanwhile_pushed_before_wait_ends(self):
+
+        client = ProxyJenkins(self.url, wait=30)
+        client.list_jobs()
+        self.jenkins.results = [[Job('spam', JobStatus.FAILING), Job('eggs', JobStatus.FAILING)]]
+        timer = threading.Timer(0.05, self.service.poll)
+        timer.start()
+        started = time.time()
+        result = client.list_jobs()
+
+        self.assertEqual([Job('spam', JobStatus.FAILING), Job('eggs', JobStatus.FAILING)], result)
+        self.assertTrue(time.time() - started < 10)
+
+    def test___Client_disables_job___Forwarded_to_jenkins(self):
+
+        result = ProxyJenkins(self.url).disable_job('spam')
+
+        self.assertTrue(result)
+        self.assertEqual(['spam'], self.jenkins.disabled)
+
+    def test___Get_metrics___Poll_timings_served_as_json(self):
+
+        metrics = json.load(urllib2.urlopen(self.url + '/metrics', timeout=5))
+
+        self.assertEqual(1, metrics['timers']['list_jobs']['count'])
+
+    def test___Get_jobs_with_bad_version___Bad_request(self):
+
+        try:
+            urllib2.urlopen(self.url + '/jobs?since=spam', timeout=5)
+            code = 200
+        except urllib2.HTTPError as error:
+            code = error.code
+
+        self.assertEqual(400, code)
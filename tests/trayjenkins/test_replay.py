@@ -0,0 +1,162 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.errors import ServerUnreachableError
+from trayjenkins.event import Event
+from trayjenkins.jobs import IErrorLogger, Model
+from trayjenkins.replay import ReplayJenkins, RecordingJenkins, TracePoll, TraceWriter, read_trace
+from tests.trayjenkins.fakes import FakeClock, RecordingHandler, StubJenkins
+
+
+class TraceTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'polls.trace')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def write(self, *polls):
+
+        writer = TraceWriter(self.path, self.clock)
+        for seconds, jobs in polls:
+            self.clock.now = 1000.0 + seconds
+            if isinstance(jobs, str):
+                writer.write_error(jobs)
+            else:
+                writer.write_jobs(jobs)
+        return writer
+
+    def test___read_trace___Polls_written___Same_jobs_and_times(self):
+
+        first = [Job('spam', JobStatus.OK), Job('eggs', JobStatus.FAILING)]
+        second = [Job('spam', JobStatus.DISABLED), Job('eggs', JobStatus.FAILING)]
+        third = [Job('eggs', JobStatus.OK), Job('beans', 'building')]
+        self.write((0, first), (15, second), (30.5, third)).close()
+
+        polls = read_trace(self.path)
+
+        self.assertEqual([0, 15, 30.5], [poll.seconds for poll in polls])
+        self.assertEqual([first, second, third], [poll.jobs for poll in polls])
+
+    def test___write_jobs___Only_statuses_changed___Written_as_changes(self):
+
+        jobs = [Job('spam-%d' % index, JobStatus.OK) for index in range(100)]
+        changed = list(jobs)
+        changed[42] = Job('spam-42', JobStatus.FAILING)
+        self.write((0, jobs), (15, changed)).close()
+
+        lines = gzip.open(self.path, 'rb').read().splitlines()
+
+        self.assertEqual('{"set":[[42,"f"]],"t":15.0}', lines[2])
+
+    def test___read_trace___Error_recorded___Poll_without_jobs(self):
+
+        self.write((0, 'Jenkins unreachable: timed out')).close()
+
+        poll = read_trace(self.path)[0]
+
+        self.assertEqual((None, 'Jenkins unreachable: timed out'), (poll.jobs, poll.error))
+
+    def test___read_trace___Writer_not_closed___Polls_flushed_so_far(self):
+
+        writer = self.write((0, [Job('spam', JobStatus.OK)]), (15, [Job('spam', JobStatus.FAILING)]))
+
+        polls = read_trace(self.path)
+        writer.close()
+
+        self.assertEqual([[Job('spam', JobStatus.OK)], [Job('spam', JobStatus.FAILING)]],
+                         [poll.jobs for poll in polls])
+
+
+class RecordingJenkinsTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'polls.trace')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def test___list_jobs___Jobs_and_unreachable___Both_recorded(self):
+
+        jobs = [Job('spam', JobStatus.OK)]
+        writer = TraceWriter(self.path)
+        jenkins = RecordingJenkins(StubJenkins(jobs, ServerUnreachableError('down')), writer)
+
+        self.assertEqual(jobs, jenkins.list_jobs())
+        self.assertRaises(ServerUnreachableError, jenkins.list_jobs)
+        writer.close()
+
+        self.assertEqual([(jobs, None), (None, 'down')],
+                         [(poll.jobs, poll.error) for poll in read_trace(self.path)])
+
+    def test___get_job___Wrapped_Jenkins_cannot___Return_None(self):
+
+        jenkins = RecordingJenkins(StubJenkins(), None)
+
+        self.assertEqual(None, jenkins.get_job('spam'))
+
+
+class ReplayJenkinsTests(TestCase):
+
+    def setUp(self):
+
+        self.polls = [TracePoll(0, [Job('spam', JobStatus.OK)]),
+                      TracePoll(15, None, 'Jenkins unreachable: timed out'),
+                      TracePoll(30, [Job('spam', JobStatus.FAILING)])]
+        self.clock = FakeClock()
+
+    def test___list_jobs___As_fast_as_possible___Recorded_polls_without_waiting(self):
+
+        jenkins = ReplayJenkins(self.polls, clock=self.clock, sleep=self.clock.sleep)
+
+        self.assertEqual([Job('spam', JobStatus.OK)], jenkins.list_jobs())
+        self.assertRaises(ServerUnreachableError, jenkins.list_jobs)
+        self.assertEqual([Job('spam', JobStatus.FAILING)], jenkins.list_jobs())
+        self.assertEqual([], self.clock.sleeps)
+
+    def test___list_jobs___Real_time___Waits_until_each_poll_is_due(self):
+
+        jenkins = ReplayJenkins(self.polls, real_time=True, clock=self.clock, sleep=self.clock.sleep)
+
+        jenkins.list_jobs()
+        self.clock.now += 5
+        self.assertRaises(ServerUnreachableError, jenkins.list_jobs)
+        self.clock.now += 20
+        jenkins.list_jobs()
+
+        self.assertEqual([10], self.clock.sleeps)
+
+    def test___list_jobs___Trace_finished___Last_jobs_again(self):
+
+        jenkins = ReplayJenkins(self.polls)
+        for unused in range(3):  # @UnusedVariable
+            try:
+                jenkins.list_jobs()
+            except ServerUnreachableError:
+                pass
+
+        self.assertTrue(jenkins.finished())
+        self.assertEqual([Job('spam', JobStatus.FAILING)], jenkins.list_jobs())
+
+    def test___update_jobs___Replayed_into_jobs_model___Fires_recorded_changes(self):
+
+        model = Model(ReplayJenkins(self.polls), IErrorLogger(), Event())
+        handler = RecordingHandler()
+        model.jobs_updated_event().register(handler)
+        for unused in range(3):  # @UnusedVariable
+            model.update_jobs()
+
+        self.assertEqual([[JobStatus.OK], [JobStatus.FAILING]],
+                         [[job_model.job.status for job_model in models] for (models,) in handler.calls])
@@ -0,0 +1,194 @@
+import mox
+import socket
+import urllib2
+from unittest import TestCase
+
+from pyjenkins.jenkins import Jenkins
+from trayjenkins.metrics import Metrics
+from trayjenkins.resilience import CircuitBreaker, ResilientJenkins, ServerUnreachableError, \
+    ThrottledError, TokenBucket
+from tests.trayjenkins.fakes import FakeClock
+
+
+class TokenBucketTests(TestCase):
+
+    def test___try_acquire___Burst_up_to_capacity___Then_refused(self):
+
+        bucket = TokenBucket(1, 3, FakeClock())
+
+        self.assertEqual([True, True, True, False], [bucket.try_acquire() for unused in range(4)])  # @UnusedVariable
+
+    def test___try_acquire___Time_passes___Tokens_refilled_at_rate(self):
+
+        clock = FakeClock()
+        bucket = TokenBucket(0.5, 1, clock)
+        bucket.try_acquire()
+        clock.now += 1
+
+        self.assertFalse(bucket.try_acquire())
+        clock.now += 1
+        self.assertTrue(bucket.try_acquire())
+
+    def test___try_acquire___Long_idle___No_more_than_capacity(self):
+
+        clock = FakeClock()
+        bucket = TokenBucket(1, 2, clock)
+        clock.now += 3600
+
+        self.assertEqual([True, True, False], [bucket.try_acquire() for unused in range(3)])  # @UnusedVariable
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, max_reset_seconds=25, clock=self.clock)
+
+    def test___allow___Failures_below_threshold___Closed(self):
+
+        self.breaker.record_failure()
+
+        self.assertTrue(self.breaker.allow())
+
+    def test___allow___Threshold_reached___Open_until_reset(self):
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(10, self.breaker.retry_in())
+
+    def test___allow___Reset_passed___One_probe_allowed(self):
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+
+        self.assertEqual([True, False], [self.breaker.allow(), self.breaker.allow()])
+        self.assertEqual(CircuitBreaker.HALF_OPEN, self.breaker.state)
+
+    def test___record_failure___Probe_fails___Reopened_for_twice_as_long_up_to_max(self):
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        delays = []
+        for unused in range(3):  # @UnusedVariable
+            self.clock.now += self.breaker.retry_in()
+            self.breaker.allow()
+            self.breaker.record_failure()
+            delays.append(self.breaker.retry_in())
+
+        self.assertEqual([20, 25, 25], delays)
+
+    def test___record_success___Probe_succeeds___Closed(self):
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+        self.breaker.allow()
+        self.breaker.record_success()
+
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+
+class ResilientJenkinsTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.jenkins = self.mocks.CreateMock(Jenkins)
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=self.clock)
+        self.bucket = TokenBucket(1, 10, self.clock)
+
+    def test___list_jobs___Connection_refused___ServerUnreachableError(self):
+
+        self.jenkins.list_jobs().AndRaise(urllib2.URLError('refused'))
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertRaises(ServerUnreachableError, resilient.list_jobs)
+
+    def test___list_jobs___Circuit_open___Jenkins_not_called(self):
+
+        self.jenkins.list_jobs().AndRaise(socket.timeout('timed out'))
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+        self.assertRaises(ServerUnreachableError, resilient.list_jobs)
+        self.assertRaises(ServerUnreachableError, resilient.list_jobs)
+
+        mox.Verify(self.jenkins)
+
+    def test___list_jobs___Bucket_empty___ThrottledError_and_Jenkins_not_called(self):
+
+        self.mocks.ReplayAll()
+        metrics = Metrics()
+
+        resilient = ResilientJenkins(self.jenkins, TokenBucket(1, 0, self.clock), self.breaker, metrics)
+
+        self.assertRaises(ThrottledError, resilient.list_jobs)
+        self.assertEqual(1, metrics.snapshot()['counters']['throttled'])
+
+    def test___list_jobs___Client_error___Raised_as_is_and_circuit_stays_closed(self):
+
+        self.jenkins.list_jobs().AndRaise(urllib2.HTTPError('http://jenkins', 401, 'Unauthorized', {}, None))
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertRaises(urllib2.HTTPError, resilient.list_jobs)
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def test___list_jobs___Half_open_probe_raises_ValueError___Reopened_and_probed_again_later(self):
+
+        self.jenkins.list_jobs().AndRaise(socket.timeout('timed out'))
+        self.jenkins.list_jobs().AndRaise(ValueError('Truncated response'))
+        self.jenkins.list_jobs().AndReturn([])
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+        self.assertRaises(ServerUnreachableError, resilient.list_jobs)
+        self.clock.now += 10
+        self.assertRaises(ValueError, resilient.list_jobs)
+        state = self.breaker.state
+        self.clock.now += 20
+
+        self.assertEqual((CircuitBreaker.OPEN, []), (state, resilient.list_jobs()))
+        mox.Verify(self.jenkins)
+
+    def test___enable_job___Jenkins_answers___Result_returned(self):
+
+        self.jenkins.enable_job('spam').AndReturn(True)
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertTrue(resilient.enable_job('spam'))
+
+    def test___get_job___Wrapped_Jenkins_cannot_get_one_job___None(self):
+
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertEqual(None, resilient.get_job('spam'))
+
+    def test___build_progress___Wrapped_Jenkins_cannot_tell___None_and_nothing_building(self):
+
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertEqual((None, frozenset()), (resilient.build_progress('spam'), resilient.building_jobs()))
+
+    def test___job_upstreams___Wrapped_Jenkins_cannot_tell___None(self):
+
+        self.mocks.ReplayAll()
+
+        resilient = ResilientJenkins(self.jenkins, self.bucket, self.breaker)
+
+        self.assertEqual(None, resilient.job_upstreams())
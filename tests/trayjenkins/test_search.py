@@ -0,0 +1,125 @@
+import mox
+from unittest import TestCase
+
+from trayjenkins.event import Event
+from trayjenkins.search import ISearchView, JobSearch, SearchPresenter, TrigramIndex
+from tests.trayjenkins.fakes import RecordingHandler, StubJobsModel, job_model
+
+
+def jobs(*names):
+    return [job_model(name) for name in names]
+
+
+class TrigramIndexTests(TestCase):
+
+    def setUp(self):
+
+        self.index = TrigramIndex()
+        for name in ['Spam-Build', 'eggs-build', 'spam-deploy', 'ab']:
+            self.index.add(name)
+
+    def test___search___Long_query___Names_containing_it_ignoring_case(self):
+
+        self.assertEqual(set(['Spam-Build', 'eggs-build']), self.index.search('-BUILD'))
+
+    def test___search___Trigrams_present_but_not_in_order___No_match(self):
+
+        self.index.add('uildxx-b')
+
+        self.assertEqual(set(), self.index.search('buildx'))
+
+    def test___search___One_or_two_characters___Matched_anywhere_in_name(self):
+
+        self.assertEqual(set(['ab']), self.index.search('ab'))
+        self.assertEqual(set(['Spam-Build', 'spam-deploy']), self.index.search('pa'))
+        self.assertEqual(set(['Spam-Build', 'eggs-build', 'ab']), self.index.search('b'))
+
+    def test___search___Empty_query___All_names(self):
+
+        self.assertEqual(4, len(self.index.search('')))
+
+    def test___remove___Name_removed___No_longer_found(self):
+
+        self.index.remove('spam-deploy')
+        self.index.remove('spam-deploy')
+
+        self.assertEqual(set(['Spam-Build']), self.index.search('spam'))
+        self.assertEqual(set(), self.index.search('deploy'))
+        self.assertEqual(3, len(self.index))
+
+    def test___search___One_character_in_name_shorter_than_trigram___Found(self):
+
+        self.assertEqual(set(['Spam-Build', 'spam-deploy', 'ab']), self.index.search('a'))
+
+    def test___remove___Last_name_with_trigram_removed___Trigram_dropped_from_short_key_map(self):
+
+        self.index.remove('spam-deploy')
+
+        self.assertEqual(set(['Spam-Build', 'eggs-build']), self.index.search('-'))
+        self.assertEqual(set(), self.index.search('lo'))
+
+    def test___remove___Name_removed___Short_queries_no_longer_find_it(self):
+
+        self.index.remove('spam-deploy')
+
+        self.assertEqual(set(), self.index.search('y'))
+        self.assertEqual(set(['Spam-Build']), self.index.search('pa'))
+
+
+class JobSearchTests(TestCase):
+
+    def setUp(self):
+
+        self.jobs_model = StubJobsModel()
+        self.search = JobSearch(self.jobs_model)
+        handler = RecordingHandler()
+        self.fired = handler.calls
+        self.search.matches_changed_event().register(handler)
+        self.jobs_model.fire_delta(jobs('spam', 'eggs', 'spam-eggs'))
+
+    def test___search___Query___Matches_fired(self):
+
+        self.search.search('egg')
+
+        self.assertEqual([(set(['eggs', 'spam-eggs']),)], self.fired)
+
+    def test___search___Query_cleared___None_fired(self):
+
+        self.search.search('egg')
+        self.search.search('')
+
+        self.assertEqual((None,), self.fired[-1])
+
+    def test___jobs_delta___Matching_job_added_and_another_removed___Matches_fired(self):
+
+        self.search.search('spam')
+        self.jobs_model.fire_delta(jobs('spam-and-more-spam'), ['spam-eggs'])
+
+        self.assertEqual((set(['spam', 'spam-and-more-spam']),), self.fired[-1])
+
+    def test___jobs_delta___Only_statuses_changed___Nothing_fired(self):
+
+        self.search.search('spam')
+        self.jobs_model.fire_delta(jobs('spam', 'eggs'))
+
+        self.assertEqual(1, len(self.fired))
+
+
+class SearchPresenterTests(TestCase):
+
+    def test___Constructor___View_fires_query_changed___Search_made_and_view_given_matches(self):
+
+        mocks = mox.Mox()
+        view = mocks.CreateMock(ISearchView)
+        query_changed_event = Event()
+        view.query_changed_event().AndReturn(query_changed_event)
+        view.set_matches(set(['spam']))
+        mocks.ReplayAll()
+
+        jobs_model = StubJobsModel()
+        search = JobSearch(jobs_model)
+        jobs_model.fire_delta(jobs('spam', 'eggs'))
+        presenter = SearchPresenter(search, view)  # @UnusedVariable
+        query_changed_event.fire('sp')
+
+        mox.Verify(view)
@@ -1,7 +1,12 @@
 import mox
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 
-from trayjenkins.settings import Settings, CommandLineSettingsParser
+from trayjenkins.config import ConfigError
+from trayjenkins.settings import Settings, CommandLineSettingsParser, \
+    ProxySettings, ProxyCommandLineSettingsParser
 
 
 class SettingsTests(TestCase):
@@ -34,6 +39,13 @@ class SettingsTests(TestCase):
 
         self.assertFalse(one == two)
 
+    def test_Equality_operator___Notify_port_differs___Return_false(self):
+
+        one = Settings('host', notify_port=8098)
+        two = Settings('host', notify_port=9000)
+
+        self.assertFalse(one == two)
+
     def test_Equality_operator___Compare_with_None___Return_false(self):
 
         settings = Settings('host', username='username', password='password')
@@ -43,7 +55,8 @@ class SettingsTests(TestCase):
     def test_repr_ReturnsSensibleResult(self):
 
         settings = Settings('camelot', username='arthur', password='silly place')
-        expected = "Settings(host='camelot',username='arthur',password='silly place')"
+        expected = "Settings(host='camelot',username='arthur',password='silly place',notify_port=None,metrics_interval=None,history_dir=None,tree=False,stream=False," \
+                   "poll_interval=15,request_timeout=10,poll_burst=3,ignore_patterns=(),record_path=None,views=())"
         self.assertEquals(expected, settings.__repr__())
 
 
@@ -96,3 +109,190 @@ class CommandLineSettingsParserTests(TestCase):
         result = parser.parse_args(['--password', 'aramathea', 'hostname'])
 
         self.assertEquals(expected, result)
+
+    def test_parse___Notify_port_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', notify_port=8098)
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--notify-port', '8098', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Metrics_interval_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', metrics_interval=60)
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--metrics', '60', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___History_dir_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', history_dir='/var/lib/history')
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--history', '/var/lib/history', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Tree_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', tree=True)
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--tree', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Stream_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', stream=True)
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--stream', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Record_path_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', record_path='polls.trace')
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--record', 'polls.trace', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Views_and_host___Return_appropriate_settings(self):
+
+        expected = Settings('hostname', views=[('team', ('team-*', 'lib-*')), ('release', ('release-*',))])
+        parser = CommandLineSettingsParser()
+        result = parser.parse_args(['--views', 'team=team-*,lib-*; release=release-*', 'hostname'])
+
+        self.assertEquals(expected, result)
+
+
+class LayeredSettingsTests(TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'trayjenkins.ini')
+        with open(self.path, 'w') as config:
+            config.write('[trayjenkins]\n'
+                         'host = http://jenkins\n'
+                         'username = arthur\n'
+                         'poll_interval = 30\n'
+                         'ignore_patterns = sandbox-*, *-nightly\n'
+                         '[profile staging]\n'
+                         'host = http://staging\n'
+                         'tree = yes\n')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.directory)
+
+    def test_parse___Config_file___Settings_from_file(self):
+
+        expected = Settings('http://jenkins', username='arthur', poll_interval=30,
+                            ignore_patterns=('sandbox-*', '*-nightly'))
+        parser = CommandLineSettingsParser({})
+        result = parser.parse_args(['--config', self.path])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___Profile___Profile_section_overrides_common_section(self):
+
+        parser = CommandLineSettingsParser({'TRAYJENKINS_CONFIG': self.path})
+        result = parser.parse_args(['--profile', 'staging'])
+
+        self.assertEquals(('http://staging', 'arthur', True), (result.host, result.username, result.tree))
+
+    def test_parse___Environment_and_command_line___Command_line_over_environment_over_file(self):
+
+        parser = CommandLineSettingsParser({'TRAYJENKINS_PASSWORD': 'grail',
+                                            'TRAYJENKINS_POLL_INTERVAL': '60',
+                                            'TRAYJENKINS_USERNAME': 'lancelot'})
+        result = parser.parse_args(['--config', self.path, '--poll-interval', '5', 'http://other'])
+
+        self.assertEquals(('http://other', 'lancelot', 'grail', 5),
+                          (result.host, result.username, result.password, result.poll_interval))
+
+    def test_parse___Unknown_profile___ConfigError(self):
+
+        parser = CommandLineSettingsParser({})
+
+        self.assertRaises(ConfigError, parser.parse_args, ['--config', self.path, '--profile', 'live'])
+
+    def test_parse___Bad_number_in_environment___ConfigError(self):
+
+        parser = CommandLineSettingsParser({'TRAYJENKINS_POLL_INTERVAL': 'often'})
+
+        self.assertRaises(ConfigError, parser.parse_args, ['--config', self.path])
+
+    def test_parse___Zero_poll_interval_in_file___ConfigError(self):
+
+        with open(self.path, 'a') as config:
+            config.write('[profile busy]\n'
+                         'poll_interval = 0\n')
+        parser = CommandLineSettingsParser({})
+
+        self.assertRaises(ConfigError, parser.parse_args, ['--config', self.path, '--profile', 'busy'])
+
+    def test_parse___Negative_timeout_on_command_line___ConfigError(self):
+
+        parser = CommandLineSettingsParser({})
+
+        self.assertRaises(ConfigError, parser.parse_args, ['--config', self.path, '--timeout', '-1'])
+
+    def test_parse___Zero_metrics_interval_in_environment___Metrics_off(self):
+
+        parser = CommandLineSettingsParser({'TRAYJENKINS_METRICS_INTERVAL': '0'})
+        result = parser.parse_args(['--config', self.path])
+
+        self.assertEquals(None, result.metrics_interval)
+
+    def test_parse___Ignore_patterns_on_command_line___Split_on_commas(self):
+
+        parser = CommandLineSettingsParser({})
+        result = parser.parse_args(['--config', os.path.join(self.directory, 'none.ini'),
+                                    '--ignore', 'spam-*,eggs', 'hostname'])
+
+        self.assertEquals(('spam-*', 'eggs'), result.ignore_patterns)
+
+    def test_parse___Proxy_with_config_file___Poll_interval_from_file(self):
+
+        parser = ProxyCommandLineSettingsParser({})
+        result = parser.parse_args(['--config', self.path, '--port', '9000'])
+
+        self.assertEquals((30, 9000), (result.jenkins.poll_interval, result.port))
+
+
+class ProxyCommandLineSettingsParserTests(TestCase):
+
+    def test_parse___Empty_list___Return_None(self):
+
+        parser = ProxyCommandLineSettingsParser()
+        result = parser.parse_args([])
+
+        self.assertEquals(None, result)
+
+    def test_parse___Zero_port___ConfigError(self):
+
+        parser = ProxyCommandLineSettingsParser({})
+
+        self.assertRaises(ConfigError, parser.parse_args, ['--port', '0', 'hostname'])
+
+    def test_parse___Just_host___Return_default_proxy_settings(self):
+
+        expected = ProxySettings(Settings('hostname'))
+        parser = ProxyCommandLineSettingsParser()
+        result = parser.parse_args(['hostname'])
+
+        self.assertEquals(expected, result)
+
+    def test_parse___All_options___Return_appropriate_settings(self):
+
+        expected = ProxySettings(Settings('hostname', username='arthur', password='grail', poll_interval=30),
+                                 port=9000,
+                                 allow_control=True)
+        parser = ProxyCommandLineSettingsParser()
+        result = parser.parse_args(['-u', 'arthur', '-p', 'grail', '--port', '9000',
+                                    '--poll-interval', '30', '--allow-control', 'hostname'])
+
+        self.assertEquals(expected, result)
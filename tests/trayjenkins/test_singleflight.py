@@ -0,0 +1,139 @@
+import sys
+import threading
+from StringIO import StringIO
+from unittest import TestCase
+
+from trayjenkins.singleflight import SerialWorker, SingleFlight
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+
+        self.flights = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def _slow(self, value):
+
+        self.calls.append(value)
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _follow(self, key, value, results):
+
+        try:
+            results.append(self.flights.do(key, self._slow, value))
+        except Exception as error:
+            results.append(error)
+
+    def _run_two(self, key, value):
+
+        results = []
+        leader = threading.Thread(target=self._follow, args=(key, value, results))
+        leader.start()
+        self.started.wait(5)
+        follower = threading.Thread(target=self._follow, args=(key, value, results))
+        follower.start()
+        while self.flights.followers(key) == 0:
+            follower.join(0.01)
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+        return results
+
+    def test___do___Same_key_in_flight_on_another_thread___Called_once_and_result_shared(self):
+
+        results = self._run_two('key', 'spam')
+
+        self.assertEqual(['spam'], self.calls)
+        self.assertEqual(['spam', 'spam'], results)
+
+    def test___do___Leader_raises___Follower_gets_the_same_exception(self):
+
+        error = IOError('refused')
+
+        results = self._run_two('key', error)
+
+        self.assertEqual([error], self.calls)
+        self.assertEqual([error, error], results)
+
+    def test___do___Called_again_on_the_same_thread___Returns_None_without_calling(self):
+
+        inner = []
+
+        def outer():
+            inner.append(self.flights.do('key', self.calls.append, 'inner'))
+            return 'outer'
+
+        self.assertEqual('outer', self.flights.do('key', outer))
+        self.assertEqual([None], inner)
+        self.assertEqual([], self.calls)
+
+    def test___do___After_completion___Next_call_runs_again(self):
+
+        self.flights.do('key', self.calls.append, 'spam')
+        self.flights.do('key', self.calls.append, 'eggs')
+
+        self.assertEqual(['spam', 'eggs'], self.calls)
+        self.assertFalse(self.flights.in_flight('key'))
+
+
+class SerialWorkerTests(TestCase):
+
+    def setUp(self):
+
+        self.worker = SerialWorker('test-worker')
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+        self.calls = []
+
+    def _poll(self):
+
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        self.calls.append('poll')
+        self.started.set()
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+
+    def test___submit___Polls_overlap___Run_one_at_a_time_and_waiting_duplicate_dropped(self):
+
+        self.worker.submit(self._poll)
+        self.started.wait(5)
+        queued = [self.worker.submit(self._poll), self.worker.submit(self._poll)]
+        self.release.set()
+        self.worker.submit(self.finished.set)
+        self.finished.wait(5)
+
+        self.assertEqual([True, False], queued)
+        self.assertEqual(['poll', 'poll'], self.calls)
+        self.assertEqual(1, self.most_running)
+
+    def test___submit___Call_raises___Worker_keeps_running(self):
+
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            self.worker.submit(self._raise)
+            self.worker.submit(self.finished.set)
+            finished = self.finished.wait(5)
+            traceback = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+
+        self.assertTrue(finished)
+        self.assertTrue(traceback.endswith('IOError: refused\n'))
+
+    def _raise(self):
+
+        raise IOError('refused')
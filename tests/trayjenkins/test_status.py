@@ -2,10 +2,13 @@ import mox
 from unittest import TestCase
 
 from trayjenkins.event import Event, IEvent
-from trayjenkins.jobs import IModel as JobsModel, IFilter, JobModel
+from trayjenkins.graph import GraphModel, JobGraph
+from trayjenkins.jobs import IModel as JobsModel, IFilter, JobModel, JobsDelta, NameJobsFilter
 from trayjenkins.status import IModel, IView, Presenter, IMessageComposer,\
-    IStatusReader, Model, StatusReader, DefaultMessageComposer
+    IStatusReader, Model, StatusReader, DefaultMessageComposer, UNREACHABLE, BadgePresenter, IBadgeView,\
+    BoundedMessageComposer
 from pyjenkins.job import Job, JobStatus
+from tests.trayjenkins.fakes import RecordingHandler, StubGraphSource, StubJobsModel
 
 
 class StatusPresenterTests(TestCase):
@@ -40,7 +43,10 @@ class StatusModelTests(TestCase):
         self.statusEvent = self.mocks.CreateMock(IEvent)
         self.jobsModel = self.mocks.CreateMock(JobsModel)
         self.jobsEvent = Event()
+        self.unreachableEvent = Event()
         self.jobsModel.jobs_updated_event().AndReturn(self.jobsEvent)
+        self.jobsModel.jobs_delta_event().AndReturn(Event())
+        self.jobsModel.server_unreachable_event().AndReturn(self.unreachableEvent)
         self.jobs = [Job('who', 'cares?')]
         self.job_models = [JobModel(self.jobs[0], False)]
 
@@ -168,6 +174,347 @@ class StatusModelTests(TestCase):
         mox.Verify(self.statusEvent)
 
 
+class StatusModelUnreachableTests(TestCase):
+
+    def setUp(self):
+
+        self.mocks = mox.Mox()
+        self.jobsModel = self.mocks.CreateMock(JobsModel)
+        self.statusEvent = self.mocks.CreateMock(IEvent)
+        self.deltaEvent = Event()
+        self.unreachableEvent = Event()
+        self.jobsModel.jobs_delta_event().AndReturn(self.deltaEvent)
+        self.jobsModel.server_unreachable_event().AndReturn(self.unreachableEvent)
+
+    def test_serverUnreachable_Reason_StatusChangedEventFiredWithUnreachable(self):
+
+        self.statusEvent.fire(UNREACHABLE, 'Jenkins unreachable: refused')
+        self.mocks.ReplayAll()
+
+        model = Model(self.jobsModel, IgnoreJobsFilterStub(), status_changed_event=self.statusEvent)  # @UnusedVariable
+        self.unreachableEvent.fire('Jenkins unreachable: refused')
+
+        mox.Verify(self.statusEvent)
+
+    def test_serverReachableAgain_JobsSeenBefore_StatusFromThoseJobsFiredAgain(self):
+
+        job_models = [JobModel(Job('eric', JobStatus.OK), False)]
+        self.statusEvent.fire(JobStatus.OK, 'All active jobs pass')
+        self.statusEvent.fire(UNREACHABLE, 'refused')
+        self.statusEvent.fire(JobStatus.OK, 'All active jobs pass')
+        self.mocks.ReplayAll()
+
+        model = Model(self.jobsModel, IgnoreJobsFilterStub(), status_changed_event=self.statusEvent)  # @UnusedVariable
+        self.deltaEvent.fire(JobsDelta(job_models, []))
+        self.unreachableEvent.fire('refused')
+        self.unreachableEvent.fire(None)
+
+        mox.Verify(self.statusEvent)
+
+
+class StatusModelMessageTests(TestCase):
+
+    def setUp(self):
+
+        self.jobs_event = Event()
+        self.delta_event = Event()
+        self.handler = RecordingHandler()
+        self.model = Model(StubJobsModel(self.jobs_event, self.delta_event),
+                           IgnoreJobsFilterStub(),
+                           BoundedMessageComposer(limit=2),
+                           status_changed_event=Event())
+        self.model.status_changed_event().register(self.handler)
+
+    def update(self, changed, removed=()):
+
+        self.delta_event.fire(JobsDelta(changed, list(removed)))
+
+    def test_updateStatus_FailuresBeyondLimit_CountedAndOnlyNamedChangesFired(self):
+
+        eric = JobModel(Job('eric', JobStatus.FAILING), False)
+        john = JobModel(Job('john', JobStatus.FAILING), False)
+        terry = JobModel(Job('terry', JobStatus.FAILING), False)
+        graham = JobModel(Job('graham', JobStatus.OK), False)
+        self.update([eric, graham])
+        self.update([john, terry])
+        self.update([], ['graham'])
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\neric'),
+                          (JobStatus.FAILING, 'FAILING:\nterry\njohn\n+1 more')], self.handler.calls)
+
+
+class StatusModelRootCauseTests(TestCase):
+
+    def setUp(self):
+
+        self.delta_event = Event()
+        self.graph_model = GraphModel(StubGraphSource({'compile': (), 'test': ('compile',), 'package': ('test',)}))
+        self.handler = RecordingHandler()
+        self.model = Model(StubJobsModel(Event(), self.delta_event), IgnoreJobsFilterStub(), graph_model=self.graph_model)
+        self.model.status_changed_event().register(self.handler)
+
+    def test_updateStatus_DownstreamJobsFail_OnlyRootNamedAndNotFiredAgain(self):
+
+        self.graph_model.update()
+        self.delta_event.fire(JobsDelta([JobModel(Job('compile', JobStatus.FAILING), False),
+                                         JobModel(Job('test', JobStatus.FAILING), False)], []))
+        self.delta_event.fire(JobsDelta([JobModel(Job('package', JobStatus.FAILING), False)], []))
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\ncompile (+1 downstream)')], self.handler.calls)
+
+    def test_updateStatus_GraphArrivesAfterJobs_ComposedAgain(self):
+
+        self.delta_event.fire(JobsDelta([JobModel(Job('compile', JobStatus.FAILING), False),
+                                         JobModel(Job('test', JobStatus.FAILING), False)], []))
+        self.graph_model.update()
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\ntest\ncompile'),
+                          (JobStatus.FAILING, 'FAILING:\ncompile (+1 downstream)')], self.handler.calls)
+
+
+class StatusModelFailingCountTests(TestCase):
+
+    def setUp(self):
+
+        self.delta_event = Event()
+        self.handler = RecordingHandler()
+        self.model = Model(StubJobsModel(Event(), self.delta_event), IgnoreJobsFilterStub(), status_changed_event=Event())
+        self.model.failing_count_event().register(self.handler)
+
+    def test_failingCount_JobsUpdated_FiredOnlyWhenCountChanges(self):
+
+        eric_failing = JobModel(Job('eric', JobStatus.FAILING), False)
+        john_ok = JobModel(Job('john', JobStatus.OK), False)
+        john_failing = JobModel(Job('john', JobStatus.FAILING), False)
+        self.delta_event.fire(JobsDelta([eric_failing, john_ok], []))
+        self.delta_event.fire(JobsDelta([john_ok], []))
+        self.delta_event.fire(JobsDelta([john_failing], []))
+        self.delta_event.fire(JobsDelta([], ['eric', 'john']))
+
+        self.assertEqual([(1,), (2,), (0,)], self.handler.calls)
+
+
+class StatusModelViewsTests(TestCase):
+
+    def test_updateStatus_TwoFiltersOverOneJobsModel_EachFiresItsOwnStatus(self):
+
+        delta_event = Event()
+        jobs_model = StubJobsModel(Event(), delta_event)
+        team = RecordingHandler()
+        release = RecordingHandler()
+        Model(jobs_model, NameJobsFilter(['team-*'])).status_changed_event().register(team)
+        Model(jobs_model, NameJobsFilter(['release-*'])).status_changed_event().register(release)
+
+        delta_event.fire(JobsDelta([JobModel(Job('team-spam', JobStatus.FAILING), False),
+                                    JobModel(Job('release-eggs', JobStatus.OK), False)], []))
+        delta_event.fire(JobsDelta([JobModel(Job('team-spam', JobStatus.OK), False)], []))
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\nteam-spam'), (JobStatus.OK, 'All active jobs pass')],
+                         team.calls)
+        self.assertEqual([(JobStatus.OK, 'All active jobs pass')], release.calls)
+
+    def test_updateStatus_JobNoLongerKeptByFilter_DroppedFromStatus(self):
+
+        delta_event = Event()
+        handler = RecordingHandler()
+        model = Model(StubJobsModel(Event(), delta_event), NameJobsFilter(['team-*']))
+        model.status_changed_event().register(handler)
+
+        delta_event.fire(JobsDelta([JobModel(Job('team-spam', JobStatus.FAILING), False)], []))
+        delta_event.fire(JobsDelta([JobModel(Job('team-spam', JobStatus.FAILING), True)], []))
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\nteam-spam'), (JobStatus.OK, 'No jobs')], handler.calls)
+
+
+class StatusModelForgetTests(TestCase):
+
+    def test_updateStatus_JobRemoved_FilterForgetsIt(self):
+
+        mocks = mox.Mox()
+        jobs_filter = mocks.CreateMock(NameJobsFilter)
+        jobs_filter.filter_jobs([]).AndReturn([])
+        jobs_filter.forget(['team-spam'])
+        mocks.ReplayAll()
+        delta_event = Event()
+        Model(StubJobsModel(Event(), delta_event), jobs_filter)
+
+        delta_event.fire(JobsDelta([], ['team-spam']))
+
+        mox.Verify(jobs_filter)
+
+
+class StatusModelPendingTests(TestCase):
+
+    def setUp(self):
+
+        self.jobs_event = Event()
+        self.delta_event = Event()
+        self.handler = RecordingHandler()
+        self.failing = JobModel(Job('spam', JobStatus.FAILING), False)
+        self.disabling = JobModel(Job('spam', JobStatus.DISABLED), False, True)
+
+    def test_updateStatus_DisablingFailingJobRolledBack_NothingFiredAfterFirst(self):
+
+        model = Model(StubJobsModel(self.jobs_event, self.delta_event), IgnoreJobsFilterStub())
+        model.status_changed_event().register(self.handler)
+
+        self.delta_event.fire(JobsDelta([self.failing], []))
+        self.delta_event.fire(JobsDelta([self.disabling], []))
+        self.delta_event.fire(JobsDelta([self.failing], []))
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\nspam')], self.handler.calls)
+
+    def test_updateStatus_DisablingFailingJobWithFullListComposer_LastReportedStatusKept(self):
+
+        model = Model(StubJobsModel(self.jobs_event, self.delta_event), IgnoreJobsFilterStub(), DefaultMessageComposer())
+        model.status_changed_event().register(self.handler)
+
+        self.jobs_event.fire([self.failing])
+        self.jobs_event.fire([self.disabling])
+        self.jobs_event.fire([JobModel(Job('spam', JobStatus.DISABLED), False)])
+
+        self.assertEqual([(JobStatus.FAILING, 'FAILING:\nspam'), (JobStatus.OK, 'All active jobs pass')],
+                         self.handler.calls)
+
+    def test_updateStatus_SingleJobChangedWithFullListComposer_ComposedFromEveryJob(self):
+
+        jobs_model = StubJobsModel(self.jobs_event, self.delta_event)
+        model = Model(jobs_model, IgnoreJobsFilterStub(), DefaultMessageComposer())
+        model.status_changed_event().register(self.handler)
+        passing = JobModel(Job('spam', JobStatus.OK), False)
+        jobs_model.models = [passing, JobModel(Job('eggs', JobStatus.OK), False)]
+
+        self.jobs_event.fire(jobs_model.models)
+        self.delta_event.fire(JobsDelta(jobs_model.models, []))
+        jobs_model.models[0] = self.failing
+        self.delta_event.fire(JobsDelta([self.failing], []))
+
+        self.assertEqual([(JobStatus.OK, 'All active jobs pass'), (JobStatus.FAILING, 'FAILING:\nspam')],
+                         self.handler.calls)
+
+
+class BadgePresenterTests(TestCase):
+
+    def test_Constructor_FailingCountAndBuildsChange_ViewSetBadgeCalled(self):
+
+        mocks = mox.Mox()
+        model = mocks.CreateMock(Model)
+        progress_model = mocks.CreateMock(ProgressModelStub)
+        view = mocks.CreateMock(IBadgeView)
+        failing_count_event = Event()
+        progress_event = Event()
+        model.failing_count_event().AndReturn(failing_count_event)
+        progress_model.progress_changed_event().AndReturn(progress_event)
+        view.set_badge(3, False)
+        view.set_badge(3, True)
+        view.set_badge(0, True)
+        view.set_badge(0, False)
+        mocks.ReplayAll()
+
+        presenter = BadgePresenter(model, view, progress_model)  # @UnusedVariable
+        failing_count_event.fire(3)
+        progress_event.fire({'eric': 'progress'})
+        progress_event.fire({'eric': 'progress', 'john': 'progress'})
+        failing_count_event.fire(0)
+        progress_event.fire({})
+
+        mox.Verify(view)
+
+
+class ProgressModelStub(object):
+
+    def progress_changed_event(self):
+        pass
+
+
+class IgnoreJobsFilterStub(IFilter):
+
+    def filter_jobs(self, job_models):
+        return job_models
+
+
+class CountingJobGraph(JobGraph):
+
+    def __init__(self):
+        JobGraph.__init__(self)
+        self.root_cause_calls = 0
+
+    def root_causes(self, failing):
+        self.root_cause_calls += 1
+        return JobGraph.root_causes(self, failing)
+
+
+class BoundedMessageComposerRootCauseTests(TestCase):
+
+    def setUp(self):
+
+        self.graph = CountingJobGraph()
+        self.graph.update({'compile': (), 'test': ('compile',)})
+        self.composer = BoundedMessageComposer(graph=self.graph)
+        self.composer.apply_delta(JobsDelta([JobModel(Job('compile', JobStatus.FAILING), False),
+                                             JobModel(Job('test', JobStatus.FAILING), False)], []))
+
+    def test_digestAndMessage_FailingJobsUnchanged_RootCausesWorkedOutOnce(self):
+
+        self.composer.digest()
+        self.composer.message()
+        self.composer.apply_delta(JobsDelta([JobModel(Job('lint', JobStatus.OK), False)], []))
+        self.composer.digest()
+
+        self.assertEqual(1, self.graph.root_cause_calls)
+
+    def test_digest_GraphChanged_RootCausesWorkedOutAgain(self):
+
+        self.composer.digest()
+        self.graph.update({'compile': (), 'test': ()})
+
+        self.assertEqual((True, True, 2, ('test', 'compile')), self.composer.digest())
+        self.assertEqual(2, self.graph.root_cause_calls)
+
+
+class BoundedMessageComposerTests(TestCase):
+
+    def setUp(self):
+
+        self.composer = BoundedMessageComposer(limit=2)
+
+    def test_message_NothingListed_EmptyString(self):
+
+        self.assertEqual('', self.composer.message())
+
+    def test_message_OnlyIgnoredJobs_NoJobs(self):
+
+        self.composer.apply_delta(JobsDelta([JobModel(Job('eric', JobStatus.FAILING), True)], []))
+
+        self.assertEqual('No jobs', self.composer.message())
+
+    def test_message_NoneFailing_AllActiveJobsPass(self):
+
+        self.composer.apply_delta(JobsDelta([JobModel(Job('eric', JobStatus.FAILING), False)], []))
+        self.composer.apply_delta(JobsDelta([JobModel(Job('eric', JobStatus.OK), False)], []))
+
+        self.assertEqual('All active jobs pass', self.composer.message())
+
+    def test_message_MoreFailingThanLimit_NewestNamedRestCounted(self):
+
+        self.composer.apply_delta(JobsDelta([JobModel(Job(name, JobStatus.FAILING), False)
+                                             for name in ['eric', 'john', 'terry', 'graham']], []))
+        self.composer.apply_delta(JobsDelta([JobModel(Job('michael', JobStatus.FAILING), False),
+                                             JobModel(Job('graham', JobStatus.FAILING), True)], ['john']))
+
+        self.assertEqual('FAILING:\nmichael\nterry\n+1 more', self.composer.message())
+        self.assertEqual(3, self.composer.failing_count())
+
+    def test_digest_StillFailing_Unchanged(self):
+
+        eric = JobModel(Job('eric', JobStatus.FAILING), False)
+        self.composer.apply_delta(JobsDelta([eric], []))
+        before = self.composer.digest()
+        self.composer.apply_delta(JobsDelta([eric, JobModel(Job('john', JobStatus.OK), False)], []))
+
+        self.assertEqual(before, self.composer.digest())
+
+
 class StatusReaderTests(TestCase):
 
     def test_status_OneFailingJob_ReturnFailing(self):
@@ -182,6 +529,15 @@ class StatusReaderTests(TestCase):
 
         self.assertEqual(JobStatus.FAILING, result)
 
+    def test_status_FailingStatusEqualButNotIdentical_ReturnFailing(self):
+
+        jobs = [Job('eric', ''.join(['fail', 'ing']))]
+
+        reader = StatusReader()
+        result = reader.status(jobs)
+
+        self.assertEqual(JobStatus.FAILING, result)
+
     def test_status_NoFailingJobs_ReturnOk(self):
 
         jobs = [Job('eric', JobStatus.UNKNOWN),
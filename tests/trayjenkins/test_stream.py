@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import json
+from StringIO import StringIO
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.metrics import Metrics
+from trayjenkins.progress import BuildProgress
+from trayjenkins.stream import JobStreamParser, StreamingJenkins, StreamParseError
+
+
+BODY = '{"_class":"hudson.model.Hudson","jobs":[' \
+       '{"_class":"FreeStyleProject","name":"eric","color":"blue"},' \
+       ' {"name":"john","color":"red_anime"} ,' \
+       '{"name":"terry","color":"disabled"}' \
+       '],"views":[{"name":"all"}]}'
+
+
+class CountingStream(object):
+
+    def __init__(self, body):
+        self._stream = StringIO(body)
+        self.reads = 0
+        self.closed = False
+
+    def read(self, size):
+        self.reads += 1
+        return self._stream.read(size)
+
+    def close(self):
+        self.closed = True
+
+
+class JobStreamParserTests(TestCase):
+
+    def test___iter___Whole_response_in_one_chunk___Jobs_with_statuses(self):
+
+        result = list(JobStreamParser(StringIO(BODY)))
+
+        self.assertEqual([Job('eric', JobStatus.OK),
+                          Job('john', JobStatus.FAILING),
+                          Job('terry', JobStatus.DISABLED)], result)
+
+    def test___iter___Tiny_chunks___Same_jobs(self):
+
+        for chunk_size in range(1, 12):
+            result = list(JobStreamParser(StringIO(BODY), chunk_size=chunk_size))
+
+            self.assertEqual(['eric', 'john', 'terry'], [job.name for job in result])
+
+    def test___iter___Multibyte_name_split_across_chunks___Decoded_name(self):
+
+        body = '{"jobs":[{"name":"caf\xc3\xa9","color":"blue"}]}'
+        result = list(JobStreamParser(StringIO(body), chunk_size=3))
+
+        self.assertEqual(u'caf\xe9', result[0].name)
+
+    def test___iter___Animated_ball___Job_named_as_building(self):
+
+        parser = JobStreamParser(StringIO(BODY))
+        list(parser)
+
+        self.assertEqual(set(['john']), parser.building)
+
+    def test___iter___Empty_jobs___No_jobs(self):
+
+        self.assertEqual([], list(JobStreamParser(StringIO('{"jobs" : [ ]}'))))
+
+    def test___iter___Jobs_array_closed___Rest_of_response_not_read(self):
+
+        body = '{"jobs":[{"name":"eric","color":"blue"}],"padding":"%s"}' % ('x' * 1000)
+        stream = CountingStream(body)
+        parser = JobStreamParser(stream, chunk_size=64)
+        list(parser)
+
+        self.assertEqual(1, stream.reads)
+        self.assertEqual(64, parser.bytes_read)
+
+    def test___iter___Truncated_response___StreamParseError(self):
+
+        parser = JobStreamParser(StringIO(BODY[:70]), chunk_size=16)
+
+        self.assertRaises(StreamParseError, list, parser)
+
+    def test___iter___No_jobs_key___StreamParseError(self):
+
+        parser = JobStreamParser(StringIO('{"views":[]}'))
+
+        self.assertRaises(StreamParseError, list, parser)
+
+    def test___iter___Known_name___Known_string_reused(self):
+
+        known = u'eric'
+        parser = JobStreamParser(StringIO(BODY), known_names={known: known})
+        result = list(parser)
+
+        self.assertTrue(result[0].name is known)
+        self.assertEqual(set(['eric', 'john', 'terry']), set(parser.names))
+
+
+class StubApi(object):
+
+    def __init__(self, body):
+        self.body = body
+        self.responses = []
+
+    def open(self, path, tree=None):
+        self.path = path
+        self.tree = tree
+        response = CountingStream(self.body)
+        self.responses.append(response)
+        return response
+
+    def get_json(self, path, tree=None):
+        self.path = path
+        self.tree = tree
+        return json.loads(self.body)
+
+
+class StreamingJenkinsTests(TestCase):
+
+    def test___list_jobs___Response___Jobs_listed_and_response_closed(self):
+
+        api = StubApi(BODY)
+        result = StreamingJenkins(api).list_jobs()
+
+        self.assertEqual(3, len(result))
+        self.assertEqual(('/api/json', 'jobs[name,color]'), (api.path, api.tree))
+        self.assertTrue(api.responses[0].closed)
+
+    def test___list_jobs___Second_poll___Names_from_first_poll_reused(self):
+
+        jenkins = StreamingJenkins(StubApi(BODY))
+        first = jenkins.list_jobs()
+        second = jenkins.list_jobs()
+
+        self.assertTrue(all(one.name is two.name for one, two in zip(first, second)))
+
+    def test___list_jobs___Metrics___Parse_timed_and_bytes_counted(self):
+
+        metrics = Metrics()
+        StreamingJenkins(StubApi(BODY), metrics).list_jobs()
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(1, snapshot['timers']['parse']['count'])
+        self.assertEqual(len(BODY), snapshot['counters']['bytes_fetched'])
+
+    def test___get_job___Jenkins_answers___Only_that_job_fetched(self):
+
+        api = StubApi('{"name": "spam", "color": "red_anime"}')
+        result = StreamingJenkins(api).get_job('spam')
+
+        self.assertEqual(Job('spam', JobStatus.FAILING), result)
+        self.assertEqual(('/job/spam/api/json', 'name,color'), (api.path, api.tree))
+
+    def test___building_jobs___After_poll___Jobs_building_at_that_poll(self):
+
+        jenkins = StreamingJenkins(StubApi(BODY))
+        jenkins.list_jobs()
+
+        self.assertEqual(frozenset(['john']), jenkins.building_jobs())
+
+    def test___build_progress___Building___Start_and_last_duration_in_seconds(self):
+
+        api = StubApi('{"lastBuild": {"number": 42, "building": true, "timestamp": 1500000000000},'
+                      ' "lastCompletedBuild": {"duration": 600000}}')
+        result = StreamingJenkins(api).build_progress('john')
+
+        self.assertEqual(BuildProgress('john', 42, 1500000000.0, 600.0), result)
+        self.assertEqual('/job/john/api/json', api.path)
+        self.assertEqual('lastBuild[number,building,timestamp],lastCompletedBuild[duration]', api.tree)
+
+    def test___build_progress___Never_completed___No_expected_duration(self):
+
+        api = StubApi('{"lastBuild": {"number": 1, "building": true, "timestamp": 1500000000000},'
+                      ' "lastCompletedBuild": null}')
+
+        self.assertEqual(None, StreamingJenkins(api).build_progress('john').expected_seconds)
+
+    def test___build_progress___Finished_since_poll___None(self):
+
+        api = StubApi('{"lastBuild": {"number": 42, "building": false, "timestamp": 1500000000000}}')
+
+        self.assertEqual(None, StreamingJenkins(api).build_progress('john'))
+
+    def test___build_progress___Null_timestamp___None(self):
+
+        api = StubApi('{"lastBuild": {"number": 42, "building": true, "timestamp": null}}')
+
+        self.assertEqual(None, StreamingJenkins(api).build_progress('john'))
+
+    def test___job_upstreams___Jobs_listed___Upstream_names_by_job(self):
+
+        api = StubApi('{"jobs": [{"name": "eric", "upstreamProjects": []},'
+                      ' {"name": "john", "upstreamProjects": [{"name": "eric"}]}]}')
+        result = StreamingJenkins(api).job_upstreams()
+
+        self.assertEqual({'eric': (), 'john': ('eric',)}, result)
+        self.assertEqual(('/api/json', 'jobs[name,upstreamProjects[name]]'), (api.path, api.tree))
@@ -0,0 +1,297 @@
+import mox
+from unittest import TestCase
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.event import Event
+from trayjenkins.tree import FolderEntry, IFolderSource, ITreeView, JenkinsFolderSource, JobTree, TreePresenter
+from tests.trayjenkins.fakes import RecordingHandler
+
+
+class StubFolderSource(IFolderSource):
+
+    def __init__(self, folders):
+        self.folders = folders
+        self.listed = []
+
+    def list_folder(self, path):
+        self.listed.append(path)
+        result = self.folders[path]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def job(name, status):
+    return FolderEntry(name, False, status)
+
+
+def folder(name):
+    return FolderEntry(name, True)
+
+
+class JobTreeTests(TestCase):
+
+    def setUp(self):
+
+        self.source = StubFolderSource({(): [folder('team'), job('nightly', JobStatus.OK)],
+                                        ('team',): [folder('app'), job('lint', JobStatus.OK)],
+                                        ('team', 'app'): [job('master', JobStatus.OK),
+                                                          job('feature', JobStatus.FAILING)]})
+        self.children_changed = RecordingHandler()
+        self.nodes_changed = RecordingHandler()
+        self.tree = JobTree(self.source)
+        self.tree.children_changed_event().register(self.children_changed)
+        self.tree.nodes_changed_event().register(self.nodes_changed)
+
+    def test___list_jobs___Nothing_expanded___Only_root_fetched_and_its_jobs_listed(self):
+
+        self.tree.refresh()
+        result = self.tree.list_jobs()
+
+        self.assertEqual([()], self.source.listed)
+        self.assertEqual([Job('nightly', JobStatus.OK)], result)
+
+    def test___list_jobs___Folders_expanded___Jobs_named_by_path_in_tree_order(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        result = self.tree.list_jobs()
+
+        self.assertEqual([Job('team/app/master', JobStatus.OK),
+                          Job('team/app/feature', JobStatus.FAILING),
+                          Job('team/lint', JobStatus.OK),
+                          Job('nightly', JobStatus.OK)], result)
+
+    def test___expand___Unexpanded_folder___Folder_fetched_and_children_changed_event_fired(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+
+        self.assertEqual([(), ('team',)], self.source.listed)
+        self.assertEqual([('team', 'app'), ('team', 'lint')],
+                         [node.path for node in self.children_changed.calls[-1][1]])
+
+    def test___expand___Folder_already_loaded___Not_fetched_again(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.collapse(('team',))
+        self.tree.expand(('team',))
+
+        self.assertEqual([(), ('team',)], self.source.listed)
+        self.assertEqual(('team',), self.children_changed.calls[-1][0])
+
+    def test___apply_folder___Fetched_apart___Same_as_expand(self):
+
+        self.tree.refresh()
+        fetch = self.tree.fetch_folder(('team',))
+        self.assertTrue(self.tree.needs_fetch(('team',)))
+        self.tree.apply_folder(fetch)
+
+        self.assertEqual((True, False), (self.tree.node(('team',)).expanded, self.tree.needs_fetch(('team',))))
+        self.assertEqual([('team', 'app'), ('team', 'lint')],
+                         [node.path for node in self.children_changed.calls[-1][1]])
+
+    def test___fetch_folder___Source_fails___Error_returned_and_nothing_applied(self):
+
+        self.tree.refresh()
+        self.source.folders[('team',)] = IOError('refused')
+        fetch = self.tree.fetch_folder(('team',))
+        self.tree.apply_folder(fetch)
+
+        self.assertEqual((None, 'refused'), (fetch.entries, str(fetch.error)))
+        self.assertTrue(self.tree.needs_fetch(('team',)))
+
+    def test___status___Folder_not_loaded___Unknown(self):
+
+        self.tree.refresh()
+
+        self.assertEqual(JobStatus.UNKNOWN, self.tree.node(('team',)).status)
+
+    def test___status___Failing_job_in_subfolder___Failing_rolled_up_to_every_ancestor(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+
+        self.assertEqual(JobStatus.FAILING, self.tree.node(('team', 'app')).status)
+        self.assertEqual(JobStatus.FAILING, self.tree.node(('team',)).status)
+        self.assertEqual(JobStatus.FAILING, self.tree.node(()).status)
+
+    def test___refresh___Job_fixed___Job_and_ancestors_reported_changed(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        self.source.folders[('team', 'app')] = [job('master', JobStatus.OK), job('feature', JobStatus.OK)]
+        self.tree.refresh()
+
+        self.assertEqual(set([('team', 'app', 'feature'), ('team', 'app'), ('team',), ()]),
+                         set(node.path for node in self.nodes_changed.calls[-1][0]))
+        self.assertEqual(JobStatus.OK, self.tree.node(('team',)).status)
+
+    def test___refresh___Collapsed_folder___Its_items_not_fetched_and_rollup_kept(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        self.tree.collapse(('team',))
+        self.source.listed = []
+        self.source.folders[('team',)] = [folder('app'), job('lint', JobStatus.OK)]
+        self.tree.refresh()
+
+        self.assertEqual([()], self.source.listed)
+        self.assertEqual(JobStatus.FAILING, self.tree.node(('team',)).status)
+
+    def test___refresh_paths___Folder_open_beneath_collapsed_one___Only_open_folders_top_down(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        opened = self.tree.refresh_paths()
+        self.tree.collapse(('team',))
+
+        self.assertEqual([(), ('team',), ('team', 'app')], opened)
+        self.assertEqual([()], self.tree.refresh_paths())
+
+    def test___apply_refresh___Fetched_before_folder_removed___Removed_folder_left_out(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        fetches = self.tree.fetch_folders(self.tree.refresh_paths())
+        self.source.folders[()] = [job('nightly', JobStatus.OK)]
+        self.tree.refresh()
+        self.tree.apply_refresh(fetches[1:])
+
+        self.assertEqual(None, self.tree.node(('team', 'app')))
+        self.assertEqual([Job('nightly', JobStatus.OK)], self.tree.list_jobs())
+
+    def test___fetch_folders___Nothing_applied___Tree_and_view_unchanged(self):
+
+        self.tree.refresh()
+        self.source.folders[()] = [job('nightly', JobStatus.FAILING)]
+        calls = len(self.children_changed.calls) + len(self.nodes_changed.calls)
+        self.tree.fetch_folders(self.tree.refresh_paths())
+
+        self.assertEqual(calls, len(self.children_changed.calls) + len(self.nodes_changed.calls))
+        self.assertEqual(JobStatus.OK, self.tree.node(('nightly',)).status)
+
+    def test___list_jobs___Last_refresh_failed___Failure_raised_until_a_refresh_succeeds(self):
+
+        self.tree.refresh()
+        self.source.folders[()] = IOError('timed out')
+        self.tree.refresh()
+        self.assertRaises(IOError, self.tree.list_jobs)
+        self.source.folders[()] = [job('nightly', JobStatus.OK)]
+        self.tree.refresh()
+
+        self.assertEqual([Job('nightly', JobStatus.OK)], self.tree.list_jobs())
+
+    def test___refresh___Folder_removed___Its_jobs_no_longer_counted_or_listed(self):
+
+        self.tree.refresh()
+        self.tree.expand(('team',))
+        self.tree.expand(('team', 'app'))
+        self.source.folders[('team',)] = [job('lint', JobStatus.OK)]
+        self.tree.refresh()
+        result = self.tree.list_jobs()
+
+        self.assertEqual([Job('team/lint', JobStatus.OK), Job('nightly', JobStatus.OK)], result)
+        self.assertEqual(None, self.tree.node(('team', 'app', 'master')))
+        self.assertEqual(JobStatus.OK, self.tree.node(()).status)
+
+    def test___refresh___Nothing_changed___No_events_fired(self):
+
+        self.tree.refresh()
+        calls = len(self.children_changed.calls) + len(self.nodes_changed.calls)
+        self.tree.refresh()
+
+        self.assertEqual(calls, len(self.children_changed.calls) + len(self.nodes_changed.calls))
+
+    def test___enable_job___Job_name_is_path___Source_given_path(self):
+
+        mocks = mox.Mox()
+        source = mocks.CreateMock(IFolderSource)
+        source.enable_job(('team', 'app', 'master')).AndReturn(True)
+        mocks.ReplayAll()
+
+        result = JobTree(source).enable_job('team/app/master')
+
+        mox.Verify(source)
+        self.assertTrue(result)
+
+
+class StubApi(object):
+
+    def __init__(self, values):
+        self.values = values
+        self.requests = []
+
+    def get_json(self, path, tree=None):
+        self.requests.append((path, tree))
+        return self.values
+
+    def post(self, path):
+        self.requests.append((path, None))
+        return True
+
+
+class JenkinsFolderSourceTests(TestCase):
+
+    def test___list_folder___Jobs_and_folders___Folders_are_entries_without_colour(self):
+
+        api = StubApi({'jobs': [{'name': 'app'}, {'name': 'lint', 'color': 'red_anime'}]})
+        result = JenkinsFolderSource(api).list_folder(('team',))
+
+        self.assertEqual([FolderEntry('app', True, JobStatus.UNKNOWN),
+                          FolderEntry('lint', False, JobStatus.FAILING)], result)
+        self.assertEqual([('/job/team/api/json', 'jobs[name,color]')], api.requests)
+
+    def test___disable_job___Nested_job___Posts_to_nested_job_url(self):
+
+        api = StubApi({})
+        JenkinsFolderSource(api).disable_job(('team', 'feature/x'))
+
+        self.assertEqual([('/job/team/job/feature%2Fx/disable', None)], api.requests)
+
+
+class MockTreeView(ITreeView):
+
+    def __init__(self):
+        self.expanded = Event()
+        self.collapsed = Event()
+
+    def folder_expanded_event(self):
+        return self.expanded
+
+    def folder_collapsed_event(self):
+        return self.collapsed
+
+
+class TreePresenterTests(TestCase):
+
+    def test___constructor___Root_already_fetched___View_given_top_level(self):
+
+        tree = JobTree(StubFolderSource({(): [job('nightly', JobStatus.OK)]}))
+        tree.refresh()
+        view = MockTreeView()
+        view.set_children = RecordingHandler()
+
+        TreePresenter(tree, view)
+
+        self.assertEqual([((), [tree.node(('nightly',))])], view.set_children.calls)
+
+    def test___folder_expanded___View_event___Tree_children_passed_to_view(self):
+
+        tree = JobTree(StubFolderSource({(): [folder('team')], ('team',): [job('lint', JobStatus.OK)]}))
+        tree.refresh()
+        view = MockTreeView()
+        view.set_children = RecordingHandler()
+        view.update_nodes = RecordingHandler()
+        TreePresenter(tree, view)
+
+        view.expanded.fire(('team',))
+
+        self.assertEqual((('team',), [tree.node(('team', 'lint'))]), view.set_children.calls[-1])
@@ -0,0 +1,102 @@
+import base64
+import json
+import urllib
+import urllib2
+
+from pyjenkins.job import JobStatus
+
+
+_COLOUR_STATUSES = {'blue': JobStatus.OK,
+                    'red': JobStatus.FAILING,
+                    'yellow': JobStatus.FAILING,
+                    'disabled': JobStatus.DISABLED}
+
+
+def status_from_colour(colour):
+    """
+    Maps a Jenkins ball colour, e.g. 'red_anime' for a failing job that is
+    building, to a status.
+    @type colour: str
+    @rtype: str
+    """
+    if colour is not None and colour.endswith('_anime'):
+        colour = colour[:-len('_anime')]
+    return _COLOUR_STATUSES.get(colour, JobStatus.UNKNOWN)
+
+
+def is_building(colour):
+    """
+    @return Whether a Jenkins ball colour, e.g. 'red_anime', shows a build
+    in progress
+    @type colour: str
+    @rtype: bool
+    """
+    return colour is not None and colour.endswith('_anime')
+
+
+def job_path(names):
+    """
+    @param names: Folder names down to the job, e.g. ('team', 'app', 'master')
+    @type names: (str)
+    @return e.g. '/job/team/job/app/job/master'
+    @rtype: str
+    """
+    return ''.join('/job/' + urllib.quote(name.encode('utf-8'), safe='') for name in names)
+
+
+class JenkinsApi(object):
+
+    def __init__(self, host, username='', password='', timeout=30, urlopen=urllib2.urlopen):
+        """
+        Just enough of the Jenkins remote access API for the things
+        pyjenkins does not do.
+        @type host: str
+        @type username: str
+        @type password: str
+        @param timeout: Seconds to wait for each request
+        @type timeout: float
+        @type urlopen: callable
+        """
+        self._host = host.rstrip('/')
+        self._timeout = timeout
+        self._urlopen = urlopen
+        self._headers = {}
+        if username:
+            credentials = base64.b64encode('%s:%s' % (username, password))
+            self._headers['Authorization'] = 'Basic ' + credentials
+
+    def open(self, path, tree=None, data=None, timeout=None):
+        """
+        @param path: e.g. '/job/spam/api/json'
+        @type path: str
+        @param tree: Jenkins tree query restricting the fields returned
+        @type tree: str
+        @param data: Body to POST, or None to GET
+        @type data: str
+        @return File-like response
+        """
+        url = self._host + path
+        if tree is not None:
+            url += '?' + urllib.urlencode({'tree': tree})
+        request = urllib2.Request(url, data, self._headers)
+
+        return self._urlopen(request, timeout=self._timeout if timeout is None else timeout)
+
+    def get_json(self, path, tree=None):
+        """
+        @rtype: dict
+        """
+        return json.load(self.open(path, tree))
+
+    def post(self, path):
+        """
+        @return Whether Jenkins accepted the request
+        @rtype: bool
+        """
+        try:
+            self.open(path, data='')
+            result = True
+        except urllib2.HTTPError:
+            result = False
+
+        return result
@@ -0,0 +1,175 @@
+import os
+from ConfigParser import Error as ConfigParserError, RawConfigParser
+
+from trayjenkins.event import Event
+
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.expanduser('~'), '.trayjenkins.ini')
+ENVIRONMENT_PREFIX = 'TRAYJENKINS_'
+
+# Options in the [trayjenkins] section apply to every profile; those in a
+# [profile NAME] section override them when that profile is chosen.
+COMMON_SECTION = 'trayjenkins'
+PROFILE_SECTION = 'profile %s'
+
+
+class ConfigError(Exception):
+    pass
+
+
+def to_bool(value):
+    """
+    @type value: str
+    @rtype: bool
+    """
+    lowered = value.strip().lower()
+    if lowered in ('1', 'yes', 'true', 'on'):
+        result = True
+    elif lowered in ('0', 'no', 'false', 'off'):
+        result = False
+    else:
+        raise ValueError('not a boolean: %s' % value)
+
+    return result
+
+
+def to_patterns(value):
+    """
+    @param value: Comma separated shell style patterns
+    @type value: str
+    @rtype: (str)
+    """
+    return tuple(pattern.strip() for pattern in value.split(',') if pattern.strip())
+
+
+def to_views(value):
+    """
+    @param value: Semicolon separated views, each a name and the patterns
+    of its jobs, e.g. "team=team-*,lib-*; release=release-*"
+    @type value: str
+    @return (name, patterns) for each view
+    @rtype: ((str, (str)))
+    """
+    views = []
+    for view in value.split(';'):
+        if view.strip():
+            name, equals, patterns = view.partition('=')
+            if not equals or not name.strip() or not to_patterns(patterns):
+                raise ValueError('not NAME=PATTERNS: %s' % view.strip())
+            views.append((name.strip(), to_patterns(patterns)))
+
+    return tuple(views)
+
+
+def environment_values(environ):
+    """
+    @return Values of the TRAYJENKINS_ variables, keyed by the rest of the
+    name in lower case, e.g. TRAYJENKINS_POLL_INTERVAL as poll_interval
+    @type environ: dict
+    @rtype: dict
+    """
+    return dict((name[len(ENVIRONMENT_PREFIX):].lower(), value)
+                for name, value in environ.items()
+                if name.startswith(ENVIRONMENT_PREFIX))
+
+
+class ConfigFile(object):
+
+    def __init__(self, path, stat=os.stat):
+        """
+        An INI file of settings, which need not exist.
+        @type path: str
+        @type stat: callable
+        """
+        self.path = path
+        self._stat = stat
+        self._read_signature = None
+
+    def values(self, profile=None):
+        """
+        @return The [trayjenkins] options, overridden by the profile's
+        @type profile: str
+        @rtype: dict
+        """
+        self._read_signature = self._signature()
+        result = {}
+        if self._read_signature is not None:
+            parser = RawConfigParser()
+            try:
+                parser.read(self.path)
+                sections = [COMMON_SECTION] + ([] if profile is None else [PROFILE_SECTION % profile])
+                if profile is not None and not parser.has_section(PROFILE_SECTION % profile):
+                    raise ConfigError("No profile '%s' in %s" % (profile, self.path))
+                for section in sections:
+                    if parser.has_section(section):
+                        result.update(parser.items(section))
+            except ConfigParserError as error:
+                raise ConfigError('Cannot read %s: %s' % (self.path, error))
+        elif profile is not None:
+            raise ConfigError("No profile '%s': %s does not exist" % (profile, self.path))
+
+        return result
+
+    def changed(self):
+        """
+        @return Whether the file has been written, created or removed since
+        values() last read it
+        @rtype: bool
+        """
+        return self._signature() != self._read_signature
+
+    def _signature(self):
+
+        try:
+            status = self._stat(self.path)
+            result = (status.st_mtime, status.st_size)
+        except OSError:
+            result = None
+
+        return result
+
+
+class SettingsReloader(object):
+
+    def __init__(self, layers, settings, settings_changed_event=None):
+        """
+        Reads the settings again whenever the config file changes.
+        @param layers: Makes Settings from the file, environment and command line
+        @type layers: trayjenkins.settings.LayeredSettings
+        @param settings: The settings in use
+        @type settings: trayjenkins.settings.Settings
+        @type settings_changed_event: trayjenkins.event.IEvent
+        """
+        self._layers = layers
+        self._settings = settings
+        self._settings_changed_event = Event() if settings_changed_event is None else settings_changed_event
+
+    def settings_changed_event(self):
+        """
+        Listeners receive Event.fire(old:Settings, new:Settings)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._settings_changed_event
+
+    def check(self):
+        """
+        A config file that cannot be read, or leaves no host, is reported
+        and the settings in use are kept.
+        @return Error reading the file, if there was one
+        @rtype: str
+        """
+        result = None
+        if self._layers.config_file.changed():
+            try:
+                settings = self._layers.settings()
+                if settings is None:
+                    result = 'No host in %s' % self._layers.config_file.path
+            except ConfigError as error:
+                result = str(error)
+                settings = None
+            if settings is not None and settings != self._settings:
+                old = self._settings
+                self._settings = settings
+                self._settings_changed_event.fire(old, settings)
+
+        return result
@@ -0,0 +1,6 @@
+class ServerUnreachableError(Exception):
+    pass
+
+
+class ThrottledError(Exception):
+    pass
@@ -0,0 +1,176 @@
+import time
+
+from pyjenkins.job import JobStatus
+from trayjenkins.event import Event
+
+
+class IFlakyView(object):
+
+    def offer_ignore(self, job_name, flips):
+        """
+        Asks whether a job that keeps flipping between OK and FAILING
+        should be ignored.
+        @type job_name: str
+        @param flips: Flips within the detector's window
+        @type flips: int
+        """
+
+    def ignore_accepted_event(self):
+        """
+        Listeners receive Event.fire(job_name:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+
+
+class _FlipWindow(object):
+    """
+    Flip counts for one job in a ring of time buckets, so memory per job
+    is fixed and moving the window on touches at most every bucket once.
+    """
+
+    __slots__ = ('status', 'counts', 'newest', 'total')
+
+    def __init__(self, buckets, status, bucket):
+        self.status = status
+        self.counts = bytearray(buckets)
+        self.newest = bucket
+        self.total = 0
+
+    def advance(self, bucket):
+        """
+        @return Flips within the window ending at bucket
+        @rtype: int
+        """
+        size = len(self.counts)
+        for step in xrange(1, min(bucket - self.newest, size) + 1):
+            index = (self.newest + step) % size
+            self.total -= self.counts[index]
+            self.counts[index] = 0
+        self.newest = max(self.newest, bucket)
+
+        return self.total
+
+    def add_flip(self, bucket):
+        """
+        @rtype: int
+        """
+        self.advance(bucket)
+        index = bucket % len(self.counts)
+        if self.counts[index] < 255:
+            self.counts[index] += 1
+            self.total += 1
+
+        return self.total
+
+
+class FlakyDetector(object):
+
+    def __init__(self,
+                 jobs_model,
+                 window_seconds=24 * 60 * 60,
+                 buckets=24,
+                 threshold=4,
+                 clock=time.time,
+                 flaky_job_event=None):
+        """
+        Watches the jobs model's deltas and flags any job that flips between
+        OK and FAILING at least threshold times within window_seconds. Each
+        delta costs O(1) per changed job; no history is kept or rescanned.
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type window_seconds: float
+        @param buckets: How finely the window slides
+        @type buckets: int
+        @type threshold: int
+        @type clock: callable
+        @type flaky_job_event: trayjenkins.event.IEvent
+        """
+        self._bucket_seconds = float(window_seconds) / buckets
+        self._buckets = buckets
+        self._threshold = threshold
+        self._clock = clock
+        self._flaky_job_event = Event() if flaky_job_event is None else flaky_job_event
+        self._windows = {}
+        self._flagged = set()
+
+        jobs_model.jobs_delta_event().register(self._on_jobs_delta)
+
+    def flaky_job_event(self):
+        """
+        Fired once when a job becomes flaky, and again only if it settles
+        down in between. Listeners receive Event.fire(job_name:str, flips:int)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._flaky_job_event
+
+    def flips(self, job_name):
+        """
+        @return Flips within the window ending now
+        @rtype: int
+        """
+        window = self._windows.get(job_name, None)
+        return 0 if window is None else window.advance(self._bucket(self._clock()))
+
+    def _bucket(self, now):
+
+        return int(now // self._bucket_seconds)
+
+    def _on_jobs_delta(self, delta):
+
+        bucket = self._bucket(self._clock())
+        for job_name in delta.removed:
+            self._windows.pop(job_name, None)
+            self._flagged.discard(job_name)
+        for model in delta.changed:
+            if not model.pending:
+                self._observe(model, bucket)
+
+    def _observe(self, model, bucket):
+
+        job_name = model.job.name
+        status = model.job.status
+        if status in (JobStatus.OK, JobStatus.FAILING):
+            window = self._windows.get(job_name, None)
+            if window is None:
+                self._windows[job_name] = _FlipWindow(self._buckets, status, bucket)
+            else:
+                if window.status != status:
+                    flips = window.add_flip(bucket)
+                    window.status = status
+                else:
+                    flips = window.advance(bucket)
+                self._flag(job_name, flips, model.ignored)
+
+    def _flag(self, job_name, flips, ignored):
+
+        if flips < self._threshold:
+            self._flagged.discard(job_name)
+        elif not ignored and job_name not in self._flagged:
+            self._flagged.add(job_name)
+            self._flaky_job_event.fire(job_name, flips)
+
+
+class FlakyPresenter(object):
+
+    def __init__(self, detector, jobs_model, view):
+        """
+        Offers to ignore each flaky job once; accepting ignores it in the
+        jobs model, so IgnoreJobsFilter keeps it out of the tray status.
+        @type detector: trayjenkins.flaky.FlakyDetector
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type view: trayjenkins.flaky.IFlakyView
+        """
+        self._view = view
+        self._jobs_model = jobs_model
+        self._offered = set()
+        detector.flaky_job_event().register(self._on_flaky_job)
+        view.ignore_accepted_event().register(self._on_view_ignore_accepted)
+
+    def _on_flaky_job(self, job_name, flips):
+
+        if job_name not in self._offered:
+            self._offered.add(job_name)
+            self._view.offer_ignore(job_name, flips)
+
+    def _on_view_ignore_accepted(self, job_name):
+
+        self._jobs_model.ignore_job(job_name)
@@ -0,0 +1,273 @@
+import time
+from collections import deque
+
+from trayjenkins.event import Event
+from trayjenkins.metrics import NULL_METRICS
+
+
+# Seconds between fetches of the whole graph, unless a new job is seen.
+GRAPH_REFRESH_SECONDS = 600
+
+# Seconds to wait after a failed fetch before asking again.
+GRAPH_RETRY_SECONDS = 60
+
+
+class JobGraph(object):
+
+    def __init__(self):
+        """
+        Which jobs trigger which, kept both ways so that either direction
+        is a lookup. Changing one job's upstream jobs touches only the
+        edges that changed.
+        """
+        self._upstream = {}
+        self._downstream = {}
+        self._version = 0
+
+    def __contains__(self, name):
+
+        return name in self._upstream
+
+    def __len__(self):
+
+        return len(self._upstream)
+
+    def version(self):
+        """
+        @return A number that changes whenever the graph does
+        @rtype: int
+        """
+        return self._version
+
+    def upstream(self, name):
+        """
+        @return Names of the jobs that trigger the job
+        @rtype: frozenset
+        """
+        return self._upstream.get(name, frozenset())
+
+    def downstream(self, name):
+        """
+        @return Names of the jobs the job triggers
+        @rtype: frozenset
+        """
+        return frozenset(self._downstream.get(name, ()))
+
+    def set_upstream(self, name, upstream):
+        """
+        @type name: str
+        @type upstream: (str)
+        """
+        upstream = frozenset(upstream)
+        old = self._upstream.get(name, frozenset())
+        for upstream_name in old.difference(upstream):
+            downstream = self._downstream[upstream_name]
+            downstream.discard(name)
+            if not downstream:
+                del self._downstream[upstream_name]
+        for upstream_name in upstream.difference(old):
+            self._downstream.setdefault(upstream_name, set()).add(name)
+        self._upstream[name] = upstream
+        self._version += 1
+
+    def remove(self, name):
+        """
+        @type name: str
+        """
+        if name in self._upstream:
+            self.set_upstream(name, ())
+            del self._upstream[name]
+            self._version += 1
+
+    def update(self, upstreams):
+        """
+        Makes the graph match a fresh fetch, changing only the jobs that
+        differ.
+        @param upstreams: Upstream job names by job name, for every job
+        @type upstreams: dict
+        @return Whether anything changed
+        @rtype: bool
+        """
+        removed = [name for name in self._upstream if name not in upstreams]
+        for name in removed:
+            self.remove(name)
+        changed = bool(removed)
+        for name, upstream in upstreams.items():
+            upstream = frozenset(upstream)
+            if self._upstream.get(name) != upstream:
+                self.set_upstream(name, upstream)
+                changed = True
+
+        return changed
+
+    def root_causes(self, failing):
+        """
+        A failing job is explained by a failing job upstream of it, through
+        other failing jobs; the rest are root causes. Each job is visited
+        once, so the cost follows the failing jobs and the edges between
+        them rather than the whole graph.
+        @param failing: Names of the failing jobs, in order of preference
+        for roots, e.g. most recently failed first
+        @type failing: [str]
+        @return (root, [explained]) for each root cause, in the order given.
+        A job explained by more than one root goes to the first of them.
+        @rtype: [(str, [str])]
+        """
+        failing_set = set(failing)
+        roots = [name for name in failing if failing_set.isdisjoint(self.upstream(name))]
+        seen = set()
+        result = []
+        for root in roots:
+            result.append((root, self._explained(root, failing_set, seen)))
+        # Jobs failing in a cycle have a failing job upstream, but none
+        # of them is reached from a root.
+        for name in failing:
+            if name not in seen:
+                result.append((name, self._explained(name, failing_set, seen)))
+
+        return result
+
+    def _explained(self, root, failing_set, seen):
+
+        seen.add(root)
+        explained = []
+        queue = deque([root])
+        while queue:
+            for name in self._downstream.get(queue.popleft(), ()):
+                if name in failing_set and name not in seen:
+                    seen.add(name)
+                    explained.append(name)
+                    queue.append(name)
+
+        return explained
+
+
+class IGraphSource(object):
+
+    def job_upstreams(self):
+        """
+        @return Upstream job names by job name, for every job, or None if
+        the source cannot tell
+        @rtype: dict
+        """
+
+
+class GraphFetch(object):
+
+    def __init__(self, upstreams, error=None):
+        """
+        What one fetch of the job graph returned, for GraphModel.apply.
+        @param upstreams: Upstream job names by job name, or None if the
+        fetch failed or the source cannot tell
+        @type upstreams: dict
+        @param error: Why the fetch failed, if it did
+        @type error: Exception
+        """
+        self.upstreams = upstreams
+        self.error = error
+
+
+class GraphModel(object):
+
+    def __init__(self,
+                 source,
+                 jobs_model=None,
+                 refresh_seconds=GRAPH_REFRESH_SECONDS,
+                 clock=time.time,
+                 graph_changed_event=None,
+                 metrics=NULL_METRICS,
+                 retry_seconds=GRAPH_RETRY_SECONDS):
+        """
+        Keeps the job graph, fetched in one request when a job it has not
+        seen is listed and otherwise every refresh_seconds. Removed jobs
+        are dropped as the jobs model reports them. After a failed fetch
+        the graph is not asked for again for retry_seconds.
+        @type source: trayjenkins.graph.IGraphSource
+        @param jobs_model: Tells of new and removed jobs, if given
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type refresh_seconds: float
+        @type clock: callable
+        @type graph_changed_event: trayjenkins.event.IEvent
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type retry_seconds: float
+        """
+        self._source = source
+        self._refresh_seconds = refresh_seconds
+        self._retry_seconds = retry_seconds
+        self._clock = clock
+        self._graph_changed_event = Event() if graph_changed_event is None else graph_changed_event
+        self._metrics = metrics
+        self._graph = JobGraph()
+        self._fetched_at = None
+        self._retry_at = None
+        self._stale = True
+        if jobs_model is not None:
+            jobs_model.jobs_delta_event().register(self._on_jobs_delta)
+
+    def graph_changed_event(self):
+        """
+        Listeners receive Event.fire(graph:trayjenkins.graph.JobGraph)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._graph_changed_event
+
+    def graph(self):
+        """
+        The same graph throughout, changed in place.
+        @rtype: trayjenkins.graph.JobGraph
+        """
+        return self._graph
+
+    def update(self):
+
+        self.apply(self.fetch())
+
+    def fetch(self):
+        """
+        Asks Jenkins for the graph if it is due. Safe to call off the
+        thread that applies the result, as it only reads the model.
+        @return None if not due
+        @rtype: trayjenkins.graph.GraphFetch
+        """
+        result = None
+        now = self._clock()
+        if (self._retry_at is None or now >= self._retry_at) \
+           and (self._stale or now - self._fetched_at >= self._refresh_seconds):
+            try:
+                result = GraphFetch(self._source.job_upstreams())
+            except Exception as error:
+                self._metrics.count('errors.job_upstreams')
+                result = GraphFetch(None, error)
+
+        return result
+
+    def apply(self, fetch):
+        """
+        @param fetch: A fetch, or None for nothing fetched
+        @type fetch: trayjenkins.graph.GraphFetch
+        """
+        if fetch is not None and fetch.error is not None:
+            self._retry_at = self._clock() + self._retry_seconds
+        elif fetch is not None and fetch.upstreams is not None:
+            self._retry_at = None
+            self._fetched_at = self._clock()
+            self._stale = False
+            with self._metrics.timer('graph'):
+                changed = self._graph.update(fetch.upstreams)
+            if changed:
+                self._graph_changed_event.fire(self._graph)
+
+    def _on_jobs_delta(self, delta):
+
+        changed = False
+        for name in delta.removed:
+            if name in self._graph:
+                self._graph.remove(name)
+                changed = True
+        if self._fetched_at is not None:
+            for model in delta.changed:
+                if model.job.name not in self._graph:
+                    self._stale = True
+                    break
+        if changed:
+            self._graph_changed_event.fire(self._graph)
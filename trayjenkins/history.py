@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from pyjenkins.job import JobStatus
+
+
+# Each transition is stored as (seconds since epoch, job id, status code).
+RECORD = struct.Struct('<IIB')
+SECONDS_PER_DAY = 24 * 60 * 60
+
+_STATUS_CODES = {JobStatus.UNKNOWN: 0,
+                 JobStatus.OK: 1,
+                 JobStatus.FAILING: 2,
+                 JobStatus.DISABLED: 3}
+_CODE_STATUSES = dict((code, status) for status, code in _STATUS_CODES.items())
+_OK = _STATUS_CODES[JobStatus.OK]
+_FAILING = _STATUS_CODES[JobStatus.FAILING]
+
+
+class _JobIndex(object):
+    """
+    Where one job's records are in the data file, plus running totals so
+    that queries never have to walk the records themselves.
+    """
+
+    def __init__(self):
+        self.records = array('I')
+        self.flips = array('I')
+        self.status = None
+        self.last_pass_fail = None
+        self.ever_green = False
+        self.left_green = None
+
+    def add(self, record_number, timestamp, code):
+
+        flipped = code in (_OK, _FAILING) \
+                  and self.last_pass_fail is not None \
+                  and code != self.last_pass_fail
+        total = self.flips[-1] if self.flips else 0
+        self.records.append(record_number)
+        self.flips.append(total + (1 if flipped else 0))
+
+        if code in (_OK, _FAILING):
+            self.last_pass_fail = code
+        if code == _OK:
+            self.ever_green = True
+            self.left_green = None
+        elif self.status == _OK:
+            self.left_green = timestamp
+        self.status = code
+
+
+class HistoryStore(object):
+
+    def __init__(self, directory):
+        """
+        Append-only record of job status transitions, kept in directory as
+        fixed width records (history.dat) and one job name per line
+        (jobs.txt). Records are read through a memory map.
+        @type directory: str
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._names_path = os.path.join(directory, 'jobs.txt')
+        self._data_path = os.path.join(directory, 'history.dat')
+
+        self._ids = {}
+        self._names = []
+        if os.path.exists(self._names_path):
+            with open(self._names_path, 'rb') as names_file:
+                for line in names_file:
+                    self._add_name(line.rstrip('\n').decode('utf-8'))
+
+        self._names_file = open(self._names_path, 'ab')
+        self._data_file = open(self._data_path, 'ab')
+        self._map = None
+        self._record_count = self._drop_partial_record()
+        self._jobs = [_JobIndex() for name in self._names]  # @UnusedVariable
+        self._index_records()
+
+    def close(self):
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._names_file.close()
+        self._data_file.close()
+
+    def record(self, job_name, status, timestamp=None):
+        """
+        Appends a transition, unless it would not change the job's status.
+        @type job_name: str
+        @type status: str
+        @param timestamp: Seconds since the epoch, defaults to now
+        @type timestamp: float
+        @return Whether a transition was recorded
+        @rtype: bool
+        """
+        code = _STATUS_CODES.get(status, _STATUS_CODES[JobStatus.UNKNOWN])
+        job_id = self._ids.get(job_name, None)
+        if job_id is None:
+            job_id = self._add_name(job_name)
+            self._jobs.append(_JobIndex())
+            self._names_file.write(job_name.encode('utf-8') + '\n')
+            self._names_file.flush()
+
+        index = self._jobs[job_id]
+        recorded = index.status != code
+        if recorded:
+            timestamp = int(time.time() if timestamp is None else timestamp)
+            self._data_file.write(RECORD.pack(timestamp, job_id, code))
+            self._data_file.flush()
+            index.add(self._record_count, timestamp, code)
+            self._record_count += 1
+
+        return recorded
+
+    def status(self, job_name):
+        """
+        @return Last recorded status, or None if the job has no history
+        @rtype: str
+        """
+        index = self._index(job_name)
+        return None if index is None or index.status is None else _CODE_STATUSES[index.status]
+
+    def time_since_last_green(self, job_name, now=None):
+        """
+        @return Seconds since the job stopped being OK, 0 if it is OK now,
+        or None if it has never been OK.
+        @rtype: float
+        """
+        now = time.time() if now is None else now
+        index = self._index(job_name)
+        if index is None or not index.ever_green:
+            result = None
+        elif index.left_green is None:
+            result = 0
+        else:
+            result = max(0, now - index.left_green)
+
+        return result
+
+    def flip_rate(self, job_name, window_seconds=7 * SECONDS_PER_DAY, now=None):
+        """
+        @return Changes between OK and FAILING per day over the window
+        @rtype: float
+        """
+        now = time.time() if now is None else now
+        index = self._index(job_name)
+        result = 0.0
+        if index is not None and len(index.records) > 0:
+            first = self._first_record_after(index, now - window_seconds)
+            flips = index.flips[-1] - (index.flips[first - 1] if first > 0 else 0)
+            result = flips * float(SECONDS_PER_DAY) / window_seconds
+
+        return result
+
+    def transitions(self, job_name):
+        """
+        @rtype: [(int, str)]
+        """
+        index = self._index(job_name)
+        result = []
+        if index is not None:
+            for record_number in index.records:
+                timestamp, job_id, code = self._read(record_number)  # @UnusedVariable
+                result.append((timestamp, _CODE_STATUSES[code]))
+
+        return result
+
+    def job_names(self):
+        """
+        @rtype: [str]
+        """
+        return list(self._names)
+
+    def _drop_partial_record(self):
+        """
+        Cuts off any record left half written by a crash, so that appends
+        stay aligned.
+        @return Number of whole records
+        @rtype: int
+        """
+        size = os.path.getsize(self._data_path)
+        if size % RECORD.size:
+            self._data_file.truncate(size - size % RECORD.size)
+
+        return size // RECORD.size
+
+    def _add_name(self, job_name):
+
+        job_id = len(self._names)
+        self._ids[job_name] = job_id
+        self._names.append(job_name)
+        return job_id
+
+    def _index(self, job_name):
+
+        job_id = self._ids.get(job_name, None)
+        return None if job_id is None else self._jobs[job_id]
+
+    def _index_records(self):
+
+        for record_number in xrange(self._record_count):
+            timestamp, job_id, code = self._read(record_number)
+            self._jobs[job_id].add(record_number, timestamp, code)
+
+    def _read(self, record_number):
+
+        offset = record_number * RECORD.size
+        if self._map is None or offset + RECORD.size > len(self._map):
+            self._remap()
+        return RECORD.unpack_from(self._map, offset)
+
+    def _remap(self):
+
+        if self._map is not None:
+            self._map.close()
+        with open(self._data_path, 'rb') as data_file:
+            self._map = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _first_record_after(self, index, timestamp):
+
+        low = 0
+        high = len(index.records)
+        while low < high:
+            middle = (low + high) // 2
+            if self._read(index.records[middle])[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+
+class HistoryRecorder(object):
+
+    def __init__(self, store, jobs_model, clock=time.time):
+        """
+        Records each status change the jobs model reports, other than
+        those Jenkins has not yet confirmed.
+        @type store: trayjenkins.history.HistoryStore
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type clock: callable
+        """
+        self._store = store
+        self._clock = clock
+        jobs_model.jobs_delta_event().register(self._on_jobs_delta)
+
+    def _on_jobs_delta(self, delta):
+
+        now = self._clock()
+        for model in delta.changed:
+            if not model.pending:
+                self._store.record(model.job.name, model.job.status, now)
+
+    def describe(self, job_name, now=None):
+        """
+        @return e.g. 'Failing for 3h 20m, 1.4 flips/day'
+        @rtype: str
+        """
+        parts = []
+        since_green = self._store.time_since_last_green(job_name, now)
+        if since_green:
+            parts.append('Not passing for %s' % format_duration(since_green))
+        rate = self._store.flip_rate(job_name, now=now)
+        if rate:
+            parts.append('%.1f flips/day' % rate)
+
+        return ', '.join(parts)
+
+
+def format_duration(seconds):
+    """
+    @type seconds: float
+    @rtype: str
+    """
+    minutes = int(seconds) // 60
+    if minutes < 60:
+        result = '%dm' % minutes
+    elif minutes < 24 * 60:
+        result = '%dh %dm' % (minutes // 60, minutes % 60)
+    else:
+        result = '%dd %dh' % (minutes // (24 * 60), minutes // 60 % 24)
+
+    return result
@@ -1,17 +1,43 @@
-from pyjenkins.jenkins import JenkinsFactory
+import fnmatch
+import re
+import threading
+
+from trayjenkins.errors import ServerUnreachableError, ThrottledError
 from trayjenkins.event import Event
-import copy
+from trayjenkins.metrics import NULL_METRICS
+from trayjenkins.singleflight import SingleFlight
+from pyjenkins.job import Job, JobStatus
+
+
+_CANONICAL_STATUSES = dict((status, status) for status in (JobStatus.OK,
+                                                           JobStatus.FAILING,
+                                                           JobStatus.DISABLED,
+                                                           JobStatus.UNKNOWN))
+
+
+def canonical_status(status):
+    """
+    @return The JobStatus constant equal to status, so that statuses can be
+    compared by identity; any other status is returned as it is.
+    @type status: str
+    @rtype: str
+    """
+    return _CANONICAL_STATUSES.get(status, status)
 
 
 class JobModel(object):
 
-    def __init__(self, job, ignored):
+    def __init__(self, job, ignored, pending=False):
         """
         @type job: pyjenkins.job.Job
         @type ignored: bool
+        @param pending: Whether the status is only expected, shown before
+        Jenkins has reported it, e.g. while a job is being disabled
+        @type pending: bool
         """
         self.job = job
         self.ignored = ignored
+        self.pending = pending
 
     def __eq__(self, other):
         """
@@ -19,13 +45,212 @@ class JobModel(object):
         @rtype: bool
         """
         return self.job == other.job \
-           and self.ignored == other.ignored
+           and self.ignored == other.ignored \
+           and self.pending == other.pending
+
+    def __ne__(self, other):
+        """
+        @type other: trayjenkins.jobs.JobModel
+        @rtype: bool
+        """
+        return not self == other
+
+    def __repr__(self):
+        """
+        @rtype: str
+        """
+        result = 'JobModel(job=%r,ignored=%r)' % (self.job, self.ignored)
+        if self.pending:
+            result = result[:-1] + ',pending=True)'
+
+        return result
+
+
+class JobsDelta(object):
+
+    def __init__(self, changed, removed):
+        """
+        @param changed: Models for jobs that are new or differ from before
+        @type changed: [trayjenkins.jobs.JobModel]
+        @param removed: Names of jobs no longer listed
+        @type removed: [str]
+        """
+        self.changed = changed
+        self.removed = removed
+
+    def __eq__(self, other):
+        """
+        @type other: trayjenkins.jobs.JobsDelta
+        @rtype: bool
+        """
+        return isinstance(other, JobsDelta) \
+           and self.changed == other.changed \
+           and self.removed == other.removed
+
+    def __ne__(self, other):
+        """
+        @type other: trayjenkins.jobs.JobsDelta
+        @rtype: bool
+        """
+        return not self == other
 
     def __repr__(self):
         """
         @rtype: str
         """
-        return 'JobModel(job=%r,ignored=%r)' % (self.job, self.ignored)
+        return 'JobsDelta(changed=%r,removed=%r)' % (self.changed, self.removed)
+
+    def is_empty(self):
+        """
+        @rtype: bool
+        """
+        return not self.changed and not self.removed
+
+
+def diff_job_models(old_models, new_models):
+    """
+    Models shared between the two lists, as JobRegistry arranges for jobs
+    that did not change, are skipped without comparing them.
+    @type old_models: [trayjenkins.jobs.JobModel]
+    @type new_models: [trayjenkins.jobs.JobModel]
+    @rtype: trayjenkins.jobs.JobsDelta
+    """
+    old_by_name = dict((model.job.name, model) for model in old_models)
+    new_names = set()
+    changed = []
+    for model in new_models:
+        new_names.add(model.job.name)
+        old_model = old_by_name.get(model.job.name, None)
+        if old_model is not model and (old_model is None or old_model != model):
+            changed.append(model)
+    removed = [model.job.name for model in old_models if model.job.name not in new_names]
+
+    return JobsDelta(changed, removed)
+
+
+class JobRegistry(object):
+
+    def __init__(self):
+        """
+        Hands out the same JobModel, job and name strings for a job for as
+        long as its status and ignored state stay the same, so a poll in
+        which nothing changed keeps nothing new. Statuses are the
+        JobStatus constants. Only the jobs from the latest poll are kept.
+        """
+        self._models = {}
+
+    def models(self, jobs, ignore, pending=()):
+        """
+        @type jobs: [pyjenkins.job.Job]
+        @param ignore: Names of ignored jobs
+        @type ignore: set
+        @param pending: Names of jobs whose status is only expected
+        @type pending: set
+        @rtype: [trayjenkins.jobs.JobModel]
+        """
+        previous = self._models
+        self._models = {}
+        result = [self._model(previous.get(job.name, None), job, job.name in ignore, job.name in pending)
+                  for job in jobs]
+
+        return result
+
+    def model(self, job, ignored, pending=False):
+        """
+        Registers a change to one job, keeping the rest.
+        @type job: pyjenkins.job.Job
+        @type ignored: bool
+        @type pending: bool
+        @rtype: trayjenkins.jobs.JobModel
+        """
+        return self._model(self._models.get(job.name, None), job, ignored, pending)
+
+    def _model(self, old_model, job, ignored, pending):
+
+        if old_model is None:
+            result = JobModel(Job(job.name, canonical_status(job.status)), ignored, pending)
+        elif old_model.job.status != job.status or old_model.ignored != ignored or old_model.pending != pending:
+            result = JobModel(Job(old_model.job.name, canonical_status(job.status)), ignored, pending)
+        else:
+            result = old_model
+        self._models[result.job.name] = result
+
+        return result
+
+
+class JobsFetch(object):
+
+    def __init__(self, sequence, jobs, unreachable=None, error=None):
+        """
+        What one poll of Jenkins returned, for Model.apply_jobs.
+        @param sequence: Orders polls by when they started
+        @type sequence: int
+        @param jobs: None if the poll was throttled or failed
+        @type jobs: [pyjenkins.job.Job]
+        @param unreachable: Why Jenkins could not be reached, if it could not
+        @type unreachable: str
+        @param error: Any other failure, raised again when applied
+        @type error: Exception
+        """
+        self.sequence = sequence
+        self.jobs = jobs
+        self.unreachable = unreachable
+        self.error = error
+
+
+class IgnoredJobs(object):
+
+    def __init__(self):
+        """
+        The jobs ignored by name, and by shell style patterns of names.
+        Whether a name matches the patterns is remembered until they change
+        or the job is forgotten.
+        """
+        self._names = set()
+        self._pattern = None
+        self._matches = {}
+
+    def __contains__(self, name):
+
+        if name in self._names:
+            result = True
+        elif self._pattern is None:
+            result = False
+        else:
+            result = self._matches.get(name, None)
+            if result is None:
+                result = self._matches[name] = self._pattern.match(name) is not None
+
+        return result
+
+    def add(self, name):
+        """
+        @type name: str
+        """
+        self._names.add(name)
+
+    def remove(self, name):
+        """
+        A job that matches a pattern stays ignored.
+        @type name: str
+        """
+        self._names.discard(name)
+
+    def set_patterns(self, patterns):
+        """
+        @type patterns: (str)
+        """
+        self._pattern = re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns)) if patterns else None
+        self._matches = {}
+
+    def forget(self, names):
+        """
+        Drops what is remembered of jobs no longer listed. Jobs ignored by
+        name stay ignored.
+        @type names: [str]
+        """
+        for name in names:
+            self._matches.pop(name, None)
 
 
 class IErrorLogger(object):
@@ -43,6 +268,26 @@ class IModel(object):
         @rtype: None
         """
 
+    def fetch_jobs(self):
+        """
+        Polls Jenkins without changing the model, so may be called on any
+        thread.
+        @rtype: trayjenkins.jobs.JobsFetch
+        """
+
+    def apply_jobs(self, fetch):
+        """
+        Applies a poll from fetch_jobs, unless a later poll has been applied.
+        @type fetch: trayjenkins.jobs.JobsFetch
+        """
+
+    def update_job(self, job):
+        """
+        Applies a change to a single job, e.g. from a Jenkins notification,
+        without listing all jobs.
+        @type job: pyjenkins.job.Job
+        """
+
     def disable_job(self, job_name):
         """
         @type job_name: str
@@ -63,9 +308,39 @@ class IModel(object):
         @type job_name: str
         """
 
+    def set_ignore_patterns(self, patterns):
+        """
+        @param patterns: Shell style patterns of job names to ignore
+        @type patterns: (str)
+        """
+
+    def job_models(self):
+        """
+        @return The jobs as of the last update
+        @rtype: [trayjenkins.jobs.JobModel]
+        """
+
     def jobs_updated_event(self):
         """
-        Listeners receive Event.fire([pyjenkins.job.Job])
+        Fired with every job after a change to the list as a whole, e.g. a
+        poll. A change to a single job fires jobs_delta_event alone.
+        Listeners receive Event.fire([trayjenkins.jobs.JobModel])
+        @rtype: trayjenkins.event.IEvent
+        """
+
+    def jobs_delta_event(self):
+        """
+        Fired straight after jobs_updated_event with just what changed, and
+        on its own when a single job changes.
+        Listeners receive Event.fire(trayjenkins.jobs.JobsDelta)
+        @rtype: trayjenkins.event.IEvent
+        """
+
+    def server_unreachable_event(self):
+        """
+        Fired when Jenkins stops answering, and again when it answers once
+        more. Listeners receive Event.fire(reason:str), with reason None
+        once Jenkins is back.
         @rtype: trayjenkins.event.IEvent
         """
 
@@ -101,6 +376,12 @@ class IView(object):
         @type jobs: [trayjenkins.jobs.JobModel]
         """
 
+    def update_job(self, job_model):
+        """
+        Shows a change to one job, adding it if it is not listed.
+        @type job_model: trayjenkins.jobs.JobModel
+        """
+
 
 class IFilter(object):
 
@@ -120,7 +401,9 @@ class Presenter(object):
         """
         self._model = model
         self._view = view
+        self._listed = False
         model.jobs_updated_event().register(self._on_model_jobs_changed)
+        model.jobs_delta_event().register(self._on_model_jobs_delta)
         view.job_ignored_event().register(self._on_view_job_ignored)
         view.job_unignored_event().register(self._on_view_job_unignored)
         view.job_enabled_event().register(self._on_view_job_enabled)
@@ -129,6 +412,18 @@ class Presenter(object):
     def _on_model_jobs_changed(self, jobs):
 
         self._view.set_jobs(jobs)
+        self._listed = True
+
+    def _on_model_jobs_delta(self, delta):
+        """
+        The delta that follows a whole list is already shown; one on its
+        own is a single job's change.
+        """
+        if self._listed:
+            self._listed = False
+        else:
+            for model in delta.changed:
+                self._view.update_job(model)
 
     def _on_view_job_ignored(self, job_name):
 
@@ -149,49 +444,178 @@ class Presenter(object):
 
 class Model(IModel):
 
-    def __init__(self, jenkins, error_logger, jobs_updated_event=Event()):
-
+    def __init__(self,
+                 jenkins,
+                 error_logger,
+                 jobs_updated_event=None,
+                 jobs_delta_event=None,
+                 metrics=NULL_METRICS,
+                 server_unreachable_event=None):
+        """
+        @type jenkins: pyjenkins.jenkins.Jenkins
+        @type error_logger: trayjenkins.jobs.IErrorLogger
+        @type jobs_updated_event: trayjenkins.event.IEvent
+        @type jobs_delta_event: trayjenkins.event.IEvent
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type server_unreachable_event: trayjenkins.event.IEvent
+        """
         self._jenkins = jenkins
+        self._metrics = metrics
         self._error_logger = error_logger
-        self._jobs_updated_event = jobs_updated_event
+        self._jobs_updated_event = Event() if jobs_updated_event is None else jobs_updated_event
+        self._jobs_delta_event = Event() if jobs_delta_event is None else jobs_delta_event
+        self._server_unreachable_event = Event() if server_unreachable_event is None else server_unreachable_event
+        self._unreachable = False
+        self._poll_error = None
         self._models = []
-        self._ignore = set()
+        self._positions = {}
+        self._ignore = IgnoredJobs()
+        self._registry = JobRegistry()
+        self._flights = SingleFlight()
+        self._sequence_lock = threading.Lock()
+        self._sequence = 0
+        self._applied_sequence = 0
+        self._updated_since = {}
+        self._pending = set()
 
     def update_jobs(self):
         """
+        Skips the poll if the Jenkins wrapper says it is throttled, and
+        reports, rather than raises, Jenkins being unreachable. Calls made
+        while a poll is in flight share it.
         @rtype: None
         """
-        jobs = self._jenkins.list_jobs()
-        models = [JobModel(job, job.name in self._ignore) for job in jobs]
-        self._update_models(models)
+        self._flights.do('update_jobs', self._update_jobs)
+
+    def _update_jobs(self):
+
+        self.apply_jobs(self.fetch_jobs())
+
+    def fetch_jobs(self):
+        """
+        @rtype: trayjenkins.jobs.JobsFetch
+        """
+        sequence = self._next_sequence()
+        jobs = None
+        unreachable = None
+        error = None
+        try:
+            with self._metrics.timer('list_jobs'):
+                jobs = self._jenkins.list_jobs()
+        except ThrottledError:
+            pass
+        except ServerUnreachableError as unreachable_error:
+            self._metrics.count('errors.list_jobs')
+            unreachable = str(unreachable_error)
+        except Exception as failure:
+            self._metrics.count('errors.list_jobs')
+            error = failure
+
+        return JobsFetch(sequence, jobs, unreachable, error)
+
+    def apply_jobs(self, fetch):
+        """
+        A poll that finishes after one started later is dropped, and jobs
+        changed by update_job since a poll started keep their newer status.
+        A throttled poll changes nothing, and a failed one is logged, once
+        for as long as polls keep failing the same way.
+        @type fetch: trayjenkins.jobs.JobsFetch
+        """
+        if fetch.sequence < self._applied_sequence:
+            self._metrics.count('stale_polls')
+        elif fetch.jobs is not None or fetch.unreachable is not None or fetch.error is not None:
+            self._applied_sequence = fetch.sequence
+            poll_error = None if fetch.error is None else 'Failed to list jobs: %s' % fetch.error
+            if poll_error is not None and poll_error != self._poll_error:
+                self._error_logger.log_error(poll_error)
+            self._poll_error = poll_error
+            if fetch.unreachable is not None:
+                self._set_unreachable(fetch.unreachable)
+            elif fetch.jobs is not None:
+                self._set_unreachable(None)
+                models = self._registry.models(self._keep_newer(fetch), self._ignore, self._pending)
+                self._update_models(models)
+
+    def update_job(self, job):
+        """
+        The job's model is replaced where it stands in the list, so the
+        change costs the same however many jobs there are, and only
+        jobs_delta_event is fired.
+        @type job: pyjenkins.job.Job
+        """
+        self._update_job(job, False)
+
+    def _update_job(self, job, pending):
+
+        self._updated_since[job.name] = self._next_sequence()
+        if pending:
+            self._pending.add(job.name)
+        else:
+            self._pending.discard(job.name)
+        model = self._registry.model(job, job.name in self._ignore, pending)
+        index = self._positions.get(job.name, None)
+        if index is None:
+            self._positions[job.name] = len(self._models)
+            self._models.append(model)
+        elif self._models[index] != model:
+            self._models[index] = model
+        else:
+            model = None
+
+        if model is not None:
+            with self._metrics.timer('dispatch'):
+                self._jobs_delta_event.fire(JobsDelta([model], []))
 
     def enable_job(self, job_name):
         """
+        Shares the request with any enable of the same job already in
+        flight, then fetches just that job.
         @type job_name: str
         """
-        if not self._jenkins.enable_job(job_name):
-            self._error_logger.log_error("Failed to enable job '%s', check username and/or password" % job_name)
+        self._flights.do(('enable_job', job_name), self._set_job_enabled, job_name, True)
 
     def disable_job(self, job_name):
         """
         @type job_name: str
         """
-        if not self._jenkins.disable_job(job_name):
-            self._error_logger.log_error("Failed to disable job '%s', check username and/or password" % job_name)
+        self._flights.do(('disable_job', job_name), self._set_job_enabled, job_name, False)
 
     def ignore_job(self, job_name):
         """
         @type job_name: str
         """
         self._ignore.add(job_name)
-        self._set_ignore_status(job_name, True)
+        self._apply_ignored()
 
     def unignore_job(self, job_name):
         """
+        A job that matches one of the ignore patterns stays ignored, and
+        the user is told why.
         @type job_name: str
         """
         self._ignore.remove(job_name)
-        self._set_ignore_status(job_name, False)
+        if job_name in self._ignore:
+            self._error_logger.log_error("Job '%s' is still ignored, as it matches ignore_patterns" % job_name)
+        else:
+            self._apply_ignored()
+
+    def set_ignore_patterns(self, patterns):
+        """
+        Ignores every job whose name matches one of the patterns, as well
+        as those ignored by name, and applies the change to the jobs
+        already listed without polling.
+        @param patterns: Shell style patterns, e.g. 'sandbox-*'
+        @type patterns: (str)
+        """
+        self._ignore.set_patterns(patterns)
+        self._apply_ignored()
+
+    def job_models(self):
+        """
+        @return The jobs as of the last update
+        @rtype: [trayjenkins.jobs.JobModel]
+        """
+        return self._models
 
     def jobs_updated_event(self):
         """
@@ -200,17 +624,122 @@ class Model(IModel):
         """
         return self._jobs_updated_event
 
-    def _set_ignore_status(self, job_name, ignored):
-        models = copy.deepcopy(self._models)
-        for model in models:
+    def jobs_delta_event(self):
+        """
+        Listeners receive Event.fire(trayjenkins.jobs.JobsDelta)
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._jobs_delta_event
+
+    def server_unreachable_event(self):
+        """
+        Listeners receive Event.fire(reason:str), reason None when Jenkins
+        is reachable again
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._server_unreachable_event
+
+    def _set_job_enabled(self, job_name, enabled):
+        """
+        Shows the job with its expected status straight away, as UNKNOWN
+        until an enabled job's build status is known, and puts it back if
+        Jenkins refuses or cannot be reached. The expected status is marked
+        pending until Jenkins reports the job.
+        """
+        action = 'enable' if enabled else 'disable'
+        method = self._jenkins.enable_job if enabled else self._jenkins.disable_job
+        previous_pending = job_name in self._pending
+        previous = self._show_job_as(job_name, JobStatus.UNKNOWN if enabled else JobStatus.DISABLED)
+        succeeded = False
+        try:
+            succeeded = method(job_name)
+            if not succeeded:
+                self._error_logger.log_error("Failed to %s job '%s', check username and/or password" % (action, job_name))
+        except Exception as error:
+            self._error_logger.log_error("Failed to %s job '%s': %s" % (action, job_name, error))
+        finally:
+            if not succeeded and previous is not None:
+                self._update_job(previous, previous_pending)
+        if succeeded:
+            self._confirm_job(job_name)
+
+    def _show_job_as(self, job_name, status):
+        """
+        @return The job as it was, or None if it is not listed
+        @rtype: pyjenkins.job.Job
+        """
+        result = None
+        for model in self._models:
             if model.job.name == job_name:
-                model.ignored = ignored
+                result = model.job
+                self._update_job(Job(job_name, status), True)
+                break
+
+        return result
+
+    def _confirm_job(self, job_name):
+        """
+        Fetches the job with the backend's get_job, where it has one, so
+        that Jenkins has the final say. Otherwise, or if that fails, the
+        next poll confirms it. Failures other than Jenkins being
+        unreachable are logged.
+        """
+        job = None
+        if hasattr(self._jenkins, 'get_job'):
+            try:
+                job = self._jenkins.get_job(job_name)
+            except ServerUnreachableError:
+                pass
+            except Exception as error:
+                self._error_logger.log_error("Failed to fetch job '%s': %s" % (job_name, error))
+        if job is not None and any(model.job.name == job_name for model in self._models):
+            self.update_job(job)
+
+    def _next_sequence(self):
+
+        with self._sequence_lock:
+            self._sequence += 1
+            return self._sequence
+
+    def _keep_newer(self, fetch):
+
+        jobs = fetch.jobs
+        if self._updated_since:
+            current = dict((model.job.name, model.job) for model in self._models)
+            jobs = [current.get(job.name, job) if self._updated_since.get(job.name, 0) > fetch.sequence else job
+                    for job in jobs]
+            self._pending = set(name for name in self._pending if self._updated_since.get(name, 0) > fetch.sequence)
+            self._updated_since = dict((name, sequence) for name, sequence in self._updated_since.items()
+                                       if sequence > fetch.sequence)
+        return jobs
+
+    def _set_unreachable(self, reason):
+
+        unreachable = reason is not None
+        if unreachable != self._unreachable:
+            self._unreachable = unreachable
+            self._server_unreachable_event.fire(reason)
+
+    def _apply_ignored(self):
+        """
+        Marks the jobs already listed as ignored or not, without polling.
+        """
+        models = self._registry.models([model.job for model in self._models], self._ignore, self._pending)
         self._update_models(models)
 
     def _update_models(self, models):
-        if models != self._models:
-            self._jobs_updated_event.fire(models)
+        with self._metrics.timer('diff'):
+            changed = models != self._models
+            if changed:
+                delta = diff_job_models(self._models, models)
+        if changed:
+            with self._metrics.timer('dispatch'):
+                self._jobs_updated_event.fire(models)
+                self._jobs_delta_event.fire(delta)
             self._models = models
+            self._positions = dict((model.job.name, index) for index, model in enumerate(models))
+            if delta.removed:
+                self._ignore.forget(delta.removed)
 
 
 class IgnoreJobsFilter(IFilter):
@@ -221,3 +750,39 @@ class IgnoreJobsFilter(IFilter):
         @rtype: [tryyjenkins.jobs.JobModel]
         """
         return [model for model in job_models if not model.ignored]
+
+
+class NameJobsFilter(IFilter):
+
+    def __init__(self, patterns):
+        """
+        Keeps the jobs, not ignored, whose names match any of the shell
+        style patterns. Whether a name matches is remembered until the job
+        is forgotten.
+        @type patterns: (str)
+        """
+        self._pattern = re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
+        self._matches = {}
+
+    def _matches_name(self, name):
+
+        result = self._matches.get(name, None)
+        if result is None:
+            result = self._matches[name] = self._pattern.match(name) is not None
+
+        return result
+
+    def filter_jobs(self, job_models):
+        """
+        @type jobs: [trayyjenkins.jobs.JobModel]
+        @rtype: [tryyjenkins.jobs.JobModel]
+        """
+        return [model for model in job_models if not model.ignored and self._matches_name(model.job.name)]
+
+    def forget(self, names):
+        """
+        Drops what is remembered of jobs no longer listed.
+        @type names: [str]
+        """
+        for name in names:
+            self._matches.pop(name, None)
@@ -0,0 +1,184 @@
+import sys
+import threading
+import time
+
+
+class IMetrics(object):
+
+    def timer(self, name):
+        """
+        Times the body of a with statement.
+        @type name: str
+        @rtype: context manager
+        """
+
+    def count(self, name, amount=1):
+        """
+        @type name: str
+        @type amount: int
+        """
+
+    def snapshot(self):
+        """
+        @return {'timers': {name: {'count', 'total_ms', 'mean_ms', 'max_ms',
+        'last_ms'}}, 'counters': {name: int}}
+        @rtype: dict
+        """
+
+
+class _NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullMetrics(IMetrics):
+    """
+    What everything uses unless metrics are turned on, so the cost of the
+    instrumentation is one method call returning a shared object.
+    """
+
+    _timer = _NullTimer()
+
+    def timer(self, name):
+        return self._timer
+
+    def count(self, name, amount=1):
+        pass
+
+    def snapshot(self):
+        return {'timers': {}, 'counters': {}}
+
+
+NULL_METRICS = NullMetrics()
+
+
+class _TimerStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+
+class _Timer(object):
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics._record(self._name, time.time() - self._start)
+        return False
+
+
+class Metrics(IMetrics):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    def timer(self, name):
+        """
+        @type name: str
+        @rtype: context manager
+        """
+        return _Timer(self, name)
+
+    def count(self, name, amount=1):
+        """
+        @type name: str
+        @type amount: int
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """
+        @rtype: dict
+        """
+        with self._lock:
+            timers = dict((name, {'count': stats.count,
+                                  'total_ms': stats.total * 1000,
+                                  'mean_ms': stats.total / stats.count * 1000,
+                                  'max_ms': stats.max * 1000,
+                                  'last_ms': stats.last * 1000})
+                          for name, stats in self._timers.items())
+            counters = dict(self._counters)
+
+        return {'timers': timers, 'counters': counters}
+
+    def _record(self, name, seconds):
+
+        with self._lock:
+            stats = self._timers.get(name, None)
+            if stats is None:
+                stats = self._timers[name] = _TimerStats()
+            stats.add(seconds)
+
+
+def format_snapshot(snapshot):
+    """
+    @type snapshot: dict
+    @return One line, e.g. 'list_jobs n=4 mean=12.1ms max=20.3ms last=9.8ms errors.list_jobs=1'
+    @rtype: str
+    """
+    parts = []
+    for name, stats in sorted(snapshot['timers'].items()):
+        parts.append('%s n=%d mean=%.1fms max=%.1fms last=%.1fms' % (
+                     name, stats['count'], stats['mean_ms'], stats['max_ms'], stats['last_ms']))
+    for name, value in sorted(snapshot['counters'].items()):
+        parts.append('%s=%d' % (name, value))
+
+    return '; '.join(parts)
+
+
+class MetricsLogger(object):
+
+    def __init__(self, metrics, stream=sys.stderr):
+        """
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type stream: file
+        """
+        self._metrics = metrics
+        self._stream = stream
+        self._stopping = threading.Event()
+
+    def start(self, seconds):
+        """
+        Logs a line every given number of seconds from a background thread.
+        @type seconds: float
+        """
+        def log_until_stopped():
+            while not self._stopping.wait(seconds):
+                self.log()
+
+        thread = threading.Thread(target=log_until_stopped, name='metrics-logger')
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+
+        self._stopping.set()
+
+    def log(self):
+
+        self._stream.write('%s metrics: %s\n' % (time.strftime('%Y-%m-%d %H:%M:%S'),
+                                                 format_snapshot(self._metrics.snapshot())))
+        self._stream.flush()
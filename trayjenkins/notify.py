@@ -0,0 +1,129 @@
+import json
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from collections import OrderedDict
+
+from pyjenkins.job import Job, JobStatus
+
+
+# Poll interval to fall back to when notifications are enabled, just to
+# catch anything the notifications missed.
+RECONCILE_SECONDS = 300
+
+_RESULT_STATUSES = {'SUCCESS': JobStatus.OK,
+                    'UNSTABLE': JobStatus.FAILING,
+                    'FAILURE': JobStatus.FAILING,
+                    'ABORTED': JobStatus.UNKNOWN,
+                    'NOT_BUILT': JobStatus.UNKNOWN}
+
+
+def job_from_notification(values):
+    """
+    Reads a Jenkins Notification Plugin message, e.g.
+    {"name": "spam", "build": {"phase": "COMPLETED", "status": "FAILURE"}}
+    @type values: dict
+    @return The job's new status, or None if the message is about a build
+    that has not finished.
+    @rtype: pyjenkins.job.Job
+    """
+    result = None
+    build = values.get('build', {})
+    if build.get('phase') in ('COMPLETED', 'FINALIZED'):
+        status = _RESULT_STATUSES.get(build.get('status'), JobStatus.UNKNOWN)
+        result = Job(values['name'], status)
+
+    return result
+
+
+class NotificationRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+
+        try:
+            length = int(self.headers.getheader('Content-Length', 0))
+            job = job_from_notification(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, AttributeError):
+            self.send_error(400)
+        else:
+            if job is not None:
+                self.server.listener.queue_job(job)
+            self.send_response(204)
+            self.end_headers()
+
+    def log_message(self, format, *args):  # @ReservedAssignment
+        pass
+
+
+class NotificationServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, listener):
+        """
+        @type address: (str, int)
+        @type listener: trayjenkins.notify.NotificationListener
+        """
+        HTTPServer.__init__(self, address, NotificationRequestHandler)
+        self.listener = listener
+
+
+class NotificationListener(object):
+
+    def __init__(self, address=('', 8098), on_notification=lambda: None):
+        """
+        Accepts Jenkins build notifications over HTTP on a background thread
+        and queues the job changes until apply_pending() is called, so that
+        the jobs model is only ever touched from the caller's thread.
+        @type address: (str, int)
+        @param on_notification: Called, on the listener's thread, whenever
+        a job change is queued.
+        @type on_notification: callable
+        """
+        self._on_notification = on_notification
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._server = NotificationServer(address, self)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='jenkins-notifications')
+        self._thread.daemon = True
+
+    def address(self):
+        """
+        @rtype: (str, int)
+        """
+        return self._server.server_address
+
+    def start(self):
+
+        self._thread.start()
+
+    def stop(self):
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def queue_job(self, job):
+        """
+        Only the latest change to each job is kept, so a burst of
+        notifications for one job costs a single model update.
+        @type job: pyjenkins.job.Job
+        """
+        with self._lock:
+            self._pending.pop(job.name, None)
+            self._pending[job.name] = job
+        self._on_notification()
+
+    def apply_pending(self, jobs_model):
+        """
+        @type jobs_model: trayjenkins.jobs.IModel
+        @return Number of jobs updated
+        @rtype: int
+        """
+        with self._lock:
+            jobs = self._pending.values()
+            self._pending.clear()
+        for job in jobs:
+            jobs_model.update_job(job)
+
+        return len(jobs)
@@ -0,0 +1,221 @@
+import time
+
+from trayjenkins.event import Event
+from trayjenkins.history import format_duration
+from trayjenkins.metrics import NULL_METRICS
+
+
+class BuildProgress(object):
+
+    def __init__(self, job_name, number, started, expected_seconds=None):
+        """
+        A running build. Progress is worked out from the clock, so it
+        needs fetching only once per build.
+        @type job_name: str
+        @type number: int
+        @param started: When the build started, in seconds since the epoch
+        @type started: float
+        @param expected_seconds: How long the last build took, or None if
+        there has not been one
+        @type expected_seconds: float
+        """
+        self.job_name = job_name
+        self.number = number
+        self.started = started
+        self.expected_seconds = expected_seconds
+
+    def __eq__(self, other):
+
+        return other is not None \
+           and self.job_name == other.job_name \
+           and self.number == other.number \
+           and self.started == other.started \
+           and self.expected_seconds == other.expected_seconds
+
+    def __ne__(self, other):
+
+        return not self == other
+
+    def __repr__(self):
+
+        return 'BuildProgress(%r,%r,%r,%r)' % (self.job_name, self.number, self.started, self.expected_seconds)
+
+    def percent(self, now):
+        """
+        @return Percent complete, held at 99 once the build overruns, or
+        None if there is nothing to compare with
+        @rtype: int
+        """
+        if self.expected_seconds:
+            result = max(0, min(99, int(100 * (now - self.started) / self.expected_seconds)))
+        else:
+            result = None
+
+        return result
+
+    def remaining(self, now):
+        """
+        @return Seconds until the build should finish, or None if unknown
+        @rtype: float
+        """
+        if self.expected_seconds:
+            result = max(0, self.started + self.expected_seconds - now)
+        else:
+            result = None
+
+        return result
+
+    def describe(self, now):
+        """
+        @return e.g. 'Building #42: 63%, about 4m left'
+        @rtype: str
+        """
+        remaining = self.remaining(now)
+        if remaining is None:
+            result = 'Building #%d for %s' % (self.number, format_duration(now - self.started))
+        elif remaining < 60:
+            result = 'Building #%d: %d%%, under a minute left' % (self.number, self.percent(now))
+        else:
+            result = 'Building #%d: %d%%, about %s left' % (self.number, self.percent(now), format_duration(remaining))
+
+        return result
+
+
+class IBuildSource(object):
+
+    def building_jobs(self):
+        """
+        @return Names of the jobs that were building at the last poll
+        @rtype: set
+        """
+
+    def build_progress(self, job_name):
+        """
+        @return None if the job is not building
+        @rtype: trayjenkins.progress.BuildProgress
+        """
+
+
+class ProgressFetch(object):
+
+    def __init__(self, building, started, error=None):
+        """
+        @param building: Names of the jobs building
+        @type building: set
+        @param started: Progress of the builds asked about, None for a job
+        found not to be building after all
+        @type started: dict
+        @param error: Why a build's progress could not be fetched, if one
+        could not; that job is asked about again next poll
+        @type error: Exception
+        """
+        self.building = building
+        self.started = started
+        self.error = error
+
+
+class BuildProgressModel(object):
+
+    def __init__(self, source, progress_changed_event=None, metrics=NULL_METRICS, clock=time.time):
+        """
+        Tracks the running builds. Each poll tells it which jobs are
+        building; only builds it has not seen before are fetched, one
+        small request each, so the cost follows the number of builds
+        started rather than the number of jobs. A build that should have
+        finished by now is fetched again each poll, as the job may have
+        gone on to its next build in between. A build with no expected
+        duration is not fetched again while the job stays building; it is
+        dropped, and so fetched afresh, once a poll finds the job idle.
+        @type source: trayjenkins.progress.IBuildSource
+        @type progress_changed_event: trayjenkins.event.IEvent
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type clock: callable
+        """
+        self._source = source
+        self._progress_changed_event = Event() if progress_changed_event is None else progress_changed_event
+        self._metrics = metrics
+        self._clock = clock
+        self._progress = {}
+
+    def progress_changed_event(self):
+        """
+        Listeners receive Event.fire(progress:dict), BuildProgress by job name
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._progress_changed_event
+
+    def progress(self):
+        """
+        @return BuildProgress by job name
+        @rtype: dict
+        """
+        return self._progress
+
+    def update(self):
+
+        self.apply(self.fetch())
+
+    def fetch(self):
+        """
+        Asks Jenkins about new builds. Safe to call off the thread that
+        applies the result, as it only reads the progress.
+        @rtype: trayjenkins.progress.ProgressFetch
+        """
+        now = self._clock()
+        building = set(self._source.building_jobs())
+        started = {}
+        error = None
+        for name in building:
+            known = self._progress.get(name, None)
+            if known is None or known.remaining(now) == 0:
+                try:
+                    started[name] = self._source.build_progress(name)
+                except Exception as failure:
+                    self._metrics.count('errors.build_progress')
+                    error = failure
+
+        return ProgressFetch(building, started, error)
+
+    def apply(self, fetch):
+        """
+        @type fetch: trayjenkins.progress.ProgressFetch
+        """
+        progress = dict((name, value) for name, value in self._progress.items() if name in fetch.building)
+        for name, value in fetch.started.items():
+            if value is None:
+                progress.pop(name, None)
+            else:
+                progress[name] = value
+        if progress != self._progress:
+            self._progress = progress
+            self._progress_changed_event.fire(progress)
+
+
+class IProgressView(object):
+
+    def set_progress(self, progress):
+        """
+        @param progress: BuildProgress by job name
+        @type progress: dict
+        """
+
+
+class ProgressPresenter(object):
+
+    def __init__(self, model, view):
+        """
+        @type model: trayjenkins.progress.BuildProgressModel
+        @type view: trayjenkins.progress.IProgressView
+        """
+        self._model = model
+        self._view = view
+        model.progress_changed_event().register(view.set_progress)
+        if model.progress():
+            view.set_progress(model.progress())
+
+    def refresh(self):
+        """
+        Shows the builds' progress as of now, without asking Jenkins.
+        """
+        if self._model.progress():
+            self._view.set_progress(self._model.progress())
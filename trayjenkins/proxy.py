@@ -0,0 +1,486 @@
+import json
+import socket
+import sys
+import threading
+import time
+import urllib
+import urllib2
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from collections import deque, OrderedDict
+from urlparse import urlparse, parse_qs
+
+from pyjenkins.job import Job
+from trayjenkins.config import ConfigError
+from trayjenkins.jobs import Model, IErrorLogger
+from trayjenkins.metrics import Metrics, MetricsLogger, NULL_METRICS
+from trayjenkins.settings import ProxyCommandLineSettingsParser
+
+
+# How much sooner than the next poll a long poll of the proxy gives up,
+# so that a poll is not skipped while the last one is still waiting.
+LONG_POLL_MARGIN_SECONDS = 2
+
+
+class ProxyUpdate(object):
+
+    def __init__(self, epoch, version, full, jobs, removed):
+        """
+        @param epoch: Identifies the proxy process, so clients can tell when
+        versions have been reset by a restart
+        @type epoch: str
+        @type version: int
+        @param full: Whether jobs is the whole job list rather than changes
+        @type full: bool
+        @type jobs: [pyjenkins.job.Job]
+        @param removed: Names of jobs no longer listed
+        @type removed: [str]
+        """
+        self.epoch = epoch
+        self.version = version
+        self.full = full
+        self.jobs = jobs
+        self.removed = removed
+
+    def __eq__(self, other):
+        """
+        @type other: trayjenkins.proxy.ProxyUpdate
+        @rtype: bool
+        """
+        return isinstance(other, ProxyUpdate) \
+           and self.epoch == other.epoch \
+           and self.version == other.version \
+           and self.full == other.full \
+           and self.jobs == other.jobs \
+           and self.removed == other.removed
+
+    def __repr__(self):
+        """
+        @rtype: str
+        """
+        return 'ProxyUpdate(epoch=%r,version=%r,full=%r,jobs=%r,removed=%r)' % (
+               self.epoch,
+               self.version,
+               self.full,
+               self.jobs,
+               self.removed)
+
+    def to_dict(self):
+        """
+        @rtype: dict
+        """
+        return {'epoch': self.epoch,
+                'version': self.version,
+                'full': self.full,
+                'jobs': [{'name': job.name, 'status': job.status} for job in self.jobs],
+                'removed': self.removed}
+
+    @staticmethod
+    def from_dict(values):
+        """
+        @type values: dict
+        @rtype: trayjenkins.proxy.ProxyUpdate
+        """
+        return ProxyUpdate(values['epoch'],
+                           values['version'],
+                           values['full'],
+                           [Job(job['name'], job['status']) for job in values['jobs']],
+                           values['removed'])
+
+
+class JobsChangeLog(object):
+
+    def __init__(self, max_deltas=1000, epoch=None):
+        """
+        Keeps the current job list plus the most recent deltas, so that a
+        client which is not too far behind is sent only what changed.
+        @type max_deltas: int
+        @type epoch: str
+        """
+        self._condition = threading.Condition()
+        self._epoch = epoch or '%x' % int(time.time() * 1000)
+        self._version = 0
+        self._jobs = OrderedDict()
+        self._deltas = deque(maxlen=max_deltas)
+
+    def record(self, delta):
+        """
+        @type delta: trayjenkins.jobs.JobsDelta
+        """
+        with self._condition:
+            for name in delta.removed:
+                self._jobs.pop(name, None)
+            for model in delta.changed:
+                self._jobs[model.job.name] = model.job
+            self._version += 1
+            self._deltas.append((self._version, delta))
+            self._condition.notify_all()
+
+    def changes_since(self, epoch, version, wait=0):
+        """
+        Waits up to wait seconds for there to be something newer than
+        version, then returns whatever there is.
+        @type epoch: str
+        @type version: int
+        @type wait: float
+        @rtype: trayjenkins.proxy.ProxyUpdate
+        """
+        deadline = time.time() + wait
+        with self._condition:
+            remaining = wait
+            while epoch == self._epoch and version == self._version and remaining > 0:
+                self._condition.wait(remaining)
+                remaining = deadline - time.time()
+
+            if epoch == self._epoch and version == self._version:
+                result = ProxyUpdate(self._epoch, self._version, False, [], [])
+            elif self._can_send_deltas(epoch, version):
+                result = self._deltas_since(version)
+            else:
+                result = ProxyUpdate(self._epoch, self._version, True, self._jobs.values(), [])
+
+        return result
+
+    def _can_send_deltas(self, epoch, version):
+
+        return epoch == self._epoch \
+           and 0 < version < self._version \
+           and len(self._deltas) > 0 \
+           and self._deltas[0][0] <= version + 1
+
+    def _deltas_since(self, version):
+
+        changed = OrderedDict()
+        removed = set()
+        for delta_version, delta in self._deltas:
+            if delta_version > version:
+                for name in delta.removed:
+                    changed.pop(name, None)
+                    removed.add(name)
+                for model in delta.changed:
+                    changed[model.job.name] = model.job
+                    removed.discard(model.job.name)
+
+        return ProxyUpdate(self._epoch, self._version, False, changed.values(), sorted(removed))
+
+
+class StreamErrorLogger(IErrorLogger):
+
+    def __init__(self, stream=sys.stderr):
+        """
+        @type stream: file
+        """
+        self._stream = stream
+
+    def log_error(self, error):
+        """
+        @type error: str
+        """
+        self._stream.write('%s %s\n' % (time.strftime('%Y-%m-%d %H:%M:%S'), error))
+
+
+class ProxyRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        url = urlparse(self.path)
+        if url.path == '/jobs':
+            query = parse_qs(url.query)
+            epoch = query.get('epoch', [''])[0]
+            try:
+                version = int(query.get('since', ['0'])[0])
+                wait = min(float(query.get('wait', ['0'])[0]), self.server.max_wait)
+                if not wait >= 0:
+                    raise ValueError('wait must not be negative: %r' % wait)
+            except ValueError:
+                self.send_error(400, 'since must be a whole number and wait a number of seconds')
+            else:
+                update = self.server.change_log.changes_since(epoch, version, wait)
+                self._send_json(200, update.to_dict())
+        elif url.path == '/metrics':
+            self._send_json(200, self.server.metrics.snapshot())
+        elif url.path == '/':
+            self.send_response(302)
+            self.send_header('Location', self.server.jenkins_url)
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'job' or parts[2] not in ('enable', 'disable'):
+            self.send_error(404)
+        elif not self.server.allow_control:
+            self.send_error(403)
+        else:
+            job_name = urllib.unquote(parts[1])
+            self._send_json(200, {'ok': self.server.control(job_name, parts[2])})
+
+    def log_message(self, format, *args):  # @ReservedAssignment
+        pass
+
+    def _send_json(self, code, values):
+
+        body = json.dumps(values)
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ProxyServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self,
+                 address,
+                 change_log,
+                 control,
+                 jenkins_url,
+                 allow_control=False,
+                 max_wait=60,
+                 metrics=NULL_METRICS):
+        """
+        @type address: (str, int)
+        @type change_log: trayjenkins.proxy.JobsChangeLog
+        @param control: Called as control(job_name, 'enable'|'disable'), returns bool
+        @type control: callable
+        @type jenkins_url: str
+        @type allow_control: bool
+        @param max_wait: Longest a client may hold a long poll open, in seconds
+        @type max_wait: float
+        @param metrics: Served as JSON from /metrics
+        @type metrics: trayjenkins.metrics.IMetrics
+        """
+        HTTPServer.__init__(self, address, ProxyRequestHandler)
+        self.change_log = change_log
+        self.control = control
+        self.jenkins_url = jenkins_url
+        self.allow_control = allow_control
+        self.max_wait = max_wait
+        self.metrics = metrics
+
+
+class ProxyService(object):
+
+    def __init__(self,
+                 jenkins,
+                 jenkins_url,
+                 address=('', 8099),
+                 interval=15,
+                 allow_control=False,
+                 error_logger=StreamErrorLogger(),
+                 notify_port=None,
+                 metrics=NULL_METRICS):
+        """
+        Polls Jenkins once every interval seconds and serves the changes to
+        any number of tray clients. If notify_port is given, Jenkins build
+        notifications received on it are applied straight away.
+        @type jenkins: pyjenkins.jenkins.Jenkins
+        @type jenkins_url: str
+        @type address: (str, int)
+        @type interval: float
+        @type allow_control: bool
+        @type error_logger: trayjenkins.jobs.IErrorLogger
+        @type notify_port: int
+        @type metrics: trayjenkins.metrics.IMetrics
+        """
+        self._jenkins = jenkins
+        self._metrics = metrics
+        self._interval = interval
+        self._error_logger = error_logger
+        self._jenkins_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+        self.change_log = JobsChangeLog()
+        self._model = Model(jenkins, error_logger, metrics=metrics)
+        self._model.jobs_delta_event().register(self.change_log.record)
+        self._model.server_unreachable_event().register(self._on_server_unreachable)
+        self._server = ProxyServer(address,
+                                   self.change_log,
+                                   self._control,
+                                   jenkins_url,
+                                   allow_control,
+                                   metrics=metrics)
+        self._poller = threading.Thread(target=self._poll_loop, name='jenkins-poller')
+        self._poller.daemon = True
+        if notify_port is None:
+            self._listener = None
+        else:
+            from trayjenkins.notify import NotificationListener
+            self._listener = NotificationListener((address[0], notify_port), self._apply_notifications)
+
+    def address(self):
+        """
+        @rtype: (str, int)
+        """
+        return self._server.server_address
+
+    def serve_forever(self):
+
+        self._poller.start()
+        if self._listener is not None:
+            self._listener.start()
+        self._server.serve_forever()
+
+    def shutdown(self):
+
+        if self._listener is not None:
+            self._listener.stop()
+        self._stopping.set()
+        self._wake.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def poll(self):
+        """
+        Polls Jenkins now, on the calling thread.
+        """
+        try:
+            with self._jenkins_lock:
+                self._model.update_jobs()
+        except Exception as error:
+            self._error_logger.log_error('Failed to list jobs: %s' % error)
+
+    def _on_server_unreachable(self, reason):
+
+        self._error_logger.log_error('Jenkins is reachable again' if reason is None else reason)
+
+    def _poll_loop(self):
+
+        while not self._stopping.is_set():
+            self.poll()
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def _apply_notifications(self):
+
+        with self._jenkins_lock:
+            self._listener.apply_pending(self._model)
+
+    def _control(self, job_name, action):
+
+        with self._jenkins_lock:
+            if action == 'enable':
+                result = self._jenkins.enable_job(job_name)
+            else:
+                result = self._jenkins.disable_job(job_name)
+        self._wake.set()
+
+        return bool(result)
+
+
+class ProxyJenkins(object):
+
+    def __init__(self, proxy_url, timeout=10, urlopen=urllib2.urlopen, metrics=NULL_METRICS, wait=0):
+        """
+        Stands in for pyjenkins.jenkins.Jenkins, fetching only the changes
+        since the last call from a trayjenkins proxy rather than the whole
+        job list from Jenkins.
+        @type proxy_url: str
+        @type timeout: float
+        @type urlopen: callable
+        @type metrics: trayjenkins.metrics.IMetrics
+        @param wait: How long the proxy may hold list_jobs open waiting for
+        a change, in seconds, so that changes are pushed as they happen
+        rather than seen at the next poll; the proxy caps it with max_wait
+        @type wait: float
+        """
+        self._url = proxy_url.rstrip('/')
+        self._metrics = metrics
+        self._timeout = timeout
+        self._wait = wait
+        self._urlopen = urlopen
+        self._epoch = ''
+        self._version = 0
+        self._jobs = OrderedDict()
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        query = urllib.urlencode({'epoch': self._epoch, 'since': self._version, 'wait': self._wait})
+        body = self._urlopen(self._url + '/jobs?' + query, None, self._timeout + self._wait).read()
+        self._metrics.count('bytes_fetched', len(body))
+        with self._metrics.timer('parse'):
+            update = ProxyUpdate.from_dict(json.loads(body))
+
+        if update.full:
+            self._jobs.clear()
+        for name in update.removed:
+            self._jobs.pop(name, None)
+        for job in update.jobs:
+            self._jobs[job.name] = job
+        self._epoch = update.epoch
+        self._version = update.version
+
+        return self._jobs.values()
+
+    def enable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._control(job_name, 'enable')
+
+    def disable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._control(job_name, 'disable')
+
+    def _control(self, job_name, action):
+
+        url = '%s/job/%s/%s' % (self._url, urllib.quote(job_name, safe=''), action)
+        try:
+            result = json.load(self._urlopen(url, '', self._timeout))['ok']
+        except urllib2.HTTPError:
+            result = False
+
+        return result
+
+
+def main(args):
+
+    parser = ProxyCommandLineSettingsParser()
+    try:
+        settings = parser.parse_args(args)
+    except ConfigError as error:
+        sys.stderr.write('%s\n' % error)
+        return 1
+    if settings is None:
+        parser.print_help()
+        return 1
+
+    from pyjenkins.jenkins import JenkinsFactory
+    from pyjenkins.server import Server
+    from trayjenkins.resilience import ResilientJenkins, TokenBucket
+    socket.setdefaulttimeout(settings.jenkins.request_timeout)
+    server = Server(settings.jenkins.host, settings.jenkins.username, settings.jenkins.password)
+    metrics = Metrics()
+    if settings.jenkins.metrics_interval:
+        MetricsLogger(metrics).start(settings.jenkins.metrics_interval)
+    jenkins = ResilientJenkins(JenkinsFactory().create(server),
+                               bucket=TokenBucket(0.2, settings.jenkins.poll_burst),
+                               metrics=metrics)
+    if settings.jenkins.record_path is not None:
+        from trayjenkins.replay import RecordingJenkins, TraceWriter
+        jenkins = RecordingJenkins(jenkins, TraceWriter(settings.jenkins.record_path))
+    service = ProxyService(jenkins,
+                           settings.jenkins.host,
+                           address=('', settings.port),
+                           interval=settings.jenkins.poll_interval,
+                           allow_control=settings.allow_control,
+                           notify_port=settings.jenkins.notify_port,
+                           metrics=metrics)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        service.shutdown()
+
+    return 0
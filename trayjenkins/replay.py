@@ -0,0 +1,232 @@
+import gzip
+import json
+import time
+import zlib
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.errors import ServerUnreachableError
+
+
+TRACE_VERSION = 1
+
+_STATUS_CODES = {JobStatus.OK: 'o',
+                 JobStatus.FAILING: 'f',
+                 JobStatus.DISABLED: 'd',
+                 JobStatus.UNKNOWN: 'u'}
+_CODE_STATUSES = dict((code, status) for status, code in _STATUS_CODES.items())
+
+
+class TracePoll(object):
+
+    def __init__(self, seconds, jobs, error=None):
+        """
+        @param seconds: When the poll was made, from the start of the trace
+        @type seconds: float
+        @param jobs: None if the poll failed
+        @type jobs: [pyjenkins.job.Job]
+        @type error: str
+        """
+        self.seconds = seconds
+        self.jobs = jobs
+        self.error = error
+
+
+class TraceWriter(object):
+
+    def __init__(self, path, clock=time.time):
+        """
+        Writes polls as gzipped JSON lines. A poll with the same jobs in the
+        same order as the one before is written as just the jobs whose
+        status changed, so a trace of a quiet Jenkins is mostly timestamps.
+        Each poll is flushed as it is written, so a trace cut short by a
+        crash can still be read up to there.
+        @type path: str
+        @type clock: callable
+        """
+        self._file = gzip.open(path, 'wb')
+        self._clock = clock
+        self._start = None
+        self._names = None
+        self._statuses = None
+        self._write({'version': TRACE_VERSION})
+
+    def write_jobs(self, jobs):
+        """
+        @type jobs: [pyjenkins.job.Job]
+        """
+        names = [job.name for job in jobs]
+        statuses = [_STATUS_CODES.get(job.status, job.status) for job in jobs]
+        if names == self._names:
+            record = {'t': self._seconds(),
+                      'set': [[index, status] for index, (old, status) in enumerate(zip(self._statuses, statuses))
+                              if old != status]}
+        else:
+            record = {'t': self._seconds(), 'jobs': [list(pair) for pair in zip(names, statuses)]}
+        self._names = names
+        self._statuses = statuses
+        self._write(record)
+
+    def write_error(self, error):
+        """
+        @type error: str
+        """
+        self._write({'t': self._seconds(), 'error': error})
+
+    def close(self):
+
+        self._file.close()
+
+    def _seconds(self):
+
+        now = self._clock()
+        if self._start is None:
+            self._start = now
+        return round(now - self._start, 3)
+
+    def _write(self, record):
+
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush(zlib.Z_SYNC_FLUSH)
+
+
+def read_trace(path):
+    """
+    Reads a trace written by TraceWriter, up to where it ends if it was
+    never closed.
+    @rtype: [trayjenkins.replay.TracePoll]
+    """
+    result = []
+    names = []
+    statuses = []
+    with open(path, 'rb') as trace:
+        # zlib rather than gzip, which will not read a file without its trailer.
+        text = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(trace.read())
+    lines = text.split('\n')[:-1]
+    header = json.loads(lines[0]) if lines else {}
+    if header.get('version') != TRACE_VERSION:
+        raise ValueError('Unsupported trace version %r in %s' % (header.get('version'), path))
+    for line in lines[1:]:
+        record = json.loads(line)
+        if 'error' in record:
+            result.append(TracePoll(record['t'], None, record['error']))
+        else:
+            if 'jobs' in record:
+                names = [pair[0] for pair in record['jobs']]
+                statuses = [pair[1] for pair in record['jobs']]
+            else:
+                statuses = list(statuses)
+                for index, status in record['set']:
+                    statuses[index] = status
+            result.append(TracePoll(record['t'],
+                                    [Job(name, _CODE_STATUSES.get(status, status))
+                                     for name, status in zip(names, statuses)]))
+
+    return result
+
+
+class RecordingJenkins(object):
+
+    def __init__(self, jenkins, writer):
+        """
+        Passes everything through to the wrapped Jenkins, recording each
+        job list, and each poll that found Jenkins unreachable.
+        @type jenkins: pyjenkins.jenkins.Jenkins
+        @type writer: trayjenkins.replay.TraceWriter
+        """
+        self._jenkins = jenkins
+        self._writer = writer
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        try:
+            result = self._jenkins.list_jobs()
+        except ServerUnreachableError as error:
+            self._writer.write_error(str(error))
+            raise
+        self._writer.write_jobs(result)
+
+        return result
+
+    def get_job(self, job_name):
+        """
+        @return None if the wrapped Jenkins cannot fetch a single job
+        @rtype: pyjenkins.job.Job
+        """
+        return self._jenkins.get_job(job_name) if hasattr(self._jenkins, 'get_job') else None
+
+    def enable_job(self, job_name):
+
+        return self._jenkins.enable_job(job_name)
+
+    def disable_job(self, job_name):
+
+        return self._jenkins.disable_job(job_name)
+
+
+class ReplayJenkins(object):
+
+    def __init__(self, polls, real_time=False, clock=time.time, sleep=time.sleep):
+        """
+        Answers each list_jobs with the next recorded poll, raising
+        ServerUnreachableError for those that failed. Once the trace runs
+        out Jenkins stays as it was last seen. Jobs cannot be enabled or
+        disabled.
+        @type polls: [trayjenkins.replay.TracePoll]
+        @param real_time: Whether to wait until each poll is due, as timed
+        when it was recorded, rather than answer at once
+        @type real_time: bool
+        @type clock: callable
+        @type sleep: callable
+        """
+        self._polls = polls
+        self._real_time = real_time
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0
+        self._start = None
+        self._jobs = []
+
+    def finished(self):
+        """
+        @rtype: bool
+        """
+        return self._next >= len(self._polls)
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        if not self.finished():
+            poll = self._polls[self._next]
+            self._next += 1
+            self._wait_until(poll.seconds)
+            if poll.jobs is None:
+                raise ServerUnreachableError(poll.error)
+            self._jobs = poll.jobs
+
+        return self._jobs
+
+    def get_job(self, job_name):
+
+        jobs = [job for job in self._jobs if job.name == job_name]
+        return jobs[0] if jobs else None
+
+    def enable_job(self, job_name):
+
+        return False
+
+    def disable_job(self, job_name):
+
+        return False
+
+    def _wait_until(self, seconds):
+
+        if self._real_time:
+            now = self._clock()
+            if self._start is None:
+                self._start = now - seconds
+            delay = self._start + seconds - now
+            if delay > 0:
+                self._sleep(delay)
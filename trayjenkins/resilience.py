@@ -0,0 +1,234 @@
+import httplib
+import socket
+import threading
+import time
+import urllib2
+
+from trayjenkins.errors import ServerUnreachableError, ThrottledError  # @UnusedImport
+from trayjenkins.metrics import NULL_METRICS
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, capacity, clock=time.time):
+        """
+        @param rate: Tokens added per second
+        @type rate: float
+        @param capacity: Most tokens held, i.e. the largest burst allowed
+        @type capacity: int
+        @type clock: callable
+        """
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._clock = clock
+        self._tokens = self._capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        @return Whether a token was taken
+        @rtype: bool
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            result = self._tokens >= 1
+            if result:
+                self._tokens -= 1
+
+        return result
+
+
+class CircuitBreaker(object):
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half open'
+
+    def __init__(self, failure_threshold=3, reset_seconds=15, max_reset_seconds=600, clock=time.time):
+        """
+        Opens after failure_threshold failures in a row, and then lets a
+        single probe through once reset_seconds have passed. Each probe
+        that fails doubles the time until the next, up to
+        max_reset_seconds. Safe to share between threads.
+        @type failure_threshold: int
+        @type reset_seconds: float
+        @type max_reset_seconds: float
+        @type clock: callable
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._max_reset_seconds = max_reset_seconds
+        self._clock = clock
+        self.state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._retry_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        @return Whether a request may be made now
+        @rtype: bool
+        """
+        with self._lock:
+            if self.state == CircuitBreaker.OPEN and self._clock() >= self._retry_at:
+                self.state = CircuitBreaker.HALF_OPEN
+                result = True
+            else:
+                result = self.state == CircuitBreaker.CLOSED
+
+        return result
+
+    def retry_in(self):
+        """
+        @return Seconds until a probe will be let through
+        @rtype: float
+        """
+        with self._lock:
+            return max(0, self._retry_at - self._clock()) if self.state == CircuitBreaker.OPEN else 0
+
+    def record_success(self):
+
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self._failures = 0
+            self._trips = 0
+
+    def record_failure(self):
+
+        with self._lock:
+            self._failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self._failures >= self._failure_threshold:
+                self._trips += 1
+                delay = min(self._max_reset_seconds, self._reset_seconds * 2 ** (self._trips - 1))
+                self._retry_at = self._clock() + delay
+                self.state = CircuitBreaker.OPEN
+
+
+class ResilientJenkins(object):
+
+    def __init__(self,
+                 jenkins,
+                 bucket=None,
+                 breaker=None,
+                 metrics=NULL_METRICS):
+        """
+        Wraps pyjenkins.jenkins.Jenkins, or anything that stands in for it,
+        so that an overloaded or missing Jenkins is not asked again until
+        it is likely to answer. Connection failures, timeouts and server
+        errors raise ServerUnreachableError; polls beyond the rate limit
+        raise ThrottledError without contacting Jenkins.
+        @type jenkins: pyjenkins.jenkins.Jenkins
+        @param bucket: Limits polls, by default to bursts of 3 and one
+        every 5 seconds after that
+        @type bucket: trayjenkins.resilience.TokenBucket
+        @type breaker: trayjenkins.resilience.CircuitBreaker
+        @type metrics: trayjenkins.metrics.IMetrics
+        """
+        self._jenkins = jenkins
+        self._bucket = TokenBucket(0.2, 3) if bucket is None else bucket
+        self._breaker = CircuitBreaker() if breaker is None else breaker
+        self._metrics = metrics
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        if not self._bucket.try_acquire():
+            self._metrics.count('throttled')
+            raise ThrottledError('Too many requests to Jenkins')
+        return self._call(self._jenkins.list_jobs)
+
+    def get_job(self, job_name):
+        """
+        @return None if the wrapped Jenkins cannot fetch a single job
+        @rtype: pyjenkins.job.Job
+        """
+        if hasattr(self._jenkins, 'get_job'):
+            result = self._call(self._jenkins.get_job, job_name)
+        else:
+            result = None
+
+        return result
+
+    def building_jobs(self):
+        """
+        @return Names of the jobs building at the last poll, or none if the
+        wrapped Jenkins cannot tell
+        @rtype: set
+        """
+        return self._jenkins.building_jobs() if hasattr(self._jenkins, 'building_jobs') else frozenset()
+
+    def build_progress(self, job_name):
+        """
+        @return None if the job is not building, or the wrapped Jenkins
+        cannot tell
+        @rtype: trayjenkins.progress.BuildProgress
+        """
+        if hasattr(self._jenkins, 'build_progress'):
+            result = self._call(self._jenkins.build_progress, job_name)
+        else:
+            result = None
+
+        return result
+
+    def job_upstreams(self):
+        """
+        @return Upstream job names by job name, or None if the wrapped
+        Jenkins cannot tell
+        @rtype: dict
+        """
+        if hasattr(self._jenkins, 'job_upstreams'):
+            result = self._call(self._jenkins.job_upstreams)
+        else:
+            result = None
+
+        return result
+
+    def enable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._call(self._jenkins.enable_job, job_name)
+
+    def disable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._call(self._jenkins.disable_job, job_name)
+
+    def _call(self, method, *args):
+        """
+        Every call allowed through settles the breaker one way or the
+        other, so that a half open breaker never waits on a probe that
+        failed in some unexpected way. Such failures are raised as they
+        are.
+        """
+        if not self._breaker.allow():
+            self._metrics.count('circuit_open')
+            raise ServerUnreachableError('Jenkins unreachable, trying again in %ds' % self._breaker.retry_in())
+        try:
+            result = method(*args)
+        except urllib2.HTTPError as error:
+            if error.code < 500:
+                self._breaker.record_success()
+                raise
+            self._failed(error)
+        except (IOError, socket.error, httplib.HTTPException) as error:
+            self._failed(error)
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
+
+        return result
+
+    def _failed(self, error):
+
+        self._breaker.record_failure()
+        raise ServerUnreachableError('Jenkins unreachable: %s' % (error,))
@@ -0,0 +1,211 @@
+from trayjenkins.event import Event
+from trayjenkins.metrics import NULL_METRICS
+
+
+# Length of the substrings of a name kept in the index. Longer queries
+# are answered from their substrings of this length.
+_GRAM = 3
+
+
+def _trigrams(text):
+    """
+    @rtype: set
+    """
+    return set(text[index:index + _GRAM] for index in range(len(text) - _GRAM + 1))
+
+
+def _short_keys(trigram):
+    """
+    @return The one and two character substrings of a trigram
+    @rtype: set
+    """
+    return set(trigram[index:index + length]
+               for length in (1, 2)
+               for index in range(_GRAM - length + 1))
+
+
+class TrigramIndex(object):
+
+    def __init__(self):
+        """
+        Finds the names containing a string, ignoring case, without
+        looking at every name. Names are added and removed one at a time.
+
+        Only trigrams are posted. A query of one or two characters is
+        answered from the trigrams that contain it, which are looked up in
+        a map whose size depends on the trigrams in use, not on the number
+        of names. The few names shorter than a trigram are scanned.
+        """
+        self._lowered = {}
+        self._postings = {}
+        self._trigrams_by_short_key = {}
+        self._short_names = set()
+
+    def __len__(self):
+        return len(self._lowered)
+
+    def __contains__(self, name):
+        return name in self._lowered
+
+    def add(self, name):
+        """
+        @type name: str
+        """
+        if name not in self._lowered:
+            lowered = name.lower()
+            self._lowered[name] = lowered
+            if len(lowered) < _GRAM:
+                self._short_names.add(name)
+            for trigram in _trigrams(lowered):
+                names = self._postings.get(trigram)
+                if names is None:
+                    names = self._postings[trigram] = set()
+                    for key in _short_keys(trigram):
+                        self._trigrams_by_short_key.setdefault(key, set()).add(trigram)
+                names.add(name)
+
+    def remove(self, name):
+        """
+        @type name: str
+        """
+        lowered = self._lowered.pop(name, None)
+        if lowered is not None:
+            self._short_names.discard(name)
+            for trigram in _trigrams(lowered):
+                names = self._postings[trigram]
+                names.discard(name)
+                if not names:
+                    del self._postings[trigram]
+                    for key in _short_keys(trigram):
+                        trigrams = self._trigrams_by_short_key[key]
+                        trigrams.discard(trigram)
+                        if not trigrams:
+                            del self._trigrams_by_short_key[key]
+
+    def search(self, text):
+        """
+        @return Names containing text, or all names if text is empty
+        @type text: str
+        @rtype: set
+        """
+        query = text.lower()
+        if not query:
+            result = set(self._lowered)
+        elif len(query) < _GRAM:
+            result = self._search_short(query)
+        else:
+            result = self._search_trigrams(query)
+
+        return result
+
+    def _search_short(self, query):
+
+        result = set(name for name in self._short_names if query in self._lowered[name])
+        for trigram in self._trigrams_by_short_key.get(query, ()):
+            result.update(self._postings[trigram])
+
+        return result
+
+    def _search_trigrams(self, query):
+
+        postings = [self._postings.get(query[index:index + _GRAM], set())
+                    for index in range(len(query) - _GRAM + 1)]
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        result = set(name for name in candidates if query in self._lowered[name])
+
+        return result
+
+
+class ISearchView(object):
+
+    def query_changed_event(self):
+        """
+        Listeners receive Event.fire(query:str)
+        @rtype: trayjenkins.event.IEvent
+        """
+
+    def set_matches(self, job_names):
+        """
+        @param job_names: Jobs to show, or None to show them all
+        @type job_names: set
+        """
+
+
+class JobSearch(object):
+
+    def __init__(self, jobs_model, index=None, matches_changed_event=None, metrics=NULL_METRICS):
+        """
+        Keeps an index of the job names up to date from the jobs model's
+        deltas, and the matches for the current query with it. Made before
+        the first poll, so that every job is indexed as it is first listed.
+        @type jobs_model: trayjenkins.jobs.IModel
+        @type index: trayjenkins.search.TrigramIndex
+        @type matches_changed_event: trayjenkins.event.IEvent
+        @type metrics: trayjenkins.metrics.IMetrics
+        """
+        self._index = TrigramIndex() if index is None else index
+        self._matches_changed_event = Event() if matches_changed_event is None else matches_changed_event
+        self._metrics = metrics
+        self._query = ''
+        self._matches = None
+
+        jobs_model.jobs_delta_event().register(self._on_jobs_delta)
+
+    def matches_changed_event(self):
+        """
+        Listeners receive Event.fire(job_names:set), with job_names None
+        when there is no query.
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._matches_changed_event
+
+    def matches(self):
+        """
+        @return Names of the jobs matching the query, or None if there is
+        no query
+        @rtype: set
+        """
+        return self._matches
+
+    def search(self, query):
+        """
+        @type query: str
+        """
+        self._query = query
+        self._update_matches()
+
+    def _on_jobs_delta(self, delta):
+
+        added = False
+        for model in delta.changed:
+            if model.job.name not in self._index:
+                self._index.add(model.job.name)
+                added = True
+        for name in delta.removed:
+            self._index.remove(name)
+        if self._query and (added or delta.removed):
+            self._update_matches()
+
+    def _update_matches(self):
+
+        with self._metrics.timer('search'):
+            matches = self._index.search(self._query) if self._query else None
+        if matches != self._matches:
+            self._matches = matches
+            self._matches_changed_event.fire(matches)
+
+
+class SearchPresenter(object):
+
+    def __init__(self, search, view):
+        """
+        @type search: trayjenkins.search.JobSearch
+        @type view: trayjenkins.search.ISearchView
+        """
+        self._search = search
+        self._view = view
+        view.query_changed_event().register(search.search)
+        search.matches_changed_event().register(view.set_matches)
+        if search.matches() is not None:
+            view.set_matches(search.matches())
@@ -1,51 +1,295 @@
+import os
 from optparse import OptionParser
 
+from trayjenkins.config import ConfigError, ConfigFile, DEFAULT_CONFIG_PATH, ENVIRONMENT_PREFIX, \
+    environment_values, to_bool, to_patterns, to_views
 
-class Settings(object):
 
-    def __init__(self, host, username='', password=''):
+# Seconds to wait for Jenkins to answer any one request.
+REQUEST_TIMEOUT = 10
+
 
+class Settings(object):
+
+    def __init__(self,
+                 host,
+                 username='',
+                 password='',
+                 notify_port=None,
+                 metrics_interval=None,
+                 history_dir=None,
+                 tree=False,
+                 stream=False,
+                 poll_interval=15,
+                 request_timeout=REQUEST_TIMEOUT,
+                 poll_burst=3,
+                 ignore_patterns=(),
+                 record_path=None,
+                 views=()):
+        """
+        @param notify_port: Local port to listen on for Jenkins build
+        notifications, or None to rely on polling alone
+        @type notify_port: int
+        @param metrics_interval: Seconds between logging timings and
+        counters, or None to not collect them; 0 in any layer means None
+        @type metrics_interval: int
+        @param history_dir: Where to record job status history, or None
+        to not record it
+        @type history_dir: str
+        @param tree: Whether to show folders as a tree, fetched as they are
+        expanded, rather than a flat list of jobs
+        @type tree: bool
+        @param stream: Whether to parse the job list as it arrives rather
+        than all at once
+        @type stream: bool
+        @param poll_interval: Seconds between polls of Jenkins
+        @type poll_interval: int
+        @param request_timeout: Seconds to wait for any one request
+        @type request_timeout: int
+        @param poll_burst: Most polls made in quick succession, e.g. by
+        refreshing, before they are limited to one every 5 seconds
+        @type poll_burst: int
+        @param ignore_patterns: Shell style patterns of job names to ignore
+        @type ignore_patterns: (str)
+        @param record_path: File to record each poll of Jenkins in, for
+        replaying later, or None to not record them
+        @type record_path: str
+        @param views: (name, patterns) of each group of jobs to show the
+        status of separately, with its own tray icon
+        @type views: ((str, (str)))
+        """
         self.host = host
         self.username = username
         self.password = password
+        self.notify_port = notify_port
+        self.metrics_interval = metrics_interval
+        self.history_dir = history_dir
+        self.tree = tree
+        self.stream = stream
+        self.poll_interval = poll_interval
+        self.request_timeout = request_timeout
+        self.poll_burst = poll_burst
+        self.ignore_patterns = tuple(ignore_patterns)
+        self.record_path = record_path
+        self.views = tuple(views)
 
     def __eq__(self, other):
 
         return other is not None \
            and self.host == other.host \
            and self.username == other.username \
-           and self.password == other.password
+           and self.password == other.password \
+           and self.notify_port == other.notify_port \
+           and self.metrics_interval == other.metrics_interval \
+           and self.history_dir == other.history_dir \
+           and self.tree == other.tree \
+           and self.stream == other.stream \
+           and self.poll_interval == other.poll_interval \
+           and self.request_timeout == other.request_timeout \
+           and self.poll_burst == other.poll_burst \
+           and self.ignore_patterns == other.ignore_patterns \
+           and self.record_path == other.record_path \
+           and self.views == other.views
+
+    def __ne__(self, other):
+
+        return not self == other
 
     def __repr__(self):
 
-        return "Settings(host='%s',username='%s',password='%s')" % (
+        return "Settings(host='%s',username='%s',password='%s',notify_port=%r,metrics_interval=%r,history_dir=%r,tree=%r,stream=%r," \
+               "poll_interval=%r,request_timeout=%r,poll_burst=%r,ignore_patterns=%r,record_path=%r,views=%r)" % (
                self.host,
                self.username,
-               self.password)
+               self.password,
+               self.notify_port,
+               self.metrics_interval,
+               self.history_dir,
+               self.tree,
+               self.stream,
+               self.poll_interval,
+               self.request_timeout,
+               self.poll_burst,
+               self.ignore_patterns,
+               self.record_path,
+               self.views)
 
 
-class CommandLineSettingsParser(object):
+# Each setting that may come from the config file or the environment, and
+# how to read it from text.
+SETTING_OPTIONS = [('host', str),
+                   ('username', str),
+                   ('password', str),
+                   ('notify_port', int),
+                   ('metrics_interval', int),
+                   ('history_dir', os.path.expanduser),
+                   ('tree', to_bool),
+                   ('stream', to_bool),
+                   ('poll_interval', int),
+                   ('request_timeout', int),
+                   ('poll_burst', int),
+                   ('ignore_patterns', to_patterns),
+                   ('record_path', os.path.expanduser),
+                   ('views', to_views)]
+
+# Settings that are a number of seconds, a count or a port, and so must
+# be more than 0 whichever layer they come from.
+POSITIVE_SETTINGS = ['notify_port', 'poll_interval', 'request_timeout', 'poll_burst']
+
+
+class LayeredSettings(object):
 
-    def __init__(self):
+    def __init__(self, command_line, environ, config_file, profile=None):
+        """
+        Settings from the config file, overridden by TRAYJENKINS_ variables
+        in the environment, overridden by the command line.
+        @param command_line: Values given on the command line, None where
+        an option was not given
+        @type command_line: dict
+        @type environ: dict
+        @type config_file: trayjenkins.config.ConfigFile
+        @param profile: Profile section to read from the file as well
+        @type profile: str
+        """
+        self._command_line = command_line
+        self._environ = environ
+        self.config_file = config_file
+        self.profile = profile
 
-        self._parser = OptionParser(usage='usage: %prog [options] host')
+    def settings(self):
+        """
+        @return None if no layer gives a host
+        @raise ConfigError: If a value cannot be read, or is out of range
+        @rtype: trayjenkins.settings.Settings
+        """
+        values = {}
+        for layer in [self.config_file.values(self.profile), environment_values(self._environ)]:
+            for name, convert in SETTING_OPTIONS:
+                if name in layer:
+                    try:
+                        values[name] = convert(layer[name])
+                    except ValueError as error:
+                        raise ConfigError("Bad value for %s: %s" % (name, error))
+        values.update((name, value) for name, value in self._command_line.items() if value is not None)
+        for name in POSITIVE_SETTINGS:
+            if name in values and values[name] <= 0:
+                raise ConfigError("Bad value for %s: must be more than 0, not %d" % (name, values[name]))
+        if values.get('metrics_interval', None) == 0:
+            values['metrics_interval'] = None
+        elif values.get('metrics_interval', 0) < 0:
+            raise ConfigError("Bad value for metrics_interval: must be 0 or more, not %d" % values['metrics_interval'])
+        host = values.pop('host', None)
+        result = Settings(host, **values) if host else None
+
+        return result
+
+
+class CommandLineSettingsParser(object):
+
+    def __init__(self, environ=os.environ):
+        """
+        @type environ: dict
+        """
+        self._environ = environ
+        self.layers = None
+        self._parser = OptionParser(usage='usage: %prog [options] [host]')
         self._parser.add_option('-p', '--password',
                                 dest='password',
-                                default='',
+                                default=None,
                                 help='password for remote host')
         self._parser.add_option('-u', '--username',
                                 dest='username',
-                                default='',
+                                default=None,
                                 help='username for remote host')
+        self._parser.add_option('-n', '--notify-port',
+                                dest='notify_port',
+                                type='int',
+                                default=None,
+                                help='listen on this port for Jenkins build notifications')
+        self._parser.add_option('-m', '--metrics',
+                                dest='metrics_interval',
+                                type='int',
+                                default=None,
+                                help='log poll and update timings every METRICS_INTERVAL seconds')
+        self._parser.add_option('--history',
+                                dest='history_dir',
+                                default=None,
+                                help='record job status history in this directory')
+        self._parser.add_option('--tree',
+                                dest='tree',
+                                action='store_true',
+                                default=None,
+                                help='show folders as a tree, fetching each folder when expanded')
+        self._parser.add_option('--stream',
+                                dest='stream',
+                                action='store_true',
+                                default=None,
+                                help='parse the job list as it arrives, for very large job lists')
+        self._parser.add_option('--poll-interval',
+                                dest='poll_interval',
+                                type='int',
+                                default=None,
+                                help='seconds between polls of the remote host [default: 15]')
+        self._parser.add_option('--timeout',
+                                dest='request_timeout',
+                                type='int',
+                                default=None,
+                                help='seconds to wait for the remote host to answer [default: %d]' % REQUEST_TIMEOUT)
+        self._parser.add_option('--burst',
+                                dest='poll_burst',
+                                type='int',
+                                default=None,
+                                help='polls allowed in quick succession [default: 3]')
+        self._parser.add_option('--ignore',
+                                dest='ignore_patterns',
+                                type='string',
+                                default=None,
+                                help='ignore jobs matching these comma separated patterns, e.g. "*-nightly,sandbox-*"')
+        self._parser.add_option('--record',
+                                dest='record_path',
+                                default=None,
+                                help='record each poll in this file, to replay with replay:FILE as the host')
+        self._parser.add_option('--views',
+                                dest='views',
+                                type='string',
+                                default=None,
+                                help='also show these groups of jobs in tray icons of their own, '
+                                     'e.g. "team=team-*,lib-*;release=release-*"')
+        self._parser.add_option('-c', '--config',
+                                dest='config',
+                                default=None,
+                                help='read settings from this file [default: %s]' % DEFAULT_CONFIG_PATH)
+        self._parser.add_option('--profile',
+                                dest='profile',
+                                default=None,
+                                help='also read the [profile PROFILE] section of the config file')
 
     def parse_args(self, args):
+        """
+        @raise ConfigError: If the config file cannot be read
+        @rtype: trayjenkins.settings.Settings
+        """
+        (options, args) = self._parser.parse_args(args)
+
+        return self._settings(options, args)
 
-        (options, args) = self._parser.parse_args(args)  # @UnusedVariable
+    def _settings(self, options, args):
 
-        if len(args) is 1:
-            result = Settings(args[0])
-            result.username = options.username
-            result.password = options.password
+        if len(args) <= 1:
+            command_line = dict((name, getattr(options, name)) for name, convert in SETTING_OPTIONS  # @UnusedVariable
+                                if hasattr(options, name))
+            command_line['host'] = args[0] if args else None
+            if options.ignore_patterns is not None:
+                command_line['ignore_patterns'] = to_patterns(options.ignore_patterns)
+            if options.views is not None:
+                try:
+                    command_line['views'] = to_views(options.views)
+                except ValueError as error:
+                    raise ConfigError("Bad value for views: %s" % error)
+            path = options.config or self._environ.get(ENVIRONMENT_PREFIX + 'CONFIG', DEFAULT_CONFIG_PATH)
+            profile = options.profile or self._environ.get(ENVIRONMENT_PREFIX + 'PROFILE', None)
+            self.layers = LayeredSettings(command_line, self._environ, ConfigFile(path), profile)
+            result = self.layers.settings()
         else:
             result = None
 
@@ -54,3 +298,65 @@ class CommandLineSettingsParser(object):
     def print_help(self):
 
         self._parser.print_help()
+
+
+class ProxySettings(object):
+
+    def __init__(self, jenkins, port=8099, allow_control=False):
+        """
+        @param jenkins: How to reach Jenkins and how often to poll it
+        @type jenkins: trayjenkins.settings.Settings
+        @param port: Port the proxy listens on for tray clients
+        @type port: int
+        @param allow_control: Whether clients may enable and disable jobs
+        using the proxy's credentials
+        @type allow_control: bool
+        """
+        self.jenkins = jenkins
+        self.port = port
+        self.allow_control = allow_control
+
+    def __eq__(self, other):
+
+        return other is not None \
+           and self.jenkins == other.jenkins \
+           and self.port == other.port \
+           and self.allow_control == other.allow_control
+
+    def __repr__(self):
+
+        return "ProxySettings(jenkins=%r,port=%d,allow_control=%r)" % (
+               self.jenkins,
+               self.port,
+               self.allow_control)
+
+
+class ProxyCommandLineSettingsParser(CommandLineSettingsParser):
+
+    def __init__(self, environ=os.environ):
+
+        CommandLineSettingsParser.__init__(self, environ)
+        self._parser.add_option('--port',
+                                dest='port',
+                                type='int',
+                                default=8099,
+                                help='port to serve tray clients on [default: %default]')
+        self._parser.add_option('--allow-control',
+                                dest='allow_control',
+                                action='store_true',
+                                default=False,
+                                help='let clients enable and disable jobs with these credentials')
+
+    def _settings(self, options, args):
+
+        jenkins = CommandLineSettingsParser._settings(self, options, args)
+        if options.port <= 0:
+            raise ConfigError("Bad value for port: must be more than 0, not %d" % options.port)
+        if jenkins is not None:
+            result = ProxySettings(jenkins,
+                                   port=options.port,
+                                   allow_control=options.allow_control)
+        else:
+            result = None
+
+        return result
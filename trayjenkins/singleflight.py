@@ -0,0 +1,143 @@
+import threading
+import traceback
+from collections import deque
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time. A call made while another
+    with the same key is in flight on another thread waits for it and
+    shares its result, or its exception, rather than being made again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, function, *args):
+        """
+        A call made again on the thread already making it, e.g. from a
+        nested event loop, returns None at once rather than waiting for
+        itself.
+        @param key: Identifies identical calls
+        @type key: hashable
+        @type function: callable
+        @return What function(*args) returned
+        """
+        with self._lock:
+            flight = self._flights.get(key, None)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            elif flight.thread is not threading.current_thread():
+                flight.followers += 1
+
+        if leader:
+            try:
+                flight.result = function(*args)
+            except Exception as error:
+                flight.error = error
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            result = flight.result
+        elif flight.thread is threading.current_thread():
+            result = None
+        else:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            result = flight.result
+
+        return result
+
+    def in_flight(self, key):
+        """
+        @rtype: bool
+        """
+        with self._lock:
+            return key in self._flights
+
+    def followers(self, key):
+        """
+        @return Calls waiting on the one in flight for key
+        @rtype: int
+        """
+        with self._lock:
+            flight = self._flights.get(key, None)
+            return 0 if flight is None else flight.followers
+
+
+class SerialWorker(object):
+    """
+    Runs calls one at a time, in order, on a single thread started when
+    first needed. A call submitted while an equal one is still waiting
+    is dropped, so that asking again while one is in flight queues at
+    most one more.
+    """
+
+    def __init__(self, name):
+        """
+        @param name: Name of the worker thread
+        @type name: str
+        """
+        self._name = name
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._queue = deque()
+        self._running = False
+        self._thread = None
+
+    def submit(self, function, *args):
+        """
+        @type function: callable
+        @return Whether the call was queued, rather than dropped as equal
+        to one waiting
+        @rtype: bool
+        """
+        call = (function, args)
+        with self._lock:
+            result = call not in self._queue
+            if result:
+                self._queue.append(call)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self._name)
+                    self._thread.daemon = True
+                    self._thread.start()
+                self._wake.notify()
+
+        return result
+
+    def busy(self):
+        """
+        @return Whether a call is running or waiting
+        @rtype: bool
+        """
+        with self._lock:
+            return self._running or bool(self._queue)
+
+    def _run(self):
+
+        while True:
+            with self._lock:
+                self._running = False
+                while not self._queue:
+                    self._wake.wait()
+                function, args = self._queue.popleft()
+                self._running = True
+            try:
+                function(*args)
+            except Exception:
+                traceback.print_exc()
@@ -1,7 +1,20 @@
+from collections import OrderedDict
+from itertools import islice
+
 from trayjenkins.event import Event
+from trayjenkins.jobs import JobsDelta
+from trayjenkins.metrics import NULL_METRICS
 from pyjenkins.job import JobStatus
 
 
+# Overall status while Jenkins is not answering, as distinct from
+# JobStatus.UNKNOWN before the first poll.
+UNREACHABLE = 'unreachable'
+
+# Failing jobs named in the status message; any more are only counted.
+MESSAGE_LIMIT = 10
+
+
 class IModel(object):
 
     def status_changed_event(self):
@@ -20,6 +33,17 @@ class IView(object):
         """
 
 
+class IBadgeView(object):
+
+    def set_badge(self, failing, building):
+        """
+        @param failing: Number of failing jobs, not counting ignored ones
+        @type failing: int
+        @param building: Whether any build is running
+        @type building: bool
+        """
+
+
 class IStatusReader(object):
 
     def status(self, jobs):
@@ -40,6 +64,31 @@ class IMessageComposer(object):
         """
 
 
+class IIncrementalMessageComposer(object):
+
+    def apply_delta(self, delta):
+        """
+        @type delta: trayjenkins.jobs.JobsDelta
+        """
+
+    def failing_count(self):
+        """
+        @return Failing jobs, not counting ignored ones
+        @rtype: int
+        """
+
+    def digest(self):
+        """
+        @return Small value that changes whenever message() would
+        """
+
+    def message(self):
+        """
+        @return Brief message describing the job statuses.
+        @rtype: str
+        """
+
+
 class Presenter(object):
 
     def __init__(self, model, view):
@@ -56,6 +105,35 @@ class Presenter(object):
         self._view.set_status(status, message)
 
 
+class BadgePresenter(object):
+
+    def __init__(self, model, view, progress_model=None):
+        """
+        @type model: trayjenkins.status.Model
+        @type view: trayjenkins.status.IBadgeView
+        @param progress_model: Tells whether anything is building, if given
+        @type progress_model: trayjenkins.progress.BuildProgressModel
+        """
+        self._view = view
+        self._failing = 0
+        self._building = False
+        model.failing_count_event().register(self._on_failing_count)
+        if progress_model is not None:
+            progress_model.progress_changed_event().register(self._on_progress_changed)
+
+    def _on_failing_count(self, failing):
+
+        self._failing = failing
+        self._view.set_badge(self._failing, self._building)
+
+    def _on_progress_changed(self, progress):
+
+        building = bool(progress)
+        if building != self._building:
+            self._building = building
+            self._view.set_badge(self._failing, self._building)
+
+
 class DefaultMessageComposer(IMessageComposer):
 
     def message(self, jobs):
@@ -78,6 +156,116 @@ class DefaultMessageComposer(IMessageComposer):
         return result
 
 
+class BoundedMessageComposer(IIncrementalMessageComposer):
+
+    def __init__(self, limit=MESSAGE_LIMIT, graph=None):
+        """
+        Names the most recently failed jobs, up to limit, and counts the
+        rest, e.g. 'FAILING:\nspam\neggs\n+40 more'. Kept up to date from
+        each poll's changes, so the cost follows what changed rather than
+        the number of jobs. Ignored jobs are left out.
+
+        Given the job graph, only root causes are named, each with how
+        many failing jobs downstream of it it explains, e.g.
+        'FAILING:\nspam (+12 downstream)'. A job failing downstream of one
+        already failing then changes nothing but that number. The root
+        causes are worked out again only when the failing jobs or the
+        graph change.
+        @type limit: int
+        @type graph: trayjenkins.graph.JobGraph
+        """
+        self._limit = limit
+        self._graph = graph
+        self._listed = False
+        self._active = set()
+        self._failing = OrderedDict()
+        self._causes_cache = None
+        self._causes_graph_version = None
+
+    def apply_delta(self, delta):
+        """
+        @type delta: trayjenkins.jobs.JobsDelta
+        """
+        self._listed = True
+        failing_changed = False
+        for model in delta.changed:
+            name = model.job.name
+            if model.ignored:
+                self._active.discard(name)
+                failing_changed |= self._failing.pop(name, None) is not None
+            else:
+                self._active.add(name)
+                if model.job.status == JobStatus.FAILING:
+                    if name not in self._failing:
+                        self._failing[name] = True
+                        failing_changed = True
+                else:
+                    failing_changed |= self._failing.pop(name, None) is not None
+        for name in delta.removed:
+            self._active.discard(name)
+            failing_changed |= self._failing.pop(name, None) is not None
+        if failing_changed:
+            self._causes_cache = None
+
+    def failing_count(self):
+        """
+        @return Failing jobs, not counting ignored ones
+        @rtype: int
+        """
+        return len(self._failing)
+
+    def _causes(self):
+        """
+        @return The failures to name, newest first, as (name, failing jobs
+        it explains), and how many there are in all
+        @rtype: (((str, int)), int)
+        """
+        graph_version = None if self._graph is None else self._graph.version()
+        if self._causes_cache is None or graph_version != self._causes_graph_version:
+            if self._graph is None or not len(self._graph):
+                shown = tuple((name, 0) for name in islice(reversed(self._failing), self._limit))
+                total = len(self._failing)
+            else:
+                causes = self._graph.root_causes(list(reversed(self._failing)))
+                shown = tuple((name, len(explained)) for name, explained in causes[:self._limit])
+                total = len(causes)
+            self._causes_cache = (shown, total)
+            self._causes_graph_version = graph_version
+
+        return self._causes_cache
+
+    def digest(self):
+        """
+        @return Small value that changes whenever message() would, other
+        than the number of jobs a root cause explains
+        @rtype: tuple
+        """
+        shown, total = self._causes()
+        return (self._listed, bool(self._active), total, tuple(name for name, explained in shown))  # @UnusedVariable
+
+    def message(self):
+        """
+        @return Brief message describing the job statuses.
+        @rtype: str
+        """
+        result = ''
+        if self._listed:
+            if not self._active:
+                result = 'No jobs'
+            elif self._failing:
+                shown, total = self._causes()
+                lines = ['FAILING:']
+                for name, explained in shown:
+                    lines.append('%s (+%d downstream)' % (name, explained) if explained else name)
+                if total > len(shown):
+                    lines.append('+%d more' % (total - len(shown)))
+                result = '\n'.join(lines)
+            else:
+                result = 'All active jobs pass'
+
+        return result
+
+
 class StatusReader(IStatusReader):
 
     def status(self, jobs):
@@ -92,7 +280,7 @@ class StatusReader(IStatusReader):
             result = JobStatus.UNKNOWN
         else:
             for job in jobs:
-                if job.status is JobStatus.FAILING:
+                if job.status == JobStatus.FAILING:
                     result = JobStatus.FAILING
                     break
 
@@ -104,34 +292,157 @@ class Model(IModel):
     def __init__(self,
                  jobs_model,
                  jobs_filter,
-                 message_composer=DefaultMessageComposer(),
+                 message_composer=None,
                  status_reader=StatusReader(),
-                 status_changed_event=Event()):
+                 status_changed_event=None,
+                 metrics=NULL_METRICS,
+                 failing_count_event=None,
+                 graph_model=None):
         """
+        Several models, each with its own filter, may share one jobs
+        model. By default each keeps its counts from the jobs model's
+        deltas, so it costs only the changes on each update; jobs_filter
+        is then given the changed jobs alone, and must judge each job on
+        its own, and is told of removed jobs through its forget method,
+        if it has one. Statuses Jenkins has not yet reported are left out,
+        so they are neither shown nor announced.
         @type jobs_model: trayjenkins.jobs.IModel
         @type jobs_filter: trayjenkins.jobs.IFilter
-        @type message_composer: trayjenkins.status.IMessageComposer
+        @param message_composer: BoundedMessageComposer by default; an
+        IMessageComposer is instead given every job on each update,
+        including a change to a single job, with status_reader, as are the
+        failing jobs counted
+        @type message_composer: trayjenkins.status.IIncrementalMessageComposer
         @type status_reader: trayjenkins.status.IStatusReader
         @type status_changed_event: trayjenkins.event.Event
+        @type metrics: trayjenkins.metrics.IMetrics
+        @type failing_count_event: trayjenkins.event.Event
+        @param graph_model: If given, the default message names only the
+        root causes of failures, and is composed again when the graph
+        changes
+        @type graph_model: trayjenkins.graph.GraphModel
         """
+        self._metrics = metrics
+        self._jobs_model = jobs_model
         self._jobs_filter = jobs_filter
+        if message_composer is None:
+            message_composer = BoundedMessageComposer(graph=None if graph_model is None else graph_model.graph())
         self._message_composer = message_composer
+        self._incremental = hasattr(self._message_composer, 'apply_delta')
         self._status_reader = status_reader
-        self._status_changed_event = status_changed_event
+        self._status_changed_event = Event() if status_changed_event is None else status_changed_event
+        self._failing_count_event = Event() if failing_count_event is None else failing_count_event
         self._lastStatus = JobStatus.UNKNOWN
-        self._lastMessage = None
+        self._lastDigest = None
+        self._last_failing_count = 0
+        self._last_job_models = None
+        self._listed = False
+        self._delta_follows = False
+
+        if self._incremental:
+            jobs_model.jobs_delta_event().register(self._on_jobs_delta)
+        else:
+            jobs_model.jobs_updated_event().register(self._on_jobs_listed)
+            jobs_model.jobs_delta_event().register(self._on_job_changed)
+        jobs_model.server_unreachable_event().register(self._on_server_unreachable)
+        if graph_model is not None and self._incremental:
+            graph_model.graph_changed_event().register(self._on_graph_changed)
+
+    def _on_graph_changed(self, graph):  # @UnusedVariable
 
-        jobs_model.jobs_updated_event().register(self._on_jobs_updated)
+        if self._listed and self._lastStatus != UNREACHABLE:
+            self._set_composed_status()
+
+    def _on_server_unreachable(self, reason):
+
+        if reason is not None:
+            self._set_status(UNREACHABLE, reason)
+        elif self._incremental and self._listed:
+            self._set_composed_status()
+        elif not self._incremental and self._last_job_models is not None:
+            self._on_jobs_updated(self._last_job_models)
+        else:
+            self._set_status(JobStatus.UNKNOWN, None)
+
+    def _on_jobs_listed(self, job_models):
+
+        self._delta_follows = True
+        self._on_jobs_updated(job_models)
+
+    def _on_job_changed(self, delta):  # @UnusedVariable
+        """
+        The delta that follows a whole list is already composed; one on its
+        own is a single job's change, made in the jobs model's list.
+        """
+        if self._delta_follows:
+            self._delta_follows = False
+        else:
+            self._on_jobs_updated(self._jobs_model.job_models())
 
     def _on_jobs_updated(self, job_models):
-        job_models = self._jobs_filter.filter_jobs(job_models)
-        jobs = [model.job for model in job_models]
-        status = self._status_reader.status(jobs)
-        message = self._message_composer.message(jobs)
-        if self._lastStatus != status or self._lastMessage != message:
-            self._status_changed_event.fire(status, message)
+        if any(model.pending for model in job_models):
+            job_models = self._without_pending(job_models)
+        # A copy, as the jobs model changes single jobs in its own list.
+        self._last_job_models = list(job_models)
+        with self._metrics.timer('status'):
+            job_models = self._jobs_filter.filter_jobs(job_models)
+            jobs = [model.job for model in job_models]
+            status = self._status_reader.status(jobs)
+            message = self._message_composer.message(jobs)
+            failing = sum(1 for job in jobs if job.status == JobStatus.FAILING)
+        self._set_status(status, message)
+        self._set_failing_count(failing)
+
+    def _on_jobs_delta(self, delta):
+        with self._metrics.timer('status'):
+            changed = [model for model in delta.changed if not model.pending]
+            kept = self._jobs_filter.filter_jobs(changed)
+            if len(kept) == len(changed):
+                removed = delta.removed
+            else:
+                kept_names = set(model.job.name for model in kept)
+                removed = delta.removed + [model.job.name for model in changed
+                                           if model.job.name not in kept_names]
+            self._message_composer.apply_delta(JobsDelta(kept, removed))
+            self._listed = True
+            if delta.removed and hasattr(self._jobs_filter, 'forget'):
+                self._jobs_filter.forget(delta.removed)
+        self._set_composed_status()
+        self._set_failing_count(self._message_composer.failing_count())
+
+    def _without_pending(self, job_models):
+        """
+        Puts back the last status Jenkins reported for jobs shown with
+        only an expected one.
+        """
+        previous = dict((model.job.name, model) for model in self._last_job_models or ())
+        result = [previous.get(model.job.name, None) if model.pending else model for model in job_models]
+
+        return [model for model in result if model is not None]
+
+    def _set_composed_status(self):
+
+        composer = self._message_composer
+        status = JobStatus.FAILING if composer.failing_count() else JobStatus.OK
+        self._set_status(status, composer.message, composer.digest())
+
+    def _set_status(self, status, message, digest=None):
+        """
+        @param message: The message, or a function that returns it, called
+        only if the status is to be fired
+        @param digest: Compared in place of the message, if given
+        """
+        digest = message if digest is None else digest
+        if self._lastStatus != status or self._lastDigest != digest:
+            self._status_changed_event.fire(status, message() if callable(message) else message)
         self._lastStatus = status
-        self._lastMessage = message
+        self._lastDigest = digest
+
+    def _set_failing_count(self, failing):
+
+        if failing != self._last_failing_count:
+            self._last_failing_count = failing
+            self._failing_count_event.fire(failing)
 
     def status_changed_event(self):
         """
@@ -139,3 +450,11 @@ class Model(IModel):
         @rtype: trayjenkins.event.IEvent
         """
         return self._status_changed_event
+
+    def failing_count_event(self):
+        """
+        Fired when the number of failing jobs, not counting ignored ones,
+        changes. Event arguments: failing:int
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._failing_count_event
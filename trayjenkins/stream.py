@@ -0,0 +1,216 @@
+import json
+import re
+
+from pyjenkins.job import Job
+from trayjenkins.api import is_building, job_path, status_from_colour
+from trayjenkins.metrics import NULL_METRICS
+from trayjenkins.progress import BuildProgress
+
+
+JOBS_TREE = 'jobs[name,color]'
+PROGRESS_TREE = 'lastBuild[number,building,timestamp],lastCompletedBuild[duration]'
+UPSTREAM_TREE = 'jobs[name,upstreamProjects[name]]'
+_JOBS_START = re.compile(r'"jobs"\s*:\s*\[')
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+class StreamParseError(Exception):
+    pass
+
+
+class JobStreamParser(object):
+
+    def __init__(self, stream, known_names=None, chunk_size=16 * 1024):
+        """
+        Reads jobs from a Jenkins job list response as it arrives, keeping
+        no more of it than the job being parsed and one chunk, so memory
+        does not grow with the size of the response. Reading stops at the
+        end of the jobs array.
+        @param stream: File-like response to /api/json?tree=jobs[name,color]
+        @param known_names: Job names to reuse rather than keep a new copy
+        of, e.g. the names from the previous poll
+        @type known_names: dict
+        @type chunk_size: int
+        """
+        self._stream = stream
+        self._known_names = {} if known_names is None else known_names
+        self.names = {}
+        self.building = set()
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._finished = False
+        self.bytes_read = 0
+
+    def __iter__(self):
+        """
+        @rtype: iterator of pyjenkins.job.Job
+        """
+        self._seek_jobs()
+        while True:
+            self._skip_separators()
+            if self._buffer[self._position] == ']':
+                break
+            values = self._decode_value()
+            name = values.get('name', '')
+            name = self._known_names.get(name, name)
+            self.names[name] = name
+            colour = values.get('color')
+            if is_building(colour):
+                self.building.add(name)
+            yield Job(name, status_from_colour(colour))
+
+    def _seek_jobs(self):
+
+        match = _JOBS_START.search(self._buffer)
+        while match is None:
+            keep = max(0, len(self._buffer) - 32)
+            self._buffer = self._buffer[keep:]
+            self._read_or_fail('no jobs in response')
+            match = _JOBS_START.search(self._buffer)
+        self._position = match.end()
+
+    def _skip_separators(self):
+
+        self._position = _WHITESPACE.match(self._buffer, self._position).end()
+        while self._position >= len(self._buffer):
+            self._discard_parsed()
+            self._read_or_fail('jobs array not closed')
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+
+    def _decode_value(self):
+        """
+        raw_decode fails on a value cut off at the end of the buffer, in
+        which case more is read and it is tried again.
+        """
+        while True:
+            try:
+                values, end = self._decoder.raw_decode(self._buffer, self._position)
+                break
+            except ValueError as error:
+                if self._finished:
+                    raise StreamParseError(str(error))
+                self._discard_parsed()
+                self._read_or_fail(str(error))
+        self._position = end
+        if not isinstance(values, dict):
+            raise StreamParseError('job is not an object: %r' % (values,))
+
+        return values
+
+    def _discard_parsed(self):
+
+        if self._position > 0:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+
+    def _read_or_fail(self, message):
+
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._finished = True
+            raise StreamParseError(message)
+        self.bytes_read += len(chunk)
+        self._buffer += chunk
+
+
+class StreamingJenkins(object):
+
+    def __init__(self, api, metrics=NULL_METRICS):
+        """
+        Lists jobs with JobStreamParser rather than reading the whole
+        response into dicts first. Names seen in the last poll are reused,
+        so an unchanged job list keeps no new name strings.
+        @type api: trayjenkins.api.JenkinsApi
+        @type metrics: trayjenkins.metrics.IMetrics
+        """
+        self._api = api
+        self._metrics = metrics
+        self._names = {}
+        self._building = frozenset()
+
+    def list_jobs(self):
+        """
+        @rtype: [pyjenkins.job.Job]
+        """
+        response = self._api.open('/api/json', tree=JOBS_TREE)
+        try:
+            parser = JobStreamParser(response, self._names)
+            with self._metrics.timer('parse'):
+                result = list(parser)
+            self._names = parser.names
+            self._building = frozenset(parser.building)
+            self._metrics.count('bytes_fetched', parser.bytes_read)
+        finally:
+            response.close()
+
+        return result
+
+    def get_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: pyjenkins.job.Job
+        """
+        values = self._api.get_json(job_path((job_name,)) + '/api/json', 'name,color')
+        name = values.get('name', job_name)
+        return Job(self._names.get(name, name), status_from_colour(values.get('color')))
+
+    def building_jobs(self):
+        """
+        @return Names of the jobs whose ball was animated at the last poll
+        @rtype: frozenset
+        """
+        return self._building
+
+    def build_progress(self, job_name):
+        """
+        Asks for just the running build's number and start, and how long
+        the last completed build took.
+        @type job_name: str
+        @return None if the job is not building, or Jenkins gives no
+        number or start for the build
+        @rtype: trayjenkins.progress.BuildProgress
+        """
+        values = self._api.get_json(job_path((job_name,)) + '/api/json', PROGRESS_TREE)
+        build = values.get('lastBuild') or {}
+        completed = values.get('lastCompletedBuild') or {}
+        if build.get('building') and build.get('number') is not None and build.get('timestamp') is not None:
+            duration = completed.get('duration')
+            result = BuildProgress(self._names.get(job_name, job_name),
+                                   build['number'],
+                                   build['timestamp'] / 1000.0,
+                                   duration / 1000.0 if duration else None)
+        else:
+            result = None
+
+        return result
+
+    def job_upstreams(self):
+        """
+        Asks for every job's upstream jobs, by name alone, in one request.
+        @return Upstream job names by job name
+        @rtype: dict
+        """
+        result = {}
+        for values in self._api.get_json('/api/json', UPSTREAM_TREE).get('jobs', []):
+            name = values['name']
+            upstream = tuple(self._names.get(project['name'], project['name'])
+                             for project in values.get('upstreamProjects') or [])
+            result[self._names.get(name, name)] = upstream
+
+        return result
+
+    def enable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._api.post(job_path((job_name,)) + '/enable')
+
+    def disable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._api.post(job_path((job_name,)) + '/disable')
@@ -0,0 +1,478 @@
+from collections import OrderedDict
+
+from pyjenkins.job import Job, JobStatus
+from trayjenkins.api import job_path, status_from_colour
+from trayjenkins.event import Event
+
+
+class FolderEntry(object):
+
+    def __init__(self, name, is_folder, status=JobStatus.UNKNOWN):
+        """
+        One item listed in a folder.
+        @type name: str
+        @type is_folder: bool
+        @type status: str
+        """
+        self.name = name
+        self.is_folder = is_folder
+        self.status = status
+
+    def __eq__(self, other):
+        """
+        @type other: trayjenkins.tree.FolderEntry
+        @rtype: bool
+        """
+        return isinstance(other, FolderEntry) \
+           and self.name == other.name \
+           and self.is_folder == other.is_folder \
+           and self.status == other.status
+
+    def __repr__(self):
+        """
+        @rtype: str
+        """
+        return 'FolderEntry(name=%r,is_folder=%r,status=%r)' % (self.name, self.is_folder, self.status)
+
+
+class IFolderSource(object):
+
+    def list_folder(self, path):
+        """
+        @param path: Folder names from the root, () for the root itself
+        @type path: (str)
+        @rtype: [trayjenkins.tree.FolderEntry]
+        """
+
+    def enable_job(self, path):
+        """
+        @type path: (str)
+        @rtype: bool
+        """
+
+    def disable_job(self, path):
+        """
+        @type path: (str)
+        @rtype: bool
+        """
+
+
+class JenkinsFolderSource(IFolderSource):
+
+    def __init__(self, api):
+        """
+        @type api: trayjenkins.api.JenkinsApi
+        """
+        self._api = api
+
+    def list_folder(self, path):
+        """
+        Folders and multibranch projects are told apart from jobs by having
+        no ball colour.
+        @type path: (str)
+        @rtype: [trayjenkins.tree.FolderEntry]
+        """
+        values = self._api.get_json(job_path(path) + '/api/json', 'jobs[name,color]')
+        return [FolderEntry(entry['name'],
+                            'color' not in entry,
+                            status_from_colour(entry.get('color')))
+                for entry in values.get('jobs', [])]
+
+    def enable_job(self, path):
+        """
+        @type path: (str)
+        @rtype: bool
+        """
+        return self._api.post(job_path(path) + '/enable')
+
+    def disable_job(self, path):
+        """
+        @type path: (str)
+        @rtype: bool
+        """
+        return self._api.post(job_path(path) + '/disable')
+
+
+class FolderFetch(object):
+
+    def __init__(self, path, entries, error=None):
+        """
+        What one fetch of a folder returned, for JobTree.apply_folder.
+        @type path: (str)
+        @param entries: None if the fetch failed
+        @type entries: [trayjenkins.tree.FolderEntry]
+        @param error: Why the fetch failed, if it did
+        @type error: Exception
+        """
+        self.path = path
+        self.entries = entries
+        self.error = error
+
+
+def _rolled_up_status(counts):
+
+    if counts[JobStatus.FAILING]:
+        result = JobStatus.FAILING
+    elif counts[JobStatus.OK]:
+        result = JobStatus.OK
+    elif counts[JobStatus.DISABLED]:
+        result = JobStatus.DISABLED
+    else:
+        result = JobStatus.UNKNOWN
+
+    return result
+
+
+def _new_counts():
+
+    return {JobStatus.OK: 0, JobStatus.FAILING: 0, JobStatus.DISABLED: 0, JobStatus.UNKNOWN: 0}
+
+
+class TreeNode(object):
+
+    def __init__(self, path, is_folder, status=JobStatus.UNKNOWN, parent=None):
+        """
+        A job, or a folder with the status rolled up from the jobs loaded
+        beneath it. A folder's children are None until it is first expanded.
+        @type path: (str)
+        @type is_folder: bool
+        @type status: str
+        @type parent: trayjenkins.tree.TreeNode
+        """
+        self.path = path
+        self.is_folder = is_folder
+        self.status = status
+        self.parent = parent
+        self.children = None
+        self.expanded = False
+        self.counts = _new_counts() if is_folder else None
+
+    def name(self):
+        """
+        @rtype: str
+        """
+        return self.path[-1] if self.path else ''
+
+    def is_loaded(self):
+        """
+        @rtype: bool
+        """
+        return self.children is not None
+
+    def __repr__(self):
+        """
+        @rtype: str
+        """
+        return 'TreeNode(path=%r,is_folder=%r,status=%r)' % (self.path, self.is_folder, self.status)
+
+
+class JobTree(object):
+
+    def __init__(self, source, children_changed_event=None, nodes_changed_event=None):
+        """
+        Jobs in a tree of folders, fetched a folder at a time as folders
+        are expanded. Each folder's counts of jobs by status are adjusted
+        as single jobs change, so rolling statuses up costs O(depth) per
+        change rather than a walk of the tree.
+
+        Also stands in for pyjenkins.jenkins.Jenkins, so that
+        trayjenkins.jobs.Model sees the jobs loaded so far as a flat list
+        named by path, e.g. 'team/app/master'. Listing does not fetch, so
+        the tree is refreshed first, e.g. by gui.jobs.UpdateTimer.
+        @type source: trayjenkins.tree.IFolderSource
+        @type children_changed_event: trayjenkins.event.IEvent
+        @type nodes_changed_event: trayjenkins.event.IEvent
+        """
+        self._source = source
+        self._children_changed_event = Event() if children_changed_event is None else children_changed_event
+        self._nodes_changed_event = Event() if nodes_changed_event is None else nodes_changed_event
+        self._root = TreeNode((), True)
+        self._root.expanded = True
+        self._nodes = {(): self._root}
+        self._error = None
+
+    def children_changed_event(self):
+        """
+        Fired when an expanded folder gains or loses items, or is expanded.
+        Listeners receive Event.fire(path:(str), children:[trayjenkins.tree.TreeNode])
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._children_changed_event
+
+    def nodes_changed_event(self):
+        """
+        Fired with the jobs and folders whose status changed.
+        Listeners receive Event.fire([trayjenkins.tree.TreeNode])
+        @rtype: trayjenkins.event.IEvent
+        """
+        return self._nodes_changed_event
+
+    def node(self, path):
+        """
+        @type path: (str)
+        @rtype: trayjenkins.tree.TreeNode
+        """
+        return self._nodes.get(tuple(path), None)
+
+    def expand(self, path):
+        """
+        @type path: (str)
+        """
+        node = self.node(path)
+        if node is not None and node.is_folder:
+            node.expanded = True
+            if node.is_loaded():
+                self._children_changed_event.fire(node.path, list(node.children.values()))
+            else:
+                self._refresh_folder(node)
+
+    def needs_fetch(self, path):
+        """
+        @return Whether expanding the folder needs it fetched first
+        @rtype: bool
+        """
+        node = self.node(path)
+        return node is not None and node.is_folder and not node.is_loaded()
+
+    def fetch_folder(self, path):
+        """
+        Asks Jenkins for a folder's items. Safe to call off the thread that
+        applies the result, as it only reads the source.
+        @type path: (str)
+        @rtype: trayjenkins.tree.FolderFetch
+        """
+        try:
+            result = FolderFetch(tuple(path), self._source.list_folder(tuple(path)))
+        except Exception as error:
+            result = FolderFetch(tuple(path), None, error)
+
+        return result
+
+    def apply_folder(self, fetch):
+        """
+        Expands the folder with the items fetched. A folder that has gone
+        since the fetch started is left alone.
+        @type fetch: trayjenkins.tree.FolderFetch
+        """
+        node = self.node(fetch.path)
+        if node is not None and node.is_folder and fetch.entries is not None:
+            node.expanded = True
+            self._apply_entries(node, fetch.entries)
+
+    def collapse(self, path):
+        """
+        A collapsed folder's items are no longer fetched, so it costs the
+        one row in its parent, with the status rolled up when it was last
+        open.
+        @type path: (str)
+        """
+        node = self.node(path)
+        if node is not None and node.is_folder and node.path != ():
+            node.expanded = False
+
+    def refresh_paths(self):
+        """
+        @return The root and every folder open in the view, top down.
+        Folders never expanded, and everything beneath a collapsed folder,
+        are left out.
+        @rtype: [(str)]
+        """
+        result = []
+        pending = [self._root]
+        while pending:
+            node = pending.pop(0)
+            result.append(node.path)
+            pending.extend(child for child in (node.children or {}).values()
+                           if child.is_folder and child.expanded and child.is_loaded())
+
+        return result
+
+    def fetch_folders(self, paths):
+        """
+        Asks Jenkins for each folder's items. Safe to call off the thread
+        that applies the result, as it only reads the source.
+        @type paths: [(str)]
+        @rtype: [trayjenkins.tree.FolderFetch]
+        """
+        return [self.fetch_folder(path) for path in paths]
+
+    def apply_refresh(self, fetches):
+        """
+        Applies the folders fetched by fetch_folders, top down, leaving out
+        any that have gone since. The first failure is raised by list_jobs
+        until a refresh succeeds.
+        @type fetches: [trayjenkins.tree.FolderFetch]
+        """
+        self._error = None
+        for fetch in fetches:
+            node = self.node(fetch.path)
+            if fetch.error is not None:
+                self._error = self._error or fetch.error
+            elif node is not None and node.is_folder and (node.is_loaded() or node is self._root):
+                self._apply_entries(node, fetch.entries)
+
+    def refresh(self):
+        """
+        Fetches the root and every folder open in the view, and applies
+        them, on the calling thread.
+        """
+        self.apply_refresh(self.fetch_folders(self.refresh_paths()))
+
+    def list_jobs(self):
+        """
+        Lists the jobs loaded by the last refresh, without asking Jenkins.
+        @rtype: [pyjenkins.job.Job]
+        """
+        if self._error is not None:
+            raise self._error
+
+        result = []
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            if node.is_folder:
+                pending.extend(reversed(list((node.children or {}).values())))
+            else:
+                result.append(Job('/'.join(node.path), node.status))
+
+        return result
+
+    def enable_job(self, job_name):
+        """
+        @param job_name: Path joined with '/', as from list_jobs()
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._source.enable_job(tuple(job_name.split('/')))
+
+    def disable_job(self, job_name):
+        """
+        @type job_name: str
+        @rtype: bool
+        """
+        return self._source.disable_job(tuple(job_name.split('/')))
+
+    def _refresh_folder(self, folder):
+
+        self._apply_entries(folder, self._source.list_folder(folder.path))
+
+    def _apply_entries(self, folder, entries):
+
+        changed = []
+        membership_changed = not folder.is_loaded()
+        old_children = folder.children or OrderedDict()
+        children = OrderedDict()
+
+        for entry in entries:
+            child = old_children.pop(entry.name, None)
+            if child is not None and child.is_folder != entry.is_folder:
+                self._remove(child, changed)
+                child = None
+            if child is None:
+                child = TreeNode(folder.path + (entry.name,), entry.is_folder, entry.status, folder)
+                self._nodes[child.path] = child
+                if not entry.is_folder:
+                    self._adjust_counts(folder, {entry.status: 1}, changed)
+                membership_changed = True
+            elif not child.is_folder and child.status != entry.status:
+                self._adjust_counts(folder, {child.status: -1, entry.status: 1}, changed)
+                child.status = entry.status
+                changed.append(child)
+            children[entry.name] = child
+
+        for child in old_children.values():
+            self._remove(child, changed)
+            membership_changed = True
+
+        folder.children = children
+        if membership_changed and folder.expanded:
+            self._children_changed_event.fire(folder.path, list(children.values()))
+        if changed:
+            self._nodes_changed_event.fire(self._unique(changed))
+
+    def _remove(self, node, changed):
+
+        if node.is_folder:
+            deltas = dict((status, -count) for status, count in node.counts.items())
+        else:
+            deltas = {node.status: -1}
+        self._adjust_counts(node.parent, deltas, changed)
+
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            self._nodes.pop(current.path, None)
+            if current.children:
+                pending.extend(current.children.values())
+
+    def _adjust_counts(self, folder, deltas, changed):
+
+        while folder is not None:
+            for status, delta in deltas.items():
+                folder.counts[status] += delta
+            status = _rolled_up_status(folder.counts)
+            if status != folder.status:
+                folder.status = status
+                changed.append(folder)
+            folder = folder.parent
+
+    def _unique(self, nodes):
+
+        seen = set()
+        result = []
+        for node in nodes:
+            if node.path not in seen and self._nodes.get(node.path) is node:
+                seen.add(node.path)
+                result.append(node)
+
+        return result
+
+
+class ITreeView(object):
+
+    def folder_expanded_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+
+    def folder_collapsed_event(self):
+        """
+        Listeners receive Event.fire(path:(str))
+        @rtype: trayjenkins.event.IEvent
+        """
+
+    def set_children(self, path, children):
+        """
+        @type path: (str)
+        @type children: [trayjenkins.tree.TreeNode]
+        """
+
+    def update_nodes(self, nodes):
+        """
+        @type nodes: [trayjenkins.tree.TreeNode]
+        """
+
+
+class TreePresenter(object):
+
+    def __init__(self, tree, view, expand=None):
+        """
+        The view starts with the top level as already fetched, since it
+        may be built long after the first poll.
+        @type tree: trayjenkins.tree.JobTree
+        @type view: trayjenkins.tree.ITreeView
+        @param expand: Called with the path of each folder expanded in the
+        view, in place of JobTree.expand, e.g. to fetch it in the background
+        @type expand: callable
+        """
+        self._tree = tree
+        self._view = view
+        tree.children_changed_event().register(view.set_children)
+        tree.nodes_changed_event().register(view.update_nodes)
+        view.folder_expanded_event().register(tree.expand if expand is None else expand)
+        view.folder_collapsed_event().register(tree.collapse)
+
+        root = tree.node(())
+        if root.is_loaded():
+            view.set_children((), list(root.children.values()))
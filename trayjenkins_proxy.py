@@ -0,0 +1,6 @@
+#!/usr/bin/python
+
+import sys
+from trayjenkins.proxy import main
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,3 @@
+#!/bin/sh
+export PYTHONPATH="submodules/pyjenkins"
+python trayjenkins_proxy.py $*